@@ -0,0 +1,129 @@
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+from knihovna import IndexKnihovny
+import hlasitost
+
+VELIKOST_DAVKY = 50
+INTERVAL_DAVKY_SEC = 1.0
+
+
+def pocet_procesu():
+    # Polovina jader, aby přehrávání a GUI měly vždycky volno
+    return max(1, (os.cpu_count() or 2) // 2)
+
+
+def _nic(*_):
+    pass
+
+
+def zpracovat_v_procesech(funkce, ulohy, ulozit, procesu, zruseno, nazev):
+    """Spustí `funkce(*úloha)` pro každou úlohu v procesech a výsledky ukládá po dávkách.
+
+    Naráz se rozdělí jen pár úloh na proces, takže zrušení (`zruseno`) je rychlé; hotové
+    výsledky předá `ulozit(dávka)` i po něm, ať se příště nepočítají znovu. Úloha, která
+    skončí výjimkou, se vypíše a přeskočí (poslední argument úlohy je cesta souboru), spadlý
+    proces ukončí celý běh; co chybí, zkusí se příště. Vrátí počet uložených výsledků.
+    """
+    ulozeno = 0
+    davka = []
+    posledni_ulozeni = time.monotonic()
+    cekajici = iter(ulohy)
+    bezi = {}
+
+    # "spawn": fork by do procesu zkopíroval i otevřený mixer a vlákna Qt
+    pool = ProcessPoolExecutor(
+        max_workers=procesu,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=hlasitost.inicializovat_proces,
+    )
+    try:
+        while True:
+            while len(bezi) < procesu * 2 and not zruseno.is_set():
+                uloha = next(cekajici, None)
+                if uloha is None:
+                    break
+                bezi[pool.submit(funkce, *uloha)] = uloha
+            if not bezi:
+                break
+
+            hotove, _ = wait(bezi, timeout=INTERVAL_DAVKY_SEC, return_when=FIRST_COMPLETED)
+            for future in hotove:
+                uloha = bezi.pop(future)
+                try:
+                    davka.append(future.result())
+                except BrokenProcessPool:
+                    raise
+                except Exception as e:
+                    print(f"{nazev}: '{uloha[-1]}' přeskočeno: {e}")
+            if zruseno.is_set():
+                break
+
+            ted = time.monotonic()
+            if davka and (len(davka) >= VELIKOST_DAVKY or ted - posledni_ulozeni >= INTERVAL_DAVKY_SEC):
+                ulozit(davka)
+                ulozeno += len(davka)
+                davka = []
+                posledni_ulozeni = ted
+    except BrokenProcessPool as e:
+        print(f"{nazev}: přerušeno, spadl pracovní proces: {e}")
+    finally:
+        pool.shutdown(wait=not zruseno.is_set(), cancel_futures=True)
+
+    if davka:
+        ulozit(davka)
+        ulozeno += len(davka)
+    return ulozeno
+
+
+class Analyza:
+    """Změří hlasitost skladeb, které ji v indexu ještě nemají, v procesech.
+
+    Procesy běží s nižší prioritou a naráz se rozdělí jen pár souborů na proces, takže
+    zrušení je rychlé a dekódování nikdy nezahltí disk ani procesor přehrávači. Uložené
+    dávky [(cesta, hlasitost, špička)] dostává `pri_vysledcich`, `pri_prubehu` (hotovo, celkem).
+    """
+
+    def __init__(self, db_path, procesu=None, pri_vysledcich=_nic, pri_prubehu=_nic):
+        self.db_path = db_path
+        self.procesu = procesu or pocet_procesu()
+        self.pri_vysledcich = pri_vysledcich
+        self.pri_prubehu = pri_prubehu
+        self._zruseno = threading.Event()
+
+    def zrusit(self):
+        self._zruseno.set()
+
+    def spustit(self):
+        """Vrátí počet změřených skladeb."""
+        index = IndexKnihovny(self.db_path)
+        try:
+            return self._analyzovat(index)
+        finally:
+            index.zavrit()
+
+    def _analyzovat(self, index):
+        cesty = index.neanalyzovane()
+        if not cesty or hlasitost.np is None:
+            if cesty:
+                print("NumPy není nainstalovaný, analýza hlasitosti se přeskakuje: pip install numpy")
+            return 0
+
+        print(f"Analyzuji hlasitost {len(cesty)} skladeb ({self.procesu} procesů)")
+        zmereno = 0
+
+        def ulozit(davka):
+            nonlocal zmereno
+            index.ulozit_hlasitost(davka)
+            self.pri_vysledcich(davka)
+            zmereno += len(davka)
+            self.pri_prubehu(zmereno, len(cesty))
+
+        return zpracovat_v_procesech(
+            hlasitost.analyzovat, ((cesta,) for cesta in cesty), ulozit,
+            self.procesu, self._zruseno, "Analýza hlasitosti",
+        )
@@ -0,0 +1,482 @@
+"""Benchmark přehrávače nad syntetickými knihovnami (1k až 1M skladeb), běží bez okna a zvuku.
+
+    python benchmark.py                          # 1k, 10k, 100k -> benchmark.json
+    python benchmark.py --velikosti 1000 1000000 --vystup po.json
+    python benchmark.py --porovnat pred.json po.json
+    python benchmark.py --pamet --velikosti 200000   # jen paměť na skladbu, bez souborů a Qt
+
+Každá velikost běží ve vlastním procesu, aby se paměť jednotlivých běhů nemíchala.
+
+Měří první a opakovaný sken, paměť (RSS a bajty na skladbu v tabulce proti slovníku
+cest), přepnutí playlistu, otevření v procházení, hledání na znak, uložení a přesun
+v playlistu, hromadné přidání, přepočet chytrých playlistů po přehrání a přechod na
+další skladbu. Výsledky se vypíšou jako tabulka a uloží do JSON pro --porovnat.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import struct
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Musí být nastavené před importem Qt a pygame
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+VYCHOZI_VELIKOSTI = (1000, 10000, 100000)
+SKLADEB_NA_ALBUM = 10
+ALB_NA_INTERPRETA = 5
+KROKU_PREHRAVANI = 50
+OPAKOVANI_PREPNUTI = 5
+# Playlisty při měření paměti: každý je náhodný výběr 10 % knihovny
+PLAYLISTU_PAMETI = 10
+
+# MPEG 1 Layer III, 32 kbit/s, 44,1 kHz, mono: 104 bajtů na rámec, samé nuly = ticho
+RAMEC_MP3 = b"\xff\xfb\x10\xc0" + bytes(100)
+RAMCU_NA_SKLADBU = 20
+
+SLOVA = [
+    "pátek", "noc", "léto", "Žluťoučký", "kůň", "řeka", "světlo", "dálnice", "ozvěna", "hvězdy",
+    "Moskva", "вечер", "город", "東京", "夜明け", "さくら", "Ångström", "Fjäll", "señorita", "café",
+    "blue", "midnight", "echo", "river", "neon", "thunder", "ghost", "paper", "summer", "🎸",
+]
+ZANRY = ["Rock", "Pop", "Jazz", "Metal", "Folk", "Elektronika", "Klasika", "Hip-hop"]
+
+
+def _synchsafe(cislo):
+    return bytes(((cislo >> 21) & 0x7F, (cislo >> 14) & 0x7F, (cislo >> 7) & 0x7F, cislo & 0x7F))
+
+
+def _id3_ramec(ident, text):
+    data = b"\x01" + text.encode("utf-16")
+    return ident.encode("ascii") + struct.pack(">I", len(data)) + b"\x00\x00" + data
+
+
+def mp3_s_tagy(titul, interpret, album, zanr, cislo):
+    ramce = b"".join((
+        _id3_ramec("TIT2", titul),
+        _id3_ramec("TPE1", interpret),
+        _id3_ramec("TALB", album),
+        _id3_ramec("TCON", zanr),
+        _id3_ramec("TRCK", str(cislo)),
+    ))
+    return b"ID3\x03\x00\x00" + _synchsafe(len(ramce)) + ramce + RAMEC_MP3 * RAMCU_NA_SKLADBU
+
+
+def _nazev(nahoda, slov):
+    return " ".join(nahoda.choice(SLOVA) for _ in range(slov))
+
+
+def _skladba(i, nahoda):
+    """Interpret, album, titul, žánr a číslo i-té skladby syntetické knihovny."""
+    cislo_alba, cislo_skladby = divmod(i, SKLADEB_NA_ALBUM)
+    cislo_interpreta = cislo_alba // ALB_NA_INTERPRETA
+    interpret = f"{_nazev(random.Random(cislo_interpreta), 2)} {cislo_interpreta}"
+    album = f"{_nazev(random.Random(-1 - cislo_alba), 2)} {cislo_alba}"
+    titul = _nazev(nahoda, nahoda.randint(1, 4))
+    return interpret, album, titul, nahoda.choice(ZANRY), cislo_skladby + 1
+
+
+def vygenerovat_knihovnu(slozka, pocet):
+    """Vytvoří (nebo znovu použije) knihovnu interpret/album/skladba s pestrými tagy."""
+    hotovo = slozka / ".hotovo"
+    if hotovo.exists() and hotovo.read_text() == str(pocet):
+        return slozka
+    shutil.rmtree(slozka, ignore_errors=True)
+    nahoda = random.Random(pocet)
+    slozka.mkdir(parents=True)
+    for i in range(pocet):
+        interpret, album, titul, zanr, cislo = _skladba(i, nahoda)
+        adresar = slozka / interpret / album
+        if cislo == 1:
+            adresar.mkdir(parents=True, exist_ok=True)
+        # Znaky, které nesmí do jména souboru, ve jménu nejsou; zbytek Unicode ano
+        soubor = adresar / f"{cislo:02d} - {titul}.mp3"
+        soubor.write_bytes(mp3_s_tagy(titul, interpret, album, zanr, cislo))
+    hotovo.write_text(str(pocet))
+    return slozka
+
+
+def synteticke_radky(pocet, koren="/hudba"):
+    """Řádky indexu (stejné sloupce jako IndexKnihovny._SLOUPCE) bez souborů na disku."""
+    nahoda = random.Random(pocet)
+    for i in range(pocet):
+        interpret, album, titul, zanr, cislo = _skladba(i, nahoda)
+        cesta = os.path.join(koren, interpret, album, f"{cislo:02d} - {titul}.mp3")
+        yield (i + 1, cesta, 4096 + i, 1.7e9 + i, titul, interpret, album, zanr,
+               180.0 + i % 120, 320000, -14.0 - i % 7, 0.9)
+
+
+def zmerit_pamet(pocet, playlistu=PLAYLISTU_PAMETI):
+    """Bajty na skladbu pro knihovnu s playlisty: dřívější slovník cest vs. TabulkaSkladeb.
+
+    Obě podoby drží totéž (knihovnu, All Tracks a `playlistu` výběrů po 10 %). Řádky se
+    tvoří až během měření, jako by přišly z databáze, takže se započítají i jejich řetězce;
+    u slovníku cest má každá položka playlistu vlastní řetězec, jako po načtení z SQLite.
+    """
+    import gc
+    import tracemalloc
+    from array import array
+    from knihovna import Skladba, TabulkaSkladeb
+
+    nahoda = random.Random(3)
+    vybery = [sorted(nahoda.sample(range(pocet), max(1, pocet // 10))) for _ in range(playlistu)]
+
+    def slovnik_cest():
+        knihovna = {radek[1]: Skladba(*radek) for radek in synteticke_radky(pocet)}
+        vsechny = list(knihovna)
+        playlisty = {"⭐ All Tracks": vsechny}
+        for i, vyber in enumerate(vybery):
+            playlisty[f"Playlist {i}"] = [vsechny[j].encode().decode() for j in vyber]
+        return knihovna, playlisty
+
+    def tabulka():
+        tabulka = TabulkaSkladeb()
+        tabulka.rezervovat(pocet)
+        vsechny = array("i")
+        for radek in synteticke_radky(pocet):
+            vsechny.append(tabulka.nastavit(*radek))
+        playlisty = {"⭐ All Tracks": vsechny}
+        for i, vyber in enumerate(vybery):
+            playlisty[f"Playlist {i}"] = array("i", (vsechny[j] for j in vyber))
+        return tabulka, playlisty
+
+    vysledky = {"skladeb": pocet, "playlistu": playlistu}
+    for nazev, postavit in (("slovnik_cest", slovnik_cest), ("tabulka", tabulka)):
+        gc.collect()
+        tracemalloc.start()
+        data = postavit()
+        obsazeno, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        del data
+        vysledky[f"{nazev}_bajtu_na_skladbu"] = round(obsazeno / pocet)
+    vysledky["uspora"] = round(
+        1 - vysledky["tabulka_bajtu_na_skladbu"] / vysledky["slovnik_cest_bajtu_na_skladbu"], 3)
+    return vysledky
+
+
+def statistika(casy):
+    casy = sorted(casy)
+    if not casy:
+        return None
+    return {
+        "n": len(casy),
+        "prumer_ms": round(sum(casy) / len(casy) * 1000, 3),
+        "p50_ms": round(casy[len(casy) // 2] * 1000, 3),
+        "p95_ms": round(casy[min(len(casy) - 1, int(len(casy) * 0.95))] * 1000, 3),
+        "max_ms": round(casy[-1] * 1000, 3),
+    }
+
+
+def rss_mb():
+    """Aktuální obsazená paměť procesu v MB (Linux přes /proc, jinde psutil, když je)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / 2 ** 20
+    except ImportError:
+        return None
+
+
+def spickova_rss_mb():
+    try:
+        import resource
+    except ImportError:
+        return None
+    spicka = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux hlásí kB, macOS bajty
+    return spicka / 2 ** 20 if sys.platform == "darwin" else spicka / 1024
+
+
+def zmerit_jednu_velikost(pocet, pracovni):
+    """Proběhne v samostatném procesu; vrátí slovník výsledků pro jednu velikost knihovny."""
+    hudba = vygenerovat_knihovnu(pracovni / f"hudba_{pocet}", pocet)
+    data = pracovni / f"data_{pocet}"
+    shutil.rmtree(data, ignore_errors=True)
+    data.mkdir(parents=True)
+    os.environ["CRAFTORA_DATA"] = str(data)
+
+    from array import array
+    from PySide6.QtCore import QEventLoop
+    from PySide6.QtWidgets import QApplication
+    from knihovna import IndexKnihovny
+    import video_prehravac
+
+    app = QApplication.instance() or QApplication([])
+
+    def pockat(podminka, limit=3600):
+        konec = time.monotonic() + limit
+        while not podminka():
+            if time.monotonic() > konec:
+                raise TimeoutError("benchmark čekal příliš dlouho")
+            app.processEvents(QEventLoop.ProcessEventsFlag.AllEvents, 50)
+
+    index = IndexKnihovny(data / "knihovna.db")
+    index.pridat_koren(hudba)
+    index.zavrit()
+
+    vysledky = {"skladeb": pocet}
+    pamet_pred = rss_mb()
+
+    # Sken: první (prázdný index) a opakovaný (nic se nezměnilo)
+    od = time.perf_counter()
+    okno = video_prehravac.ModerniPrehravac()
+    # Analýza hlasitosti by po skenu dekódovala celou knihovnu a zkreslila čísla
+    okno.spustit_analyzu = lambda: None
+    okno.show()
+    pockat(lambda: okno.skener is None)
+    vysledky["sken_ms"] = round((time.perf_counter() - od) * 1000, 1)
+    pockat(lambda: okno.cekajici_hledani is None)
+    vysledky["sken_a_hledani_ms"] = round((time.perf_counter() - od) * 1000, 1)
+
+    od = time.perf_counter()
+    okno.skenovat_lokalni_hudbu()
+    pockat(lambda: okno.skener is None)
+    vysledky["opakovany_sken_ms"] = round((time.perf_counter() - od) * 1000, 1)
+
+    pamet_po = rss_mb()
+    spicka = spickova_rss_mb()
+    vysledky["pamet"] = {
+        "rss_mb": pamet_po and round(pamet_po, 1),
+        "spicka_rss_mb": spicka and round(spicka, 1),
+        "bajtu_na_skladbu": (
+            round((pamet_po - pamet_pred) * 2 ** 20 / max(len(okno.tabulka), 1))
+            if pamet_po is not None and pamet_pred is not None else None
+        ),
+    }
+
+    # Přepínání playlistů: All Tracks a dva velké náhodné výběry
+    nahoda = random.Random(1)
+    vsechny = list(okno.playlists["⭐ All Tracks"])
+    for nazev, podil in (("Bench 10 %", 0.1), ("Bench 50 %", 0.5)):
+        okno.playlists[nazev] = array("i", nahoda.sample(vsechny, max(1, int(len(vsechny) * podil))))
+        okno.naplanovat_ulozeni(nazev)
+    okno.ulozit_zmenene_playlisty()
+    okno.aktualizovat_playlist_list()
+
+    casy = []
+    for _ in range(OPAKOVANI_PREPNUTI):
+        for radek in range(okno.playlist_model.rowCount()):
+            od = time.perf_counter()
+            okno.zobrazit_playlist(okno.playlist_model.index(radek))
+            app.processEvents()
+            casy.append(time.perf_counter() - od)
+    vysledky["prepnuti_playlistu"] = statistika(casy)
+
+    # Otevření procházení podle interpretů a žánrů a prvního interpreta v nich
+    casy = []
+    for _ in range(OPAKOVANI_PREPNUTI):
+        for rezim in ("ARTISTS", "CATEGORIES"):
+            od = time.perf_counter()
+            okno.prepnout_sidebar_mode(rezim)
+            okno.otevrit_skupinu(okno.skupiny_model.index(0))
+            app.processEvents()
+            casy.append(time.perf_counter() - od)
+    okno.prepnout_sidebar_mode("HOME")
+    vysledky["otevreni_prochazeni"] = statistika(casy)
+
+    # Hledání znak po znaku nad All Tracks, jako by uživatel psal (bez 120ms prodlevy)
+    okno.zobrazit_playlist(okno.playlist_model.index(0))
+    dotazy = ["pátek", "midnight echo", "東京", "thundr", "kun"]
+    casy = []
+    for dotaz in dotazy:
+        for delka in range(1, len(dotaz) + 1):
+            od = time.perf_counter()
+            okno.filtrovat_skladby(dotaz[:delka])
+            app.processEvents()
+            casy.append(time.perf_counter() - od)
+        okno.filtrovat_skladby("")
+    vysledky["hledani_na_znak"] = statistika(casy)
+
+    # Uložení playlistu po jedné změně
+    casy = []
+    for nazev in ("Bench 10 %", "Bench 50 %"):
+        for i in range(5):
+            okno.playlists[nazev].append(vsechny[i])
+            okno.naplanovat_ulozeni(nazev)
+            od = time.perf_counter()
+            okno.ulozit_zmenene_playlisty()
+            casy.append(time.perf_counter() - od)
+    vysledky["ulozeni_playlistu"] = statistika(casy)
+
+    # Hromadné úpravy: přetažení bloku 20 skladeb ve velkém playlistu a přidání "alba" najednou
+    okno.zobrazit_playlist(okno.playlist_model.index(okno.playlist_model.nazvy.index("Bench 50 %")))
+    casy = []
+    for i in range(KROKU_PREHRAVANI):
+        od = time.perf_counter()
+        okno.presunout_vybrane(range(i * 10, i * 10 + 20), len(okno.currently_viewing_ids) - 1 - i)
+        app.processEvents()
+        casy.append(time.perf_counter() - od)
+    vysledky["presun_v_playlistu"] = statistika(casy)
+    casy = []
+    for i in range(KROKU_PREHRAVANI):
+        od = time.perf_counter()
+        okno.pridat_do_playlistu("Bench 10 %", vsechny[i * 20:(i + 1) * 20])
+        casy.append(time.perf_counter() - od)
+    vysledky["hromadne_pridani"] = statistika(casy)
+    okno.ulozit_zmenene_playlisty()
+
+    # Chytré playlisty po přehrání skladby: přepočítá se jen ta jedna, ne celá knihovna
+    from chytre import vyhodnotit
+    okno.nacist_chytre(vyhodnotit({
+        "Bench nejhranější": {"podminky": [], "razeni": "plays", "limit": 50},
+        "Bench krátké": {"podminky": [
+            {"pole": "artist", "op": "obsahuje", "hodnota": "a"},
+            {"pole": "duration", "op": "<", "hodnota": 240},
+        ]},
+        "Bench poslední týden": {"podminky": [{"pole": "last_played", "op": "za posledních", "hodnota": 7}]},
+    }, okno.index.conn, okno.tabulka))
+    casy = []
+    for i in range(min(KROKU_PREHRAVANI, len(vsechny))):
+        skladba = vsechny[i * 7919 % len(vsechny)]
+        okno.tabulka.plays[skladba] += 1
+        okno.tabulka.last_played[skladba] = time.time()
+        od = time.perf_counter()
+        okno.aktualizovat_chytre([skladba])
+        casy.append(time.perf_counter() - od)
+    vysledky["chytre_po_prehrani"] = statistika(casy)
+
+    # Přechod na další skladbu z fronty
+    skladba = okno.fronta.nastavit(okno.playlists["⭐ All Tracks"], 0)
+    okno.prehrat_skladbu(okno.tabulka.cesta(skladba))
+    casy = []
+    for _ in range(min(KROKU_PREHRAVANI, len(vsechny) - 1)):
+        od = time.perf_counter()
+        okno.pustit_dalsi_skladbu(rucne=True)
+        app.processEvents()
+        casy.append(time.perf_counter() - od)
+    vysledky["dalsi_skladba"] = statistika(casy)
+
+    okno.close()
+    vysledky["pamet_reprezentace"] = zmerit_pamet(pocet)
+    return vysledky
+
+
+def popis_behu():
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+            cwd=Path(__file__).parent, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "cas": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platforma": platform.platform(),
+        "procesoru": os.cpu_count(),
+    }
+
+
+# Metriky, které se porovnávají mezi běhy: (klíč, podklíč nebo None)
+POROVNAVANE = [
+    ("sken_ms", None), ("opakovany_sken_ms", None),
+    ("prepnuti_playlistu", "p50_ms"), ("otevreni_prochazeni", "p50_ms"), ("hledani_na_znak", "p95_ms"),
+    ("ulozeni_playlistu", "p50_ms"), ("presun_v_playlistu", "p50_ms"),
+    ("hromadne_pridani", "p50_ms"), ("chytre_po_prehrani", "p95_ms"), ("dalsi_skladba", "p50_ms"),
+    ("pamet", "bajtu_na_skladbu"), ("pamet_reprezentace", "tabulka_bajtu_na_skladbu"),
+]
+
+
+def porovnat(stary_soubor, novy_soubor, tolerance):
+    stary = json.loads(Path(stary_soubor).read_text(encoding="utf-8"))
+    novy = json.loads(Path(novy_soubor).read_text(encoding="utf-8"))
+    zhorseni = 0
+    print(f"{stary['beh'].get('commit')} -> {novy['beh'].get('commit')}")
+    for velikost, hodnoty in novy["velikosti"].items():
+        puvodni = stary["velikosti"].get(velikost)
+        if not puvodni:
+            continue
+        print(f"\n{velikost} skladeb")
+        for klic, podklic in POROVNAVANE:
+            pred, po = puvodni.get(klic), hodnoty.get(klic)
+            if podklic:
+                pred = pred and pred.get(podklic)
+                po = po and po.get(podklic)
+            if not pred or po is None:
+                continue
+            zmena = (po - pred) / pred
+            znacka = "  ZHORŠENÍ" if zmena > tolerance else ""
+            zhorseni += bool(znacka)
+            nazev = f"{klic}.{podklic}" if podklic else klic
+            print(f"  {nazev:<32} {pred:>12.2f} -> {po:>12.2f}  {zmena:+7.1%}{znacka}")
+    return 1 if zhorseni else 0
+
+
+def vypsat(vystup):
+    """Tabulka metrik z POROVNAVANE, sloupec za každou velikost knihovny."""
+    velikosti = list(vystup["velikosti"])
+    print(f"{'':<42}" + "".join(f"{velikost:>12}" for velikost in velikosti))
+    for klic, podklic in POROVNAVANE:
+        radek = []
+        for velikost in velikosti:
+            hodnota = vystup["velikosti"][velikost].get(klic)
+            if podklic:
+                hodnota = hodnota and hodnota.get(podklic)
+            radek.append(f"{hodnota:>12.2f}" if hodnota is not None else f"{'-':>12}")
+        nazev = f"{klic}.{podklic}" if podklic else klic
+        print(f"{nazev:<42}" + "".join(radek))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--velikosti", type=int, nargs="+", default=list(VYCHOZI_VELIKOSTI))
+    parser.add_argument("--vystup", default="benchmark.json")
+    parser.add_argument("--pracovni", default=str(Path(tempfile.gettempdir()) / "craftora-benchmark"),
+                        help="kam se generují knihovny (zůstávají pro další běhy)")
+    parser.add_argument("--porovnat", nargs=2, metavar=("PRED", "PO"))
+    parser.add_argument("--tolerance", type=float, default=0.2, help="povolené zhoršení, 0.2 = 20 %%")
+    parser.add_argument("--pamet", action="store_true", help="změří jen paměť na skladbu (bez souborů a Qt)")
+    parser.add_argument("--jedna", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--do", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.porovnat:
+        sys.exit(porovnat(*args.porovnat, args.tolerance))
+
+    if args.pamet:
+        for pocet in args.velikosti:
+            v = zmerit_pamet(pocet)
+            print(f"{pocet:>9} skladeb: slovník cest {v['slovnik_cest_bajtu_na_skladbu']:>6} B/skladbu,"
+                  f" tabulka {v['tabulka_bajtu_na_skladbu']:>6} B/skladbu ({v['uspora']:.0%} méně)")
+        return
+
+    pracovni = Path(args.pracovni)
+    if args.jedna:
+        vysledky = zmerit_jednu_velikost(args.jedna, pracovni)
+        Path(args.do).write_text(json.dumps(vysledky), encoding="utf-8")
+        return
+
+    vystup = {"beh": popis_behu(), "velikosti": {}}
+    for pocet in args.velikosti:
+        print(f"Benchmark: {pocet} skladeb...", file=sys.stderr)
+        with tempfile.NamedTemporaryFile(suffix=".json", delete=False) as f:
+            docasny = f.name
+        try:
+            subprocess.run(
+                [sys.executable, __file__, "--jedna", str(pocet), "--do", docasny, "--pracovni", str(pracovni)],
+                check=True, stdout=subprocess.DEVNULL,
+            )
+            vystup["velikosti"][str(pocet)] = json.loads(Path(docasny).read_text(encoding="utf-8"))
+        finally:
+            os.unlink(docasny)
+
+    vypsat(vystup)
+    Path(args.vystup).write_text(json.dumps(vystup, ensure_ascii=False, indent=2), encoding="utf-8")
+    print(f"Výsledky uloženy do {args.vystup}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
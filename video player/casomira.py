@@ -0,0 +1,286 @@
+import functools
+import json
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from contextlib import contextmanager, nullcontext
+
+# Počátek měření; modul se importuje jako první, dřív už běžel jen samotný Python
+START = time.perf_counter()
+
+
+class MereniStartu:
+    """Sbírá úseky startu aplikace (odkdy, jak dlouho, ve kterém vlákně)."""
+
+    def __init__(self):
+        self.useky = []
+        self._zamek = threading.Lock()
+
+    @contextmanager
+    def usek(self, nazev):
+        od = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._zapsat(nazev, od, time.perf_counter())
+
+    def znacka(self, nazev):
+        ted = time.perf_counter()
+        self._zapsat(nazev, ted, ted)
+
+    def _zapsat(self, nazev, od, do):
+        with self._zamek:
+            self.useky.append((od - START, do - od, threading.current_thread().name, nazev))
+
+    def celkem_ms(self):
+        return (time.perf_counter() - START) * 1000
+
+    def zprava(self):
+        radky = [f"Start aplikace: {self.celkem_ms():.0f} ms"]
+        radky.append(f"{'od [ms]':>9} {'trvání [ms]':>12}  {'vlákno':<14} úsek")
+        for od, trvani, vlakno, nazev in sorted(self.useky):
+            radky.append(f"{od * 1000:9.1f} {trvani * 1000:12.1f}  {vlakno:<14} {nazev}")
+        return "\n".join(radky)
+
+
+mereni = MereniStartu()
+
+
+# --- Měření za běhu -------------------------------------------------------------
+
+# Histogram po mocninách dvou mikrosekund: koš i drží doby v intervalu [2^(i-1), 2^i) µs
+POCET_KOSU = 27
+# Kolik posledních úseků si stopa pamatuje pro export do Chrome trace
+MAX_UDALOSTI = 100_000
+# GUI smyčka, která nezpracovala tep déle než tohle, se hlásí jako zaseknutá
+PRAH_ZASEKNUTI_MS = 200
+INTERVAL_TEPU_MS = 50
+
+
+class Histogram:
+    """Počet, součet, maximum a logaritmické koše dob jedné operace."""
+
+    __slots__ = ("pocet", "soucet", "maximum", "kose")
+
+    def __init__(self):
+        self.pocet = 0
+        self.soucet = 0.0
+        self.maximum = 0.0
+        self.kose = [0] * POCET_KOSU
+
+    def pridat(self, us):
+        self.pocet += 1
+        self.soucet += us
+        if us > self.maximum:
+            self.maximum = us
+        self.kose[min(int(us).bit_length(), POCET_KOSU - 1)] += 1
+
+    def percentil(self, podil):
+        # Horní hranice koše, do kterého percentil padne (nadhodnocuje nejvýš dvakrát)
+        cil = podil * self.pocet
+        kumulativne = 0
+        for i, pocet in enumerate(self.kose):
+            kumulativne += pocet
+            if pocet and kumulativne >= cil:
+                return min(float(1 << i), self.maximum)
+        return self.maximum
+
+    def souhrn(self):
+        return {
+            "pocet": self.pocet,
+            "prumer_ms": self.soucet / self.pocet / 1000 if self.pocet else 0.0,
+            "p50_ms": self.percentil(0.50) / 1000,
+            "p95_ms": self.percentil(0.95) / 1000,
+            "p99_ms": self.percentil(0.99) / 1000,
+            "max_ms": self.maximum / 1000,
+            "kose_us": {str(1 << i): n for i, n in enumerate(self.kose) if n},
+        }
+
+
+class _Usek:
+    __slots__ = ("instrumentace", "nazev", "od")
+
+    def __init__(self, instrumentace, nazev):
+        self.instrumentace = instrumentace
+        self.nazev = nazev
+
+    def __enter__(self):
+        self.instrumentace._vstoupit(self.nazev)
+        self.od = time.perf_counter()
+        return self
+
+    def __exit__(self, *chyba):
+        self.instrumentace.zapsat(self.nazev, self.od, time.perf_counter())
+        return False
+
+
+_NIC = nullcontext()
+
+
+class Instrumentace:
+    """Doby hlavních operací, čítače a zaseknutí GUI smyčky; ve výchozím stavu vypnutá.
+
+    Vypnutá stojí jedno porovnání na volání. Zapnutá plní histogramy a kruhovou stopu
+    posledních úseků a hlídací vlákno sleduje tep z GUI smyčky: když se tep zpozdí,
+    uloží zásobník hlavního vlákna a úseky, které v něm právě běží.
+    """
+
+    def __init__(self):
+        self.zapnuto = False
+        self._zamek = threading.Lock()
+        self._hlidac = None
+        self._hlavni = threading.main_thread().ident
+        self.vynulovat()
+
+    def vynulovat(self):
+        with self._zamek:
+            self.histogramy = {}
+            self.pocitadla = {}
+            self.stopa = deque(maxlen=MAX_UDALOSTI)
+            self.zaseknuti = []
+            self._aktivni = []
+            self._tep = time.perf_counter()
+            self._zaseknuto = None
+
+    def zapnout(self):
+        if self.zapnuto:
+            return
+        self._tep = time.perf_counter()
+        self.zapnuto = True
+        self._hlidac = threading.Thread(target=self._hlidat, name="hlidac-gui", daemon=True)
+        self._hlidac.start()
+
+    def vypnout(self):
+        self.zapnuto = False
+        self._hlidac = None
+
+    def usek(self, nazev):
+        if not self.zapnuto:
+            return _NIC
+        return _Usek(self, nazev)
+
+    def _vstoupit(self, nazev):
+        if threading.get_ident() == self._hlavni:
+            self._aktivni.append(nazev)
+
+    def zapsat(self, nazev, od, do):
+        vlakno = threading.get_ident()
+        with self._zamek:
+            if vlakno == self._hlavni and self._aktivni:
+                self._aktivni.pop()
+            histogram = self.histogramy.get(nazev)
+            if histogram is None:
+                histogram = self.histogramy[nazev] = Histogram()
+            histogram.pridat((do - od) * 1e6)
+            self.stopa.append((nazev, od, do, vlakno))
+
+    def pocitat(self, nazev, n=1):
+        if not self.zapnuto:
+            return
+        with self._zamek:
+            self.pocitadla[nazev] = self.pocitadla.get(nazev, 0) + n
+
+    def tep(self):
+        """Volá časovač v GUI smyčce; dokud chodí včas, smyčka nestojí."""
+        self._tep = time.perf_counter()
+
+    def _hlidat(self):
+        prah = PRAH_ZASEKNUTI_MS / 1000
+        while self.zapnuto and self._hlidac is threading.current_thread():
+            time.sleep(INTERVAL_TEPU_MS / 1000)
+            tep = self._tep
+            ted = time.perf_counter()
+            if self._zaseknuto is not None:
+                if tep > self._zaseknuto["od"]:
+                    self._uzavrit_zaseknuti(tep)
+                continue
+            if ted - tep > prah:
+                ramec = sys._current_frames().get(self._hlavni)
+                zasobnik = traceback.format_stack(ramec, limit=12) if ramec is not None else []
+                self._zaseknuto = {
+                    "od": tep,
+                    "zasobnik": [radek.rstrip() for radek in zasobnik],
+                    "useky": list(self._aktivni),
+                }
+
+    def _uzavrit_zaseknuti(self, do):
+        zaznam, self._zaseknuto = self._zaseknuto, None
+        with self._zamek:
+            zaznam["do"] = do
+            self.zaseknuti.append(zaznam)
+            self.pocitadla["zaseknutí GUI"] = self.pocitadla.get("zaseknutí GUI", 0) + 1
+        print(
+            f"GUI stálo {(do - zaznam['od']) * 1000:.0f} ms"
+            + (f" v úseku '{zaznam['useky'][-1]}'" if zaznam["useky"] else "")
+        )
+
+    def souhrn(self):
+        with self._zamek:
+            return {
+                "operace": {nazev: h.souhrn() for nazev, h in sorted(self.histogramy.items())},
+                "pocitadla": dict(sorted(self.pocitadla.items())),
+                "zaseknuti": [
+                    {
+                        "od_ms": (z["od"] - START) * 1000,
+                        "trvani_ms": (z["do"] - z["od"]) * 1000,
+                        "useky": z["useky"],
+                        "zasobnik": z["zasobnik"],
+                    }
+                    for z in self.zaseknuti
+                ],
+            }
+
+    def chrome_trace(self):
+        """Stopa ve formátu Trace Event (chrome://tracing, Perfetto)."""
+        pid = os.getpid()
+        jmena = {vlakno.ident: vlakno.name for vlakno in threading.enumerate()}
+        with self._zamek:
+            stopa = list(self.stopa)
+            zaseknuti = list(self.zaseknuti)
+        udalosti = [
+            {"name": "thread_name", "ph": "M", "pid": pid, "tid": ident, "args": {"name": jmeno}}
+            for ident, jmeno in jmena.items()
+        ]
+        for nazev, od, do, vlakno in stopa:
+            udalosti.append({
+                "name": nazev, "ph": "X", "pid": pid, "tid": vlakno,
+                "ts": (od - START) * 1e6, "dur": (do - od) * 1e6,
+            })
+        for z in zaseknuti:
+            udalosti.append({
+                "name": "zaseknutí GUI", "cat": "zaseknuti", "ph": "X", "pid": pid, "tid": self._hlavni,
+                "ts": (z["od"] - START) * 1e6, "dur": (z["do"] - z["od"]) * 1e6,
+                "args": {"useky": z["useky"], "zasobnik": z["zasobnik"]},
+            })
+        return {"traceEvents": udalosti, "displayTimeUnit": "ms"}
+
+    def exportovat(self, slozka):
+        """Uloží souhrn (JSON) a stopu (Chrome trace) vedle sebe, vrátí cesty k oběma."""
+        os.makedirs(slozka, exist_ok=True)
+        razitko = time.strftime("%Y%m%d-%H%M%S")
+        souhrn = os.path.join(slozka, f"vykon-{razitko}.json")
+        stopa = os.path.join(slozka, f"vykon-{razitko}.trace.json")
+        with open(souhrn, "w", encoding="utf-8") as f:
+            json.dump(self.souhrn(), f, ensure_ascii=False, indent=2)
+        with open(stopa, "w", encoding="utf-8") as f:
+            json.dump(self.chrome_trace(), f, ensure_ascii=False)
+        return souhrn, stopa
+
+
+instrumentace = Instrumentace()
+
+
+def mereno(nazev):
+    """Dekorátor: změří každé volání funkce jako úsek `nazev`, když je měření zapnuté."""
+    def obalit(funkce):
+        @functools.wraps(funkce)
+        def obalena(*args, **kwargs):
+            if not instrumentace.zapnuto:
+                return funkce(*args, **kwargs)
+            with _Usek(instrumentace, nazev):
+                return funkce(*args, **kwargs)
+        return obalena
+    return obalit
@@ -0,0 +1,279 @@
+import bisect
+import heapq
+import time
+from array import array
+
+DEN = 86400
+
+TEXT, CISLO, CAS = "text", "cislo", "cas"
+
+# Pole pravidel = sloupce indexu i TabulkaSkladeb: (popisek, druh); délka je v sekundách,
+# časy jsou unixové a v pravidlech se zadávají ve dnech
+POLE = {
+    "title": ("Název", TEXT),
+    "artist": ("Interpret", TEXT),
+    "album": ("Album", TEXT),
+    "genre": ("Žánr", TEXT),
+    "duration": ("Délka", CISLO),
+    "plays": ("Počet přehrání", CISLO),
+    "added": ("Přidáno", CAS),
+    "last_played": ("Naposledy hráno", CAS),
+}
+OPERATORY = {
+    TEXT: ("obsahuje", "neobsahuje", "je", "není", "začíná"),
+    CISLO: ("<", "<=", ">", ">=", "="),
+    CAS: ("za posledních", "před více než"),
+}
+# Řadit jde jen podle čísel, klíč řazení je pak (hodnota, id) stejně jako v SQL
+RAZENI = ("plays", "added", "last_played", "duration")
+
+
+class ChybaPravidla(ValueError):
+    """Pravidlo chytrého playlistu nejde přeložit (neznámé pole, operátor nebo hodnota)."""
+
+
+class _Podminka:
+    __slots__ = ("pole", "op", "hodnota", "druh")
+
+    def __init__(self, pravidlo):
+        self.pole = pravidlo.get("pole")
+        if self.pole not in POLE:
+            raise ChybaPravidla(f"Neznámé pole: {self.pole}")
+        self.druh = POLE[self.pole][1]
+        self.op = pravidlo.get("op")
+        if self.op not in OPERATORY[self.druh]:
+            raise ChybaPravidla(f"Pole {self.pole} nezná operátor {self.op}")
+        try:
+            hodnota = pravidlo.get("hodnota", "")
+            self.hodnota = str(hodnota).casefold() if self.druh == TEXT else float(hodnota)
+        except (TypeError, ValueError):
+            raise ChybaPravidla(f"Neplatná hodnota pro {self.pole}: {pravidlo.get('hodnota')!r}")
+
+    def sql(self, ted):
+        pole, h = self.pole, self.hodnota
+        if self.druh == TEXT:
+            if self.op == "obsahuje":
+                return f"instr(casefold({pole}), ?) > 0", [h]
+            if self.op == "neobsahuje":
+                return f"instr(casefold({pole}), ?) = 0", [h]
+            if self.op == "je":
+                return f"casefold({pole}) = ?", [h]
+            if self.op == "není":
+                return f"casefold({pole}) != ?", [h]
+            return f"substr(casefold({pole}), 1, ?) = ?", [len(h), h]
+        if self.druh == CISLO:
+            return f"{pole} {self.op} ?", [h]
+        hranice = ted - h * DEN
+        return (f"{pole} >= ?" if self.op == "za posledních" else f"{pole} < ?"), [hranice]
+
+    def plati(self, sloupec, id, ted):
+        v, h = sloupec[id], self.hodnota
+        if self.druh == TEXT:
+            v = v.casefold()
+            if self.op == "obsahuje":
+                return h in v
+            if self.op == "neobsahuje":
+                return h not in v
+            if self.op == "je":
+                return v == h
+            if self.op == "není":
+                return v != h
+            return v.startswith(h)
+        if self.druh == CISLO:
+            if self.op == "<":
+                return v < h
+            if self.op == "<=":
+                return v <= h
+            if self.op == ">":
+                return v > h
+            if self.op == ">=":
+                return v >= h
+            return v == h
+        hranice = ted - h * DEN
+        return v >= hranice if self.op == "za posledních" else v < hranice
+
+    def zmena(self, sloupec, id, ted):
+        # Časová podmínka se u skladby překlopí, až její čas vypadne z okna posledních N dní
+        if self.druh != CAS:
+            return None
+        cas = sloupec[id] + self.hodnota * DEN
+        return cas if cas > ted else None
+
+
+class Dotaz:
+    """Přeložená pravidla: SQL pro první vyhodnocení nad indexem a predikát nad tabulkou.
+
+    Obojí dává stejný výsledek (texty se v SQL porovnávají přes funkci casefold
+    registrovanou v IndexKnihovny), takže po prvním dotazu stačí přepočítávat jen
+    skladby, které se změnily.
+    """
+
+    def __init__(self, pravidla):
+        self.podminky = [_Podminka(p) for p in pravidla.get("podminky", ())]
+        self.vse = pravidla.get("shoda", "vse") != "kterakoli"
+        self.razeni = pravidla.get("razeni") or None
+        if self.razeni is not None and self.razeni not in RAZENI:
+            raise ChybaPravidla(f"Podle pole {self.razeni} řadit nejde")
+        self.sestupne = bool(pravidla.get("sestupne", True))
+        self.limit = int(pravidla.get("limit") or 0) if self.razeni else 0
+        self.casove = [p for p in self.podminky if p.druh == CAS]
+
+    def sql(self, ted):
+        casti, parametry = [], []
+        for podminka in self.podminky:
+            cast, hodnoty = podminka.sql(ted)
+            casti.append(f"({cast})")
+            parametry.extend(hodnoty)
+        kde = "present = 1"
+        if casti:
+            kde += f" AND ({(' AND ' if self.vse else ' OR ').join(casti)})"
+        if self.razeni:
+            poradi = f"{self.razeni} {'DESC' if self.sestupne else 'ASC'}, id"
+        else:
+            poradi = "path"
+        return f"SELECT id FROM tracks WHERE {kde} ORDER BY {poradi}", parametry
+
+    def sql_casovych_kandidatu(self, ted):
+        """Skladby, u kterých se některá časová podmínka časem překlopí."""
+        casti = [f"{p.pole} >= ?" for p in self.casove]
+        parametry = [ted - p.hodnota * DEN for p in self.casove]
+        return f"SELECT id FROM tracks WHERE present = 1 AND ({' OR '.join(casti)})", parametry
+
+    def plati(self, tabulka, id, ted):
+        if id not in tabulka:
+            return False
+        vysledky = (p.plati(getattr(tabulka, p.pole), id, ted) for p in self.podminky)
+        return all(vysledky) if self.vse else any(vysledky) or not self.podminky
+
+    def klic(self, tabulka, id):
+        hodnota = getattr(tabulka, self.razeni)[id]
+        return (-hodnota if self.sestupne else hodnota, id)
+
+    def dalsi_zmena(self, tabulka, id, ted):
+        casy = [p.zmena(getattr(tabulka, p.pole), id, ted) for p in self.casove]
+        casy = [cas for cas in casy if cas is not None]
+        return min(casy) if casy else None
+
+
+class ChytryPlaylist:
+    """Playlist z pravidel, který se po prvním dotazu jen průběžně opravuje.
+
+    Členy jsou v `skladby` (array("i") jako u běžných playlistů, takže ho zobrazení,
+    hledání i fronta berou stejně). Při změně skladeb se vyhodnotí jen ty změněné:
+    u neřazeného playlistu se připojí nebo vyjmou, u řazeného se přesunou bisekcí.
+    Časové podmínky ("za posledních 7 dní") mají haldu okamžiků, kdy se u které
+    skladby překlopí, a `vyprsele` přepočítá jen ty.
+    """
+
+    def __init__(self, nazev, pravidla):
+        self.nazev = nazev
+        self.pravidla = pravidla
+        self.dotaz = Dotaz(pravidla)
+        self.skladby = array("i")
+        self.clenove = set()
+        self._serazene = []     # klíče (hodnota, id) všech členů u řazeného playlistu
+        self._klice = {}        # id -> klíč v _serazene
+        self._zmeny = []        # halda (čas, id) časových podmínek
+
+    def naplnit(self, conn, tabulka, ted=None):
+        """První vyhodnocení jedním dotazem do indexu."""
+        ted = time.time() if ted is None else ted
+        dotaz, parametry = self.dotaz.sql(ted)
+        ids = [radek[0] for radek in conn.execute(dotaz, parametry) if radek[0] in tabulka]
+        self.clenove = set(ids)
+        if self.dotaz.razeni:
+            self._serazene = [self.dotaz.klic(tabulka, id) for id in ids]
+            self._klice = {klic[1]: klic for klic in self._serazene}
+            ids = ids[:self.dotaz.limit] if self.dotaz.limit else ids
+        self.skladby[:] = array("i", ids)
+        self._zmeny = []
+        if self.dotaz.casove:
+            dotaz, parametry = self.dotaz.sql_casovych_kandidatu(ted)
+            for (id,) in conn.execute(dotaz, parametry):
+                if id in tabulka:
+                    self._naplanovat(tabulka, id, ted)
+
+    def _naplanovat(self, tabulka, id, ted):
+        cas = self.dotaz.dalsi_zmena(tabulka, id, ted)
+        if cas is not None:
+            heapq.heappush(self._zmeny, (cas, id))
+
+    def aktualizovat(self, tabulka, ids, ted=None):
+        """Znovu vyhodnotí jen dané skladby; vrátí True, když se obsah `skladby` změnil."""
+        ted = time.time() if ted is None else ted
+        zmeneno = False
+        odebrat = set()
+        for id in ids:
+            plati = self.dotaz.plati(tabulka, id, ted)
+            if self.dotaz.razeni:
+                zmeneno |= self._preradit(tabulka, id, plati)
+            elif plati and id not in self.clenove:
+                self.clenove.add(id)
+                self.skladby.append(id)
+                zmeneno = True
+            elif not plati and id in self.clenove:
+                self.clenove.discard(id)
+                odebrat.add(id)
+            if self.dotaz.casove:
+                self._naplanovat(tabulka, id, ted)
+        if odebrat:
+            # Po jedné je to posun pole v C, po stovkách se vyplatí jeden průchod
+            if len(odebrat) <= 32:
+                for id in odebrat:
+                    self.skladby.remove(id)
+            else:
+                self.skladby[:] = array("i", (s for s in self.skladby if s not in odebrat))
+            zmeneno = True
+        return zmeneno
+
+    def _preradit(self, tabulka, id, plati):
+        stary = self._klice.get(id)
+        novy = self.dotaz.klic(tabulka, id) if plati else None
+        if stary == novy:
+            return False
+        limit = self.dotaz.limit
+        if stary is not None:
+            i = bisect.bisect_left(self._serazene, stary)
+            del self._serazene[i]
+            del self._klice[id]
+            self.clenove.discard(id)
+            if i < len(self.skladby):
+                del self.skladby[i]
+                if limit and len(self._serazene) >= limit:
+                    self.skladby.append(self._serazene[limit - 1][1])
+        if novy is not None:
+            i = bisect.bisect_left(self._serazene, novy)
+            self._serazene.insert(i, novy)
+            self._klice[id] = novy
+            self.clenove.add(id)
+            if not limit or i < limit:
+                self.skladby.insert(i, id)
+                if limit and len(self.skladby) > limit:
+                    self.skladby.pop()
+        return True
+
+    def dalsi_cas(self):
+        return self._zmeny[0][0] if self._zmeny else None
+
+    def vyprsele(self, tabulka, ted=None):
+        """Přepočítá skladby, u kterých už nastal čas překlopení; True při změně obsahu."""
+        ted = time.time() if ted is None else ted
+        ids = set()
+        while self._zmeny and self._zmeny[0][0] <= ted:
+            ids.add(heapq.heappop(self._zmeny)[1])
+        return self.aktualizovat(tabulka, ids, ted) if ids else False
+
+
+def vyhodnotit(pravidla, conn, tabulka):
+    """{název: ChytryPlaylist} naplněné z indexu; playlist s neplatnými pravidly se přeskočí."""
+    chytre = {}
+    ted = time.time()
+    for nazev, jeho in pravidla.items():
+        try:
+            playlist = ChytryPlaylist(nazev, jeho)
+        except ChybaPravidla as e:
+            print(f"Chytrý playlist '{nazev}' nejde vyhodnotit: {e}")
+            continue
+        playlist.naplnit(conn, tabulka, ted)
+        chytre[nazev] = playlist
+    return chytre
@@ -0,0 +1,165 @@
+from PySide6.QtWidgets import (
+    QCheckBox, QComboBox, QDialog, QDialogButtonBox, QFormLayout, QHBoxLayout, QLabel,
+    QLineEdit, QMessageBox, QPushButton, QSpinBox, QVBoxLayout, QWidget
+)
+
+from chytre import CAS, CISLO, OPERATORY, POLE, RAZENI, ChybaPravidla, Dotaz
+
+# V dialogu se délka zadává v minutách, v pravidlech (a v indexu) je v sekundách
+JEDNOTKY = {"duration": ("min", 60)}
+POPISKY_RAZENI = {
+    "plays": "Počtu přehrání",
+    "added": "Data přidání",
+    "last_played": "Posledního přehrání",
+    "duration": "Délky",
+}
+
+
+class RadekPodminky(QWidget):
+    """Jedna podmínka: pole, operátor a hodnota."""
+
+    def __init__(self, odebrat, parent=None):
+        super().__init__(parent)
+        layout = QHBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        self.pole = QComboBox()
+        for klic, (popisek, _) in POLE.items():
+            self.pole.addItem(popisek, klic)
+        self.op = QComboBox()
+        self.hodnota = QLineEdit()
+        self.jednotka = QLabel()
+        smazat = QPushButton("✕")
+        smazat.setFixedWidth(28)
+        smazat.clicked.connect(lambda: odebrat(self))
+        for widget in (self.pole, self.op):
+            layout.addWidget(widget)
+        layout.addWidget(self.hodnota, 1)
+        layout.addWidget(self.jednotka)
+        layout.addWidget(smazat)
+        self.pole.currentIndexChanged.connect(self._zmena_pole)
+        self._zmena_pole()
+
+    def _zmena_pole(self):
+        klic = self.pole.currentData()
+        druh = POLE[klic][1]
+        self.op.clear()
+        self.op.addItems(OPERATORY[druh])
+        if druh == CAS:
+            self.jednotka.setText("dní")
+        else:
+            self.jednotka.setText(JEDNOTKY.get(klic, ("",))[0])
+
+    def nastavit(self, pravidlo):
+        self.pole.setCurrentIndex(max(self.pole.findData(pravidlo.get("pole")), 0))
+        self.op.setCurrentIndex(max(self.op.findText(pravidlo.get("op", "")), 0))
+        hodnota = pravidlo.get("hodnota", "")
+        nasobek = JEDNOTKY.get(self.pole.currentData(), (None, 1))[1]
+        if nasobek != 1 and isinstance(hodnota, (int, float)):
+            hodnota = f"{hodnota / nasobek:g}"
+        self.hodnota.setText(str(hodnota))
+
+    def pravidlo(self):
+        klic = self.pole.currentData()
+        hodnota = self.hodnota.text().strip()
+        if POLE[klic][1] in (CISLO, CAS):
+            try:
+                hodnota = float(hodnota.replace(",", "."))
+            except ValueError:
+                raise ChybaPravidla(f"Hodnota pro '{POLE[klic][0]}' musí být číslo.")
+            hodnota *= JEDNOTKY.get(klic, (None, 1))[1]
+        return {"pole": klic, "op": self.op.currentText(), "hodnota": hodnota}
+
+
+class DialogChytrehoPlaylistu(QDialog):
+    """Úprava pravidel chytrého playlistu; výsledek je slovník pro chytre.Dotaz."""
+
+    def __init__(self, nazev="", pravidla=None, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Chytrý playlist")
+        self.setMinimumWidth(520)
+        pravidla = pravidla or {"podminky": [{"pole": "artist", "op": "obsahuje", "hodnota": ""}]}
+
+        layout = QVBoxLayout(self)
+        formular = QFormLayout()
+        self.nazev = QLineEdit(nazev)
+        formular.addRow("Název:", self.nazev)
+        self.shoda = QComboBox()
+        self.shoda.addItem("všem podmínkám", "vse")
+        self.shoda.addItem("kterékoli podmínce", "kterakoli")
+        self.shoda.setCurrentIndex(max(self.shoda.findData(pravidla.get("shoda", "vse")), 0))
+        formular.addRow("Skladba odpovídá:", self.shoda)
+        layout.addLayout(formular)
+
+        self.podminky = QVBoxLayout()
+        layout.addLayout(self.podminky)
+        self.radky = []
+        for pravidlo in pravidla.get("podminky", ()):
+            self.pridat_podminku().nastavit(pravidlo)
+        pridat = QPushButton("Přidat podmínku")
+        pridat.clicked.connect(self.pridat_podminku)
+        layout.addWidget(pridat)
+
+        razeni = QHBoxLayout()
+        self.razeni = QComboBox()
+        self.razeni.addItem("Neřadit", None)
+        for klic in RAZENI:
+            self.razeni.addItem(POPISKY_RAZENI[klic], klic)
+        self.razeni.setCurrentIndex(max(self.razeni.findData(pravidla.get("razeni")), 0))
+        self.sestupne = QCheckBox("sestupně")
+        self.sestupne.setChecked(pravidla.get("sestupne", True))
+        self.limit = QSpinBox()
+        self.limit.setRange(0, 100000)
+        self.limit.setSpecialValueText("bez omezení")
+        self.limit.setValue(int(pravidla.get("limit") or 0))
+        razeni.addWidget(QLabel("Řadit podle:"))
+        razeni.addWidget(self.razeni)
+        razeni.addWidget(self.sestupne)
+        razeni.addWidget(QLabel("Nejvýš skladeb:"))
+        razeni.addWidget(self.limit)
+        layout.addLayout(razeni)
+        self.razeni.currentIndexChanged.connect(self._zmena_razeni)
+        self._zmena_razeni()
+
+        tlacitka = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel)
+        tlacitka.accepted.connect(self.accept)
+        tlacitka.rejected.connect(self.reject)
+        layout.addWidget(tlacitka)
+
+    def _zmena_razeni(self):
+        # Limit má smysl jen u řazeného playlistu ("50 nejhranějších")
+        razeno = self.razeni.currentData() is not None
+        self.sestupne.setEnabled(razeno)
+        self.limit.setEnabled(razeno)
+
+    def pridat_podminku(self):
+        radek = RadekPodminky(self.odebrat_podminku)
+        self.radky.append(radek)
+        self.podminky.addWidget(radek)
+        return radek
+
+    def odebrat_podminku(self, radek):
+        self.radky.remove(radek)
+        radek.deleteLater()
+
+    def pravidla(self):
+        pravidla = {
+            "podminky": [radek.pravidlo() for radek in self.radky],
+            "shoda": self.shoda.currentData(),
+        }
+        if self.razeni.currentData() is not None:
+            pravidla["razeni"] = self.razeni.currentData()
+            pravidla["sestupne"] = self.sestupne.isChecked()
+            pravidla["limit"] = self.limit.value()
+        Dotaz(pravidla)     # ověření, ať se do databáze nedostane nepřeložitelné pravidlo
+        return pravidla
+
+    def accept(self):
+        if not self.nazev.text().strip():
+            QMessageBox.warning(self, "Chyba", "Zadejte název playlistu.")
+            return
+        try:
+            self.pravidla()
+        except ChybaPravidla as e:
+            QMessageBox.warning(self, "Chyba", str(e))
+            return
+        super().accept()
@@ -0,0 +1,278 @@
+"""Dávkové úlohy nad knihovnou přehrávače bez okna, Qt a zvukového zařízení.
+
+    python cli.py scan [SLOŽKA ...]               # sken knihovny (se složkami je přidá) a dohledání přesunutých
+    python cli.py index-stats [--json]            # souhrn indexu a playlistů
+    python cli.py validate                        # index proti disku, playlisty proti indexu; při chybě kód 1
+    python cli.py export "Můj playlist" out.m3u8  # playlist do M3U/M3U8/PLS
+    python cli.py export --vse slozka/            # všechny playlisty do složky
+    python cli.py analyze                         # hlasitost skladeb, které ji ještě nemají
+    python cli.py duplicates                      # zvukové otisky a skupiny duplicitních skladeb
+
+Data (databáze) jsou tam, kde je používá okno; --data nebo CRAFTORA_DATA je přesměruje.
+Průběh se vypisuje na stderr, výsledky na stdout.
+"""
+import argparse
+import json
+import os
+import signal
+import sqlite3
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from jadro import JadroKnihovny, VLAKEN_KONTROLY
+from playlisty import VSECHNY_SKLADBY
+import prenos
+
+# Průběh se na terminálu přepisuje nejvýš takhle často
+INTERVAL_PRUBEHU_SEC = 0.2
+
+
+class Prubeh:
+    """Řádek průběhu na stderr; na terminálu se přepisuje, jinak jde po řádcích jen občas."""
+
+    def __init__(self, popis):
+        self.popis = popis
+        self.terminal = sys.stderr.isatty()
+        self._posledni = 0.0
+        self._zamek = threading.Lock()
+
+    def __call__(self, hotovo, celkem):
+        ted = time.monotonic()
+        interval = INTERVAL_PRUBEHU_SEC if self.terminal else INTERVAL_PRUBEHU_SEC * 25
+        if ted - self._posledni < interval and hotovo < celkem:
+            return
+        with self._zamek:
+            self._posledni = ted
+            text = f"{self.popis}: {hotovo}/{celkem}" if celkem else f"{self.popis}: {hotovo}"
+            print(f"\r{text}" if self.terminal else text, end="" if self.terminal else "\n",
+                  file=sys.stderr, flush=True)
+
+    def konec(self):
+        if self.terminal and self._posledni:
+            print(file=sys.stderr)
+
+
+def spustit_ulohu(uloha, prubeh=None):
+    """Úlohu jádra pustí ve vlákně, ať Ctrl+C v hlavním vlákně může úlohu slušně zrušit."""
+    vysledek = {}
+
+    def beh():
+        try:
+            vysledek["hodnota"] = uloha.spustit()
+        except BaseException as e:
+            vysledek["chyba"] = e
+
+    vlakno = threading.Thread(target=beh, name="uloha", daemon=True)
+    vlakno.start()
+    try:
+        while vlakno.is_alive():
+            vlakno.join(0.2)
+    except KeyboardInterrupt:
+        print("\nRuším...", file=sys.stderr)
+        uloha.zrusit()
+        vlakno.join()
+        raise
+    finally:
+        if prubeh is not None:
+            prubeh.konec()
+    if "chyba" in vysledek:
+        raise vysledek["chyba"]
+    return vysledek["hodnota"]
+
+
+def cas(sekund):
+    hodin, zbytek = divmod(int(sekund), 3600)
+    return f"{hodin}:{zbytek // 60:02d}:{zbytek % 60:02d}"
+
+
+def velikost(bajtu):
+    for jednotka in ("B", "kB", "MB"):
+        if bajtu < 1024:
+            return f"{bajtu:.0f} {jednotka}"
+        bajtu /= 1024
+    return f"{bajtu:.1f} GB"
+
+
+def jmeno_souboru(nazev, pripona):
+    # Název playlistu jako jméno souboru: bez hvězdičky All Tracks a oddělovačů cest
+    jmeno = nazev.replace("⭐", "").strip().replace("/", "_").replace("\\", "_") or "playlist"
+    return f"{jmeno}.{pripona}"
+
+
+def prikaz_scan(jadro, args):
+    for slozka in args.slozky:
+        if not os.path.isdir(slozka):
+            print(f"Složka neexistuje: {slozka}", file=sys.stderr)
+            return 2
+    prubeh = Prubeh("Skenuji")
+    sken = jadro.sken(args.slozky, args.procesu, pri_prubehu=prubeh)
+    if not sken.cile:
+        print("Knihovna nemá žádné složky, zadejte složku: cli.py scan SLOŽKA", file=sys.stderr)
+        return 2
+    print(f"Skenuji hudbu v: {', '.join(slozka for slozka, _ in sken.cile)}", file=sys.stderr)
+    pridano, zmeneno, odebrano = spustit_ulohu(sken, prubeh)
+    print(f"Sken hotov: +{pridano} ~{zmeneno} -{odebrano}")
+    if not args.bez_kontroly:
+        premapovano, chybi = spustit_ulohu(jadro.kontrola())
+        if premapovano:
+            print(f"Znovu nalezeno {premapovano} přesunutých skladeb")
+        if chybi:
+            print(f"Skladby z playlistů, které se nepodařilo najít: {chybi}")
+    return 0
+
+
+def prikaz_index_stats(jadro, args):
+    stat = jadro.statistika()
+    if args.json:
+        json.dump(stat, sys.stdout, ensure_ascii=False, indent=2)
+        print()
+        return 0
+    print(f"Databáze:          {stat['databaze']} ({velikost(stat['velikost_databaze'])}, "
+          f"schéma {stat['verze_schematu']})")
+    print(f"Složky knihovny:   {', '.join(stat['koreny']) or '-'}")
+    print(f"Skladby:           {stat['skladby']} ({cas(stat['delka_sekund'])}, "
+          f"{velikost(stat['velikost_souboru'])})")
+    print(f"Mimo knihovnu:     {stat['mimo_knihovnu']}")
+    print(f"Změřená hlasitost: {stat['analyzovano']}/{stat['skladby']}")
+    print(f"S otiskem:         {stat['s_otiskem']}")
+    print(f"Zvukový otisk:     {stat['se_zvukovym_otiskem']}/{stat['skladby']}")
+    print(f"Formáty:           {', '.join(f'{k} {v}' for k, v in stat['formaty'].items()) or '-'}")
+    print(f"Playlisty:         {stat['playlisty']} ({stat['polozky_playlistu']} položek), "
+          f"chytré {stat['chytre_playlisty']}")
+    return 0
+
+
+def prikaz_validate(jadro, args):
+    prubeh = Prubeh("Ověřuji soubory")
+    # Index se čte spojením hlavního vlákna, kontrola proto běží tady; Ctrl+C ji jen
+    # požádá o konec a vypíše se, co se stihlo najít
+    zruseno = threading.Event()
+    puvodni = signal.signal(signal.SIGINT, lambda *_: zruseno.set())
+    try:
+        problemy = jadro.validovat(args.vlaken, pri_prubehu=prubeh, zruseno=zruseno)
+    finally:
+        signal.signal(signal.SIGINT, puvodni)
+        prubeh.konec()
+    for druh, podrobnosti in problemy:
+        print(f"{druh}: {podrobnosti}")
+    if zruseno.is_set():
+        print("Kontrola zrušena, výsledek je neúplný", file=sys.stderr)
+        return 130
+    if problemy:
+        print(f"Nalezeno problémů: {len(problemy)} (opraví je sken)", file=sys.stderr)
+        return 1
+    print("Knihovna je v pořádku", file=sys.stderr)
+    return 0
+
+
+def prikaz_export(jadro, args):
+    jadro.nacist()
+    if args.vse:
+        slozka = Path(args.playlist)
+        slozka.mkdir(parents=True, exist_ok=True)
+        ulohy = {
+            nazev: slozka / jmeno_souboru(nazev, args.format)
+            for nazev in jadro.playlists if nazev != VSECHNY_SKLADBY
+        }
+    else:
+        if args.playlist not in jadro.playlists:
+            print(f"Playlist neexistuje: {args.playlist}", file=sys.stderr)
+            return 2
+        cesta = args.cil or jmeno_souboru(args.playlist, args.format)
+        if not cesta.lower().endswith(prenos.PRIPONY):
+            cesta += f".{args.format}"
+        ulohy = {args.playlist: cesta}
+
+    # Každý playlist je samostatný soubor, zapisují se souběžně; tabulka se jen čte
+    chyby = 0
+    with ThreadPoolExecutor(max_workers=max(1, args.procesu or os.cpu_count() or 1)) as pool:
+        budouci = {nazev: pool.submit(jadro.exportovat, nazev, str(cesta)) for nazev, cesta in ulohy.items()}
+        for nazev, vysledek in budouci.items():
+            try:
+                print(f"{nazev}: {vysledek.result()} skladeb -> {ulohy[nazev]}")
+            except OSError as e:
+                print(f"{nazev}: nepodařilo se uložit: {e}", file=sys.stderr)
+                chyby += 1
+    return 1 if chyby else 0
+
+
+def prikaz_analyze(jadro, args):
+    prubeh = Prubeh("Analyzuji hlasitost")
+    zmereno = spustit_ulohu(jadro.analyza(args.procesu, pri_prubehu=prubeh), prubeh)
+    print(f"Analýza hlasitosti hotova: {zmereno} skladeb")
+    return 0
+
+
+def prikaz_duplicates(jadro, args):
+    # Otisky se ukládají průběžně; po Ctrl+C se příště počítají jen zbylé skladby
+    prubeh = Prubeh("Zvukové otisky")
+    skupiny = spustit_ulohu(jadro.hledani_duplicit(args.procesu, pri_prubehu=prubeh), prubeh)
+    cesty = dict(jadro.index.conn.execute("SELECT id, path FROM tracks WHERE present = 1"))
+    if args.json:
+        json.dump([{"podobnost": round(podobnost, 3), "cesty": [cesty.get(s) for s in skladby]}
+                   for skladby, podobnost in skupiny], sys.stdout, ensure_ascii=False, indent=2)
+        print()
+        return 0
+    for i, (skladby, podobnost) in enumerate(skupiny, 1):
+        print(f"Skupina {i} (podobnost {podobnost:.0%}):")
+        for skladba in skladby:
+            print(f"  {cesty.get(skladba)}")
+    print(f"Skupin duplicit: {len(skupiny)}", file=sys.stderr)
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data", help="složka s databází knihovny (výchozí jako u okna)")
+    prikazy = parser.add_subparsers(dest="prikaz", required=True)
+
+    scan = prikazy.add_parser("scan", help="proskenuje knihovnu a dohledá přesunuté skladby")
+    scan.add_argument("slozky", nargs="*", help="složky k přidání; bez nich se skenují všechny složky knihovny")
+    scan.add_argument("--procesu", type=int, help="procesů pro čtení tagů (výchozí podle počtu jader)")
+    scan.add_argument("--bez-kontroly", action="store_true", help="nedohledávat přesunuté skladby z playlistů")
+    scan.set_defaults(funkce=prikaz_scan)
+
+    stats = prikazy.add_parser("index-stats", help="souhrn indexu a playlistů")
+    stats.add_argument("--json", action="store_true", help="výstup jako JSON")
+    stats.set_defaults(funkce=prikaz_index_stats)
+
+    validate = prikazy.add_parser("validate", help="ověří index proti disku; při problémech vrátí 1")
+    validate.add_argument("--vlaken", type=int, default=VLAKEN_KONTROLY, help="souběžně ověřovaných souborů")
+    validate.set_defaults(funkce=prikaz_validate)
+
+    export = prikazy.add_parser("export", help="uloží playlist do M3U/M3U8/PLS")
+    export.add_argument("playlist", help="název playlistu, s --vse cílová složka")
+    export.add_argument("cil", nargs="?", help="cílový soubor (výchozí název playlistu v aktuální složce)")
+    export.add_argument("--vse", action="store_true", help="všechny playlisty do složky")
+    export.add_argument("--format", choices=("m3u8", "m3u", "pls"), default="m3u8")
+    export.add_argument("--procesu", type=int, help="souběžně zapisovaných playlistů")
+    export.set_defaults(funkce=prikaz_export)
+
+    analyze = prikazy.add_parser("analyze", help="změří hlasitost skladeb, které ji ještě nemají")
+    analyze.add_argument("--procesu", type=int, help="procesů pro dekódování (výchozí polovina jader)")
+    analyze.set_defaults(funkce=prikaz_analyze)
+
+    duplicates = prikazy.add_parser("duplicates", help="najde duplicitní skladby podle zvukového otisku")
+    duplicates.add_argument("--procesu", type=int, help="procesů pro dekódování (výchozí polovina jader)")
+    duplicates.add_argument("--json", action="store_true", help="výstup jako JSON")
+    duplicates.set_defaults(funkce=prikaz_duplicates)
+
+    args = parser.parse_args(argv)
+    try:
+        jadro = JadroKnihovny(args.data)
+    except (OSError, sqlite3.Error) as e:
+        print(f"Knihovnu nejde otevřít: {e}", file=sys.stderr)
+        return 2
+    try:
+        return args.funkce(jadro, args)
+    except KeyboardInterrupt:
+        return 130
+    finally:
+        jadro.zavrit()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
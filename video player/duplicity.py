@@ -0,0 +1,237 @@
+import threading
+
+from analyza import pocet_procesu, zpracovat_v_procesech
+from knihovna import IndexKnihovny
+import zvuk
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Otisk se počítá z prvních sekund skladby převedených na mono 8 kHz; kopie téže skladby
+# v jiném datovém toku nebo s jinými tagy mají stejné špičky spektra
+DELKA_SEC = 60
+CILOVE_VZORKOVANI = 8000
+OKNO = 1024
+KROK = 256
+# Pásmo 100 Hz - 3 kHz (biny po 7,8 Hz); výšky kodeky ořezávají různě, basy jsou rozmazané
+PASMO_OD, PASMO_DO = 13, 385
+# Špička je maximum v okolí ±10 binů a ±6 rámců; nejsilnějších nejvýš 8 za sekundu
+SOUSEDI_F = 10
+SOUSEDI_T = 6
+SPICEK_ZA_SEKUNDU = 8
+# Každá špička se páruje s několika následujícími do vzdálenosti 63 rámců (asi 2 s)
+PARU_NA_SPICKU = 4
+MAX_DT = 63
+# Ukládá se jen každý osmý hash (vždy tytéž), otisk má pak kolem kilobajtu
+VYBER_BITU = 3
+
+# Duplicita: aspoň tolik společných hashů a takový podíl kratšího otisku
+MIN_SPOLECNYCH = 12
+MIN_PODOBNOST = 0.3
+# Hash, který má víc skladeb, nic nerozliší (ticho, šum) a jen by zdržoval
+MAX_VYSKYT = 200
+
+
+def _nic(*_):
+    pass
+
+
+def _maximum(x, polomer, osa):
+    # Klouzavé maximum přes ±polomer podél osy, bez SciPy
+    okraj = [(0, 0)] * x.ndim
+    okraj[osa] = (polomer, polomer)
+    x = np.pad(x, okraj, constant_values=-1.0)
+    return np.lib.stride_tricks.sliding_window_view(x, 2 * polomer + 1, axis=osa).max(axis=-1)
+
+
+def zvukovy_otisk(vzorky, vzorkovani):
+    """Seřazené jedinečné hashe dvojic špiček spektra (np.uint32) z pole (vzorky, kanály) int16.
+
+    Hash je (frekvence první špičky, frekvence druhé, jejich vzdálenost v rámcích), takže
+    nezávisí na hlasitosti, posunu začátku ani na tom, kde v souboru skladba leží.
+    Spektrum všech rámců je jedna rfft nad pohledem do pole, špičky dvě klouzavá maxima.
+    """
+    vzorky = vzorky[:vzorkovani * DELKA_SEC]
+    mono = vzorky.mean(axis=1, dtype=np.float32) if vzorky.ndim == 2 else vzorky.astype(np.float32)
+    # Průměr bloků je zároveň hrubá dolní propust; pro všechny kopie stejná, na tom záleží
+    krok = max(1, vzorkovani // CILOVE_VZORKOVANI)
+    mono = mono[:len(mono) // krok * krok].reshape(-1, krok).mean(axis=1)
+    if len(mono) < OKNO * 4:
+        return np.empty(0, dtype=np.uint32)
+
+    ramce = np.lib.stride_tricks.sliding_window_view(mono, OKNO)[::KROK]
+    spektrum = np.abs(np.fft.rfft(ramce * np.hanning(OKNO).astype(np.float32), axis=1))
+    spektrum = spektrum[:, PASMO_OD:PASMO_DO].astype(np.float32)
+
+    maxima = _maximum(_maximum(spektrum, SOUSEDI_F, 1), SOUSEDI_T, 0)
+    t, f = np.nonzero((spektrum == maxima) & (spektrum > spektrum.mean()))
+    limit = int(SPICEK_ZA_SEKUNDU * len(mono) * krok / vzorkovani)
+    if len(t) > limit:
+        # Nejsilnější špičky, pořadí podle času zůstane
+        nejsilnejsi = np.sort(np.argpartition(spektrum[t, f], -limit)[-limit:])
+        t, f = t[nejsilnejsi], f[nejsilnejsi]
+
+    t = t.astype(np.int64)
+    f = f.astype(np.uint32)
+    hashe = []
+    for k in range(1, PARU_NA_SPICKU + 1):
+        dt = t[k:] - t[:-k]
+        platne = (dt > 0) & (dt <= MAX_DT)
+        hashe.append((f[:-k][platne] << 15) | (f[k:][platne] << 6) | dt[platne].astype(np.uint32))
+    hashe = np.concatenate(hashe)
+    # Výběr podle promíchaného hashe, ať nezávisí na frekvenci: u všech kopií tytéž hashe
+    smichane = (hashe.astype(np.uint64) * 0x9E3779B1) & 0xFFFFFFFF
+    return np.unique(hashe[(smichane >> (32 - VYBER_BITU)) == 0])
+
+
+def otisknout(skladba, cesta):
+    """Běží v pracovním procesu; vrátí (id, otisk jako bajty), při chybě (id, None)."""
+    try:
+        vzorky, vzorkovani = zvuk.dekodovat(cesta)
+    except zvuk.ChybaZvuku as e:
+        print(f"Nelze dekódovat '{cesta}' pro hledání duplicit: {e}")
+        return skladba, None
+    return skladba, zvukovy_otisk(vzorky, vzorkovani).astype("<u4").tobytes()
+
+
+class IndexOtisku:
+    """Invertovaný index hash -> skladby jako dvě seřazená pole místo slovníku seznamů.
+
+    Pro 100k skladeb je to kolem 25 milionů dvojic po 8 B, tedy asi 200 MB; při stavbě
+    přibude na chvíli ještě pořadí řazení (int64, dalších 200 MB). Dotaz za celý otisk
+    je dvakrát searchsorted a jeden np.unique.
+    """
+
+    def __init__(self, otisky):
+        ids = list(otisky)
+        self.delky = {skladba: len(otisky[skladba]) for skladba in ids}
+        hashe = np.concatenate([otisky[skladba] for skladba in ids])
+        poradi = np.argsort(hashe, kind="stable")
+        self.hashe = hashe[poradi]
+        del hashe
+        skladby = np.repeat(np.array(ids, dtype=np.int32), [self.delky[skladba] for skladba in ids])
+        self.skladby = skladby[poradi]
+        del skladby, poradi
+
+    def kandidati(self, hashe):
+        """Skladby se společnými hashi a počty společných hashů: (pole id, pole počtů)."""
+        od = np.searchsorted(self.hashe, hashe, "left")
+        delky = np.searchsorted(self.hashe, hashe, "right") - od
+        bezne = delky <= MAX_VYSKYT
+        od, delky = od[bezne], delky[bezne]
+        celkem = int(delky.sum())
+        if not celkem:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        # Indexy všech výskytů za sebou: začátek každého úseku + pořadí uvnitř úseku
+        zacatky = np.cumsum(delky) - delky
+        pozice = np.repeat(od - zacatky, delky) + np.arange(celkem)
+        return np.unique(self.skladby[pozice], return_counts=True)
+
+
+def najit_skupiny(index, zruseno=None):
+    """Skupiny duplicit z uložených otisků: [(id skladeb, nejnižší podobnost ve skupině)].
+
+    Každá skladba se zeptá invertovaného indexu jen na skladby se společnými hashi,
+    nic se neporovnává každé s každou. Dvojice označené jako různé nikdy neskončí v jedné
+    skupině, ani přes třetí skladbu podobnou oběma.
+    """
+    otisky = {skladba: np.frombuffer(blob, dtype="<u4") for skladba, blob in index.zvukove_otisky()}
+    otisky = {skladba: hashe for skladba, hashe in otisky.items() if len(hashe) >= MIN_SPOLECNYCH}
+    if len(otisky) < 2:
+        return []
+    ignorovane = index.ignorovane_duplicity()
+    hledani = IndexOtisku(otisky)
+    rodic = {}
+    clenove = {}              # kořen -> skladby jeho skupiny
+    podobnosti = {}
+
+    def koren(skladba):
+        # Sjednocování množin; cesta ke kořeni se po cestě zkracuje
+        cesta = []
+        while skladba in rodic:
+            cesta.append(skladba)
+            skladba = rodic[skladba]
+        for uzel in cesta:
+            rodic[uzel] = skladba
+        return skladba
+
+    for skladba, hashe in otisky.items():
+        if zruseno is not None and zruseno.is_set():
+            return None
+        ids, pocty = hledani.kandidati(hashe)
+        vyber = (ids > skladba) & (pocty >= MIN_SPOLECNYCH)
+        for druha, pocet in zip(ids[vyber].tolist(), pocty[vyber].tolist()):
+            podobnost = pocet / min(len(hashe), hledani.delky[druha])
+            if podobnost < MIN_PODOBNOST:
+                continue
+            a, b = koren(skladba), koren(druha)
+            if a == b:
+                podobnosti[a] = min(podobnost, podobnosti.get(a, 1.0))
+                continue
+            skupina_a, skupina_b = clenove.get(a, [a]), clenove.get(b, [b])
+            if ignorovane and any(
+                (min(x, y), max(x, y)) in ignorovane for x in skupina_a for y in skupina_b
+            ):
+                continue
+            # Menší skupina se připojí k větší, seznamy členů se tak kopírují málo
+            if len(skupina_a) < len(skupina_b):
+                a, b, skupina_a, skupina_b = b, a, skupina_b, skupina_a
+            rodic[b] = a
+            skupina_a.extend(skupina_b)
+            clenove[a] = skupina_a
+            clenove.pop(b, None)
+            podobnosti[a] = min(podobnost, podobnosti.get(a, 1.0), podobnosti.pop(b, 1.0))
+
+    return sorted(
+        ((sorted(skladby), podobnosti.get(hlavni, 1.0)) for hlavni, skladby in clenove.items()),
+        key=lambda skupina: (-len(skupina[0]), skupina[0]),
+    )
+
+
+class HledaniDuplicit:
+    """Dopočítá chybějící zvukové otisky v procesech a najde skupiny duplicit.
+
+    Otisky se ukládají do indexu po dávkách a počítají se jen pro skladby, které je ještě
+    nemají (nové nebo změněné), takže přerušený běh nad velkou knihovnou příště pokračuje,
+    kde skončil. Průběh otisků hlásí `pri_prubehu` (hotovo, celkem); `spustit` vrátí
+    skupiny z najit_skupiny, po zrušení None.
+    """
+
+    def __init__(self, db_path, procesu=None, pri_prubehu=_nic):
+        self.db_path = db_path
+        self.procesu = procesu or pocet_procesu()
+        self.pri_prubehu = pri_prubehu
+        self._zruseno = threading.Event()
+
+    def zrusit(self):
+        self._zruseno.set()
+
+    def spustit(self):
+        if np is None:
+            print("NumPy není nainstalovaný, hledání duplicit se přeskakuje: pip install numpy")
+            return []
+        index = IndexKnihovny(self.db_path)
+        try:
+            self._otisknout(index)
+            if self._zruseno.is_set():
+                return None
+            return najit_skupiny(index, self._zruseno)
+        finally:
+            index.zavrit()
+
+    def _otisknout(self, index):
+        skladby = index.bez_zvukoveho_otisku()
+        if not skladby:
+            return
+        print(f"Počítám zvukové otisky {len(skladby)} skladeb ({self.procesu} procesů)")
+        hotovo = 0
+
+        def ulozit(davka):
+            nonlocal hotovo
+            index.ulozit_zvukove_otisky(davka)
+            hotovo += len(davka)
+            self.pri_prubehu(hotovo, len(skladby))
+
+        zpracovat_v_procesech(otisknout, skladby, ulozit, self.procesu, self._zruseno, "Zvukové otisky")
@@ -0,0 +1,161 @@
+from PySide6.QtCore import Qt
+from PySide6.QtWidgets import (
+    QCheckBox, QDialog, QHBoxLayout, QLabel, QMessageBox, QPushButton, QTreeWidget,
+    QTreeWidgetItem, QVBoxLayout
+)
+
+SLOUPCE = ("Skladba", "Datový tok", "Délka", "Velikost", "V playlistech", "Cesta")
+
+
+def _cas(sekund):
+    minut, sekund = divmod(int(sekund or 0), 60)
+    return f"{minut}:{sekund:02d}"
+
+
+class DialogDuplicit(QDialog):
+    """Nalezené duplicity po skupinách; v každé je zaškrtnutá kopie, která zůstane.
+
+    Sloučení volá `sloucit(ponechana, ostatni, smazat)`, "Nejsou duplicity"
+    `ignorovat(skladby)`; vyřízená skupina ze stromu zmizí.
+    """
+
+    def __init__(self, skupiny, tabulka, v_playlistech, sloucit, ignorovat, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Duplicitní skladby")
+        self.resize(960, 560)
+        self.sloucit = sloucit
+        self.ignorovat = ignorovat
+
+        layout = QVBoxLayout(self)
+        self.popis = QLabel()
+        layout.addWidget(self.popis)
+        self.strom = QTreeWidget()
+        self.strom.setHeaderLabels(SLOUPCE)
+        self.strom.setUniformRowHeights(True)
+        self.strom.setColumnWidth(0, 300)
+        layout.addWidget(self.strom, 1)
+        for skladby, podobnost in skupiny:
+            # Mezitím smazané nebo odebrané skladby už v tabulce nejsou
+            skladby = [s for s in skladby if s in tabulka]
+            if len(skladby) >= 2:
+                self._pridat_skupinu(tabulka, v_playlistech, skladby, podobnost)
+        self.strom.expandAll()
+        self.strom.itemChanged.connect(self._zmena_volby)
+
+        self.smazat = QCheckBox("Ostatní kopie smazat i z disku")
+        layout.addWidget(self.smazat)
+        tlacitka = QHBoxLayout()
+        for text, akce in (
+            ("Sloučit skupinu", self.sloucit_vybranou),
+            ("Sloučit všechny", self.sloucit_vse),
+            ("Nejsou duplicity", self.ignorovat_vybranou),
+        ):
+            tlacitko = QPushButton(text)
+            tlacitko.clicked.connect(akce)
+            tlacitka.addWidget(tlacitko)
+        tlacitka.addStretch()
+        zavrit = QPushButton("Zavřít")
+        zavrit.clicked.connect(self.accept)
+        tlacitka.addWidget(zavrit)
+        layout.addLayout(tlacitka)
+        self._obnovit_popis()
+
+    def _pridat_skupinu(self, tabulka, v_playlistech, skladby, podobnost):
+        skupina = QTreeWidgetItem([f"{len(skladby)} kopie, podobnost {podobnost:.0%}"])
+        # Výchozí volba: nejvyšší datový tok, pak větší soubor, pak víc playlistů
+        nejlepsi = max(skladby, key=lambda s: (
+            tabulka.bitrate[s], tabulka.size[s], v_playlistech.get(s, 0), -s
+        ))
+        for skladba in skladby:
+            titulek, interpret = tabulka.title[skladba], tabulka.artist[skladba]
+            nazev = f"{interpret} - {titulek}" if titulek and interpret else titulek or tabulka.nazev(skladba)
+            polozka = QTreeWidgetItem([
+                nazev,
+                f"{tabulka.bitrate[skladba] // 1000} kb/s" if tabulka.bitrate[skladba] else "-",
+                _cas(tabulka.duration[skladba]),
+                f"{tabulka.size[skladba] / 1048576:.1f} MB",
+                str(v_playlistech.get(skladba, 0)),
+                tabulka.cesta(skladba),
+            ])
+            polozka.setData(0, Qt.UserRole, skladba)
+            polozka.setFlags(polozka.flags() | Qt.ItemIsUserCheckable)
+            polozka.setCheckState(0, Qt.Checked if skladba == nejlepsi else Qt.Unchecked)
+            skupina.addChild(polozka)
+        self.strom.addTopLevelItem(skupina)
+        skupina.setFirstColumnSpanned(True)
+
+    def _zmena_volby(self, polozka, sloupec):
+        # Ve skupině je zaškrtnutá vždy právě jedna kopie, jako přepínač
+        skupina = polozka.parent()
+        if skupina is None or sloupec != 0:
+            return
+        self.strom.blockSignals(True)
+        if polozka.checkState(0) == Qt.Checked:
+            for i in range(skupina.childCount()):
+                if skupina.child(i) is not polozka:
+                    skupina.child(i).setCheckState(0, Qt.Unchecked)
+        else:
+            polozka.setCheckState(0, Qt.Checked)
+        self.strom.blockSignals(False)
+
+    def _obnovit_popis(self):
+        pocet = self.strom.topLevelItemCount()
+        self.popis.setText(
+            f"Skupin duplicit: {pocet}. Zaškrtnutá kopie zůstane, playlisty, fronta a statistika "
+            "ostatních se převedou na ni." if pocet else "Žádné další duplicity."
+        )
+
+    def _vybrana_skupina(self):
+        polozka = self.strom.currentItem()
+        if polozka is not None and polozka.parent() is not None:
+            polozka = polozka.parent()
+        return polozka
+
+    @staticmethod
+    def _volba(skupina):
+        ponechana, ostatni = None, []
+        for i in range(skupina.childCount()):
+            dite = skupina.child(i)
+            skladba = dite.data(0, Qt.UserRole)
+            if dite.checkState(0) == Qt.Checked:
+                ponechana = skladba
+            else:
+                ostatni.append(skladba)
+        return ponechana, ostatni
+
+    def _potvrdit_smazani(self, pocet):
+        if not self.smazat.isChecked():
+            return True
+        odpoved = QMessageBox.question(
+            self, "Smazat soubory",
+            f"Opravdu smazat z disku {pocet} souborů? Tohle nejde vrátit.",
+            QMessageBox.Yes | QMessageBox.No, QMessageBox.No,
+        )
+        return odpoved == QMessageBox.Yes
+
+    def _sloucit(self, skupiny):
+        volby = [self._volba(skupina) for skupina in skupiny]
+        if not self._potvrdit_smazani(sum(len(ostatni) for _, ostatni in volby)):
+            return
+        for skupina, (ponechana, ostatni) in zip(skupiny, volby):
+            self.sloucit(ponechana, ostatni, self.smazat.isChecked())
+            self.strom.takeTopLevelItem(self.strom.indexOfTopLevelItem(skupina))
+        self._obnovit_popis()
+
+    def sloucit_vybranou(self):
+        skupina = self._vybrana_skupina()
+        if skupina is not None:
+            self._sloucit([skupina])
+
+    def sloucit_vse(self):
+        skupiny = [self.strom.topLevelItem(i) for i in range(self.strom.topLevelItemCount())]
+        if skupiny:
+            self._sloucit(skupiny)
+
+    def ignorovat_vybranou(self):
+        skupina = self._vybrana_skupina()
+        if skupina is None:
+            return
+        self.ignorovat([skupina.child(i).data(0, Qt.UserRole) for i in range(skupina.childCount())])
+        self.strom.takeTopLevelItem(self.strom.indexOfTopLevelItem(skupina))
+        self._obnovit_popis()
@@ -0,0 +1,177 @@
+import importlib
+import os
+import struct
+
+from mp3 import _zacatek_dat
+
+ID3V1 = 128
+APE_PATICKA = 32
+
+# Rámce ID3 ve WAV, kde Mutagen nemá "easy" rozhraní
+KLICE_ID3 = {"title": "TIT2", "artist": "TPE1", "album": "TALB", "genre": "TCON"}
+
+
+class Format:
+    """Zvukový formát: přípony, čtení metadat jen z hlaviček a kdo ho umí dekódovat.
+
+    `tridy` jsou třídy Mutagenu ("modul.Třída"), které se zkusí v tomto pořadí; díky
+    tomu se nemusí hádat formát podle obsahu jako u `mutagen.File`. `mixer` říká, jestli
+    ho dekóduje SDL_mixer (přehrávání bez mezer, analýza), ostatní přehrává Qt.
+    """
+
+    def __init__(self, nazev, pripony, tridy, mixer=True, klice=None, oblast=None):
+        self.nazev = nazev
+        self.pripony = tuple(pripony)
+        self.tridy = tuple(tridy)
+        self.mixer = mixer
+        self.klice = klice          # {tag: klíč v souboru}, None = klíče jako u EasyID3
+        self.oblast = oblast or oblast_s_id3
+        self._tridy = None          # naimportované třídy Mutagenu
+
+    def __repr__(self):
+        return f"Format({self.nazev!r})"
+
+
+_FORMATY = []
+_PODLE_PRIPONY = {}
+
+
+def registrovat(format):
+    """Přidá formát; přípona registrovaná později přepíše dřívější."""
+    _FORMATY.append(format)
+    for pripona in format.pripony:
+        _PODLE_PRIPONY[pripona.lower()] = format
+    return format
+
+
+def formaty():
+    return list(_FORMATY)
+
+
+def podle_cesty(cesta):
+    return _PODLE_PRIPONY.get(os.path.splitext(cesta)[1].lower())
+
+
+def je_podporovany(jmeno):
+    return os.path.splitext(jmeno)[1].lower() in _PODLE_PRIPONY
+
+
+def umi_mixer(cesta):
+    # Neznámou příponu necháme zkusit mixer, ten aspoň ohlásí srozumitelnou chybu
+    format = podle_cesty(cesta)
+    return format is None or format.mixer
+
+
+def _tridy_mutagenu(format):
+    if format._tridy is None:
+        tridy = []
+        for nazev in format.tridy:
+            modul, trida = nazev.rsplit(".", 1)
+            try:
+                tridy.append(getattr(importlib.import_module(modul), trida))
+            except (ImportError, AttributeError):
+                continue
+        format._tridy = tridy
+    return format._tridy
+
+
+def precist_metadata(cesta):
+    """Tagy, délka a bitrate z hlaviček souboru podle jeho formátu; {} když to nejde."""
+    format = podle_cesty(cesta)
+    if format is None:
+        return {}
+    # Mutagen importujeme až tady, aby start aplikace nemusel čekat
+    tridy = _tridy_mutagenu(format)
+    if not tridy:
+        return {}
+
+    audio = None
+    chyba = None
+    for trida in tridy:
+        try:
+            audio = trida(cesta)
+            break
+        except Exception as e:
+            chyba = e
+    if audio is None:
+        print(f"Chyba Mutagen při čtení tagů '{cesta}': {chyba}")
+        return {}
+
+    def tag(klic):
+        if audio.tags is None:
+            return ""
+        if format.klice is not None:
+            klic = format.klice[klic]
+        hodnota = audio.tags.get(klic)
+        if not hodnota:
+            return ""
+        # Easy rozhraní a Vorbis komentáře vrací seznam, rámec ID3 má seznam v .text
+        hodnota = getattr(hodnota, "text", hodnota)
+        return str(hodnota[0]) if isinstance(hodnota, list) else str(hodnota)
+
+    return {
+        "title": tag("title"),
+        "artist": tag("artist"),
+        "album": tag("album"),
+        "genre": tag("genre"),
+        "duration": float(getattr(audio.info, "length", 0.0) or 0.0),
+        "bitrate": int(getattr(audio.info, "bitrate", 0) or 0),
+    }
+
+
+def oblast_s_id3(f, velikost):
+    """(začátek, konec) dat skladby bez ID3v2 na začátku a ID3v1/APEv2 na konci."""
+    f.seek(0)
+    od = min(_zacatek_dat(f.read(10)), velikost)
+    do = velikost
+    if do - od >= ID3V1:
+        f.seek(do - ID3V1)
+        if f.read(3) == b"TAG":
+            do -= ID3V1
+    if do - od >= APE_PATICKA:
+        f.seek(do - APE_PATICKA)
+        paticka = f.read(APE_PATICKA)
+        if paticka[:8] == b"APETAGEX":
+            # Velikost v patičce zahrnuje i patičku, hlavička (bit 31 příznaků) je navíc
+            # Patička: APETAGEX, verze, velikost, počet položek, příznaky
+            delka_tagu, _, priznaky = struct.unpack("<III", paticka[12:24])
+            if priznaky & 0x80000000:
+                delka_tagu += APE_PATICKA
+            do = max(od, do - delka_tagu)
+    return od, do
+
+
+def oblast_flac(f, velikost):
+    """Jako oblast_s_id3, jen navíc přeskočí bloky metadat FLAC (tagy, obrázky)."""
+    od, do = oblast_s_id3(f, velikost)
+    f.seek(od)
+    if f.read(4) != b"fLaC":
+        return od, do
+    pozice = od + 4
+    while pozice + 4 <= do:
+        f.seek(pozice)
+        hlavicka = f.read(4)
+        if len(hlavicka) < 4:
+            break
+        pozice += 4 + int.from_bytes(hlavicka[1:4], "big")
+        # Nejvyšší bit prvního bajtu značí poslední blok metadat
+        if hlavicka[0] & 0x80:
+            break
+    return min(pozice, do), do
+
+
+def oblast_zvuku(cesta, f, velikost):
+    format = podle_cesty(cesta)
+    return (format.oblast if format is not None else oblast_s_id3)(f, velikost)
+
+
+registrovat(Format("MP3", (".mp3",), ("mutagen.mp3.EasyMP3",)))
+registrovat(Format("FLAC", (".flac",), ("mutagen.flac.FLAC",), oblast=oblast_flac))
+registrovat(Format(
+    "Ogg", (".ogg", ".oga"),
+    ("mutagen.oggvorbis.OggVorbis", "mutagen.oggopus.OggOpus", "mutagen.oggflac.OggFLAC"),
+))
+registrovat(Format("Opus", (".opus",), ("mutagen.oggopus.OggOpus",)))
+registrovat(Format("WAV", (".wav",), ("mutagen.wave.WAVE",), klice=KLICE_ID3))
+# AAC v MP4 kontejneru SDL_mixer nedekóduje, hraje se přes QtMultimedia
+registrovat(Format("M4A", (".m4a",), ("mutagen.easymp4.EasyMP4",), mixer=False))
@@ -0,0 +1,176 @@
+import random
+from collections import deque
+
+# Hodnoty odpovídají ModerniPrehravac.repeat_mode
+BEZ_OPAKOVANI, OPAKOVAT_VSE, OPAKOVAT_JEDNU = 0, 1, 2
+
+DELKA_HISTORIE = 1000
+
+
+class FrontaPrehravani:
+    """Fronta přehrávání s vlastním kurzorem, nezávislá na zobrazeném playlistu.
+
+    Položky jsou id skladeb. Skladby se berou z kopie playlistu v pořadí `poradi`. Při náhodném přehrávání se
+    pořadí míchá postupně (Fisher-Yates po jednom kroku), takže další skladba je O(1)
+    a nic se neopakuje, dokud se neprojde celý seznam. Položky "přehrát jako další"
+    a "přidat do fronty" mají přednost před playlistem.
+    """
+
+    def __init__(self):
+        self.zdroj = None
+        self.skladby = []
+        self.poradi = []
+        self.kurzor = -1
+        self.zamichano = 0
+        self.nahodne = False
+        self.aktualni = None              # (id skladby, kurzor nebo None u položky z fronty)
+        self.ve_fronte = deque()
+        self.historie = deque(maxlen=DELKA_HISTORIE)
+        self.vpred = []
+
+    def __len__(self):
+        return len(self.skladby)
+
+    @property
+    def skladba(self):
+        return self.aktualni[0] if self.aktualni else None
+
+    def pozice_v_playlistu(self):
+        """Pozice aktuální skladby ve zdrojovém playlistu, nebo -1."""
+        if not self.aktualni or self.aktualni[1] is None:
+            return -1
+        return self.poradi[self.aktualni[1]]
+
+    def nastavit(self, skladby, start, nahodne=None):
+        """Začne hrát playlist `skladby` od pozice `start`."""
+        if nahodne is not None:
+            self.nahodne = nahodne
+        self.zdroj = skladby
+        self.skladby = skladby[:]
+        self.poradi = list(range(len(self.skladby)))
+        if self.aktualni:
+            self.historie.append(self.aktualni)
+        self._zapomenout_kurzory()
+
+        if not self.skladby:
+            self.kurzor = -1
+            self.aktualni = None
+            return None
+
+        if self.nahodne:
+            # Vybraná skladba hraje první, zbytek se míchá až při postupu
+            self.poradi[0], self.poradi[start] = self.poradi[start], self.poradi[0]
+            self.kurzor = 0
+            self.zamichano = 1
+        else:
+            self.kurzor = start
+        self.aktualni = (self.skladby[self.poradi[self.kurzor]], self.kurzor)
+        return self.aktualni[0]
+
+    def nastavit_nahodne(self, nahodne):
+        if nahodne == self.nahodne:
+            return
+        self.nahodne = nahodne
+        if nahodne:
+            self.zamichano = self.kurzor + 1
+        elif self.skladby:
+            # Zpět do pořadí playlistu, pokračuje se za právě hranou skladbou
+            pozice = self.poradi[self.kurzor] if self.kurzor >= 0 else -1
+            self.poradi = list(range(len(self.skladby)))
+            self.kurzor = pozice
+            if self.aktualni and self.aktualni[1] is not None:
+                self.aktualni = (self.aktualni[0], pozice)
+            self._zapomenout_kurzory()
+        self.vpred.clear()
+
+    def _zapomenout_kurzory(self):
+        # Po změně pořadí už staré kurzory v historii neplatí, skladby zůstanou jen jako id
+        self.historie = deque(((skladba, None) for skladba, _ in self.historie), maxlen=DELKA_HISTORIE)
+        self.vpred.clear()
+
+    def _zafixovat(self, i):
+        if self.nahodne and i >= self.zamichano:
+            j = random.randrange(i, len(self.poradi))
+            self.poradi[i], self.poradi[j] = self.poradi[j], self.poradi[i]
+            self.zamichano = i + 1
+
+    def _dalsi_z_playlistu(self, repeat_mode):
+        i = self.kurzor + 1
+        if i >= len(self.skladby):
+            if repeat_mode != OPAKOVAT_VSE or not self.skladby:
+                return None
+            i = 0
+            if self.zamichano >= len(self.skladby):
+                # Nové kolo; pozici 0 mohl už zafixovat náhled, pak se nemíchá znovu
+                self.zamichano = 0
+        self._zafixovat(i)
+        return i
+
+    def nahled_dalsi(self, repeat_mode):
+        """Co bude hrát po aktuální skladbě, bez posunu fronty."""
+        if self.vpred:
+            return self.vpred[-1][0]
+        if repeat_mode == OPAKOVAT_JEDNU and self.aktualni:
+            return self.aktualni[0]
+        if self.ve_fronte:
+            return self.ve_fronte[0]
+        i = self._dalsi_z_playlistu(repeat_mode)
+        if i is None:
+            return None
+        return self.skladby[self.poradi[i]]
+
+    def dalsi(self, repeat_mode, rucne=False):
+        """Posune frontu a vrátí id další skladby, nebo None na konci."""
+        if self.vpred:
+            dalsi = self.vpred.pop()
+        elif repeat_mode == OPAKOVAT_JEDNU and not rucne and self.aktualni:
+            return self.aktualni[0]
+        elif self.ve_fronte:
+            dalsi = (self.ve_fronte.popleft(), None)
+        else:
+            i = self._dalsi_z_playlistu(repeat_mode)
+            if i is None:
+                return None
+            dalsi = (self.skladby[self.poradi[i]], i)
+
+        if self.aktualni:
+            self.historie.append(self.aktualni)
+        self.aktualni = dalsi
+        if dalsi[1] is not None:
+            self.kurzor = dalsi[1]
+        return dalsi[0]
+
+    def predchozi(self):
+        """Vrátí se o skladbu zpět v historii, nebo None, když historie je prázdná."""
+        if not self.historie:
+            return None
+        if self.aktualni:
+            self.vpred.append(self.aktualni)
+        self.aktualni = self.historie.pop()
+        if self.aktualni[1] is not None:
+            self.kurzor = self.aktualni[1]
+        return self.aktualni[0]
+
+    def premapovat(self, mapa):
+        """Nahradí id skladeb podle `mapa` (přesunuté soubory), kurzory zůstanou."""
+        def nove(skladba):
+            return mapa.get(skladba, skladba)
+        for i, skladba in enumerate(self.skladby):
+            if skladba in mapa:
+                self.skladby[i] = mapa[skladba]
+        self.ve_fronte = deque(map(nove, self.ve_fronte))
+        self.historie = deque(((nove(s), k) for s, k in self.historie), maxlen=DELKA_HISTORIE)
+        self.vpred = [(nove(s), k) for s, k in self.vpred]
+        if self.aktualni:
+            self.aktualni = (nove(self.aktualni[0]), self.aktualni[1])
+
+    def prehrat_jako_dalsi(self, skladba):
+        self.ve_fronte.appendleft(skladba)
+
+    def pridat_do_fronty(self, skladba):
+        self.ve_fronte.append(skladba)
+
+    def zastavit(self):
+        if self.aktualni:
+            self.historie.append(self.aktualni)
+        self.aktualni = None
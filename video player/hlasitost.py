@@ -0,0 +1,140 @@
+import math
+import os
+
+import zvuk
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Cíl jako u ReplayGain 2; hlasitější skladby se ztiší, tišší zesílit nejde (hlasitost mixeru je max 1.0)
+CILOVA_HLASITOST = -18.0
+VZORKOVANI = 48000
+# Kolik 100ms bloků se převádí do spektra najednou (omezuje paměť na pár desítek MB)
+BLOKU_NAJEDNOU = 600
+
+
+def inicializovat_proces():
+    """Start pracovního procesu: mixer bez zvukového zařízení a nižší priorita než přehrávač."""
+    if hasattr(os, "nice"):
+        os.nice(10)
+    zvuk.nacist_backend(frekvence=VZORKOVANI, bez_zarizeni=True)
+
+
+def _biquad(b, a, w):
+    z1 = np.exp(-1j * w)
+    z2 = z1 * z1
+    return (b[0] + b[1] * z1 + b[2] * z2) / (a[0] + a[1] * z1 + a[2] * z2)
+
+
+def k_vahy(delka_bloku, vzorkovani):
+    """Druhá mocnina K-filtru (EBU R128) pro každý bin rfft, včetně vah z Parsevalovy rovnosti."""
+    w = 2 * np.pi * np.fft.rfftfreq(delka_bloku)
+
+    # Zvýraznění výšek: +4 dB nad ~1,5 kHz
+    A = 10 ** (4.0 / 40)
+    w0 = 2 * np.pi * 1500.0 / vzorkovani
+    alfa = np.sin(w0) / (2 * (1 / np.sqrt(2)))
+    cos_w0 = np.cos(w0)
+    odmocnina = 2 * np.sqrt(A) * alfa
+    police = _biquad(
+        (A * ((A + 1) + (A - 1) * cos_w0 + odmocnina),
+         -2 * A * ((A - 1) + (A + 1) * cos_w0),
+         A * ((A + 1) + (A - 1) * cos_w0 - odmocnina)),
+        ((A + 1) - (A - 1) * cos_w0 + odmocnina,
+         2 * ((A - 1) - (A + 1) * cos_w0),
+         (A + 1) - (A - 1) * cos_w0 - odmocnina),
+        w,
+    )
+
+    # Horní propust na 38 Hz
+    w0 = 2 * np.pi * 38.0 / vzorkovani
+    alfa = np.sin(w0) / (2 * 0.5)
+    cos_w0 = np.cos(w0)
+    propust = _biquad(
+        ((1 + cos_w0) / 2, -(1 + cos_w0), (1 + cos_w0) / 2),
+        (1 + alfa, -2 * cos_w0, 1 - alfa),
+        w,
+    )
+
+    vahy = np.abs(police * propust) ** 2 * (2.0 / delka_bloku)
+    vahy[0] /= 2
+    if delka_bloku % 2 == 0:
+        vahy[-1] /= 2
+    return vahy.astype(np.float32)
+
+
+def zmerit(vzorky, vzorkovani):
+    """Integrovaná hlasitost v LUFS (nebo None u ticha) a špička 0..1 z pole (vzorky, kanály) int16.
+
+    Filtr se počítá ve spektru 100ms bloků, 400ms okna s 75% překryvem jsou pak jen
+    součty čtyř sousedních bloků. Celé je to pár operací nad poli, bez smyčky přes vzorky.
+    """
+    if vzorky.ndim == 1:
+        vzorky = vzorky[:, None]
+    kanaly = vzorky.shape[1]
+    spicka = max(int(vzorky.max()), -int(vzorky.min())) / 32768.0 if len(vzorky) else 0.0
+
+    blok = vzorkovani // 10
+    bloku = len(vzorky) // blok
+    if bloku < 4:
+        return None, spicka
+
+    vahy = k_vahy(blok, vzorkovani)[None, :, None]
+    energie = np.empty((bloku, kanaly), dtype=np.float64)
+    for od in range(0, bloku, BLOKU_NAJEDNOU):
+        do = min(od + BLOKU_NAJEDNOU, bloku)
+        x = vzorky[od * blok:do * blok].reshape(do - od, blok, kanaly).astype(np.float32)
+        x *= 1 / 32768.0
+        spektrum = np.fft.rfft(x, axis=1)
+        energie[od:do] = (np.abs(spektrum) ** 2 * vahy).sum(axis=1)
+
+    stredni = energie.sum(axis=1) / blok
+    okna = (stredni[:-3] + stredni[1:-2] + stredni[2:-1] + stredni[3:]) / 4
+    hlasitost_oken = -0.691 + 10 * np.log10(np.maximum(okna, 1e-12))
+
+    # Absolutní hradlo -70 LUFS, pak relativní o 10 LU pod průměrem zbylých oken
+    nad_prahem = okna[hlasitost_oken > -70]
+    if not len(nad_prahem):
+        return None, spicka
+    relativni_prah = -0.691 + 10 * math.log10(nad_prahem.mean()) - 10
+    zapocitane = okna[(hlasitost_oken > -70) & (hlasitost_oken > relativni_prah)]
+    return -0.691 + 10 * math.log10(zapocitane.mean()), spicka
+
+
+def analyzovat(cesta):
+    """Běží v pracovním procesu; vrátí (cesta, hlasitost, špička), při chybě (cesta, None, None)."""
+    try:
+        vzorky, vzorkovani = zvuk.dekodovat(cesta)
+    except zvuk.ChybaZvuku as e:
+        print(f"Nelze dekódovat '{cesta}' pro analýzu hlasitosti: {e}")
+        return cesta, None, None
+    hlasitost, spicka = zmerit(vzorky, vzorkovani)
+    return cesta, hlasitost, spicka
+
+
+def zesileni(hlasitost, spicka, cil=CILOVA_HLASITOST):
+    """Násobek hlasitosti mixeru, který skladbu přiblíží cíli a nepřebudí špičku."""
+    if hlasitost is None:
+        return 1.0
+    nasobek = 10 ** ((cil - hlasitost) / 20)
+    if spicka:
+        nasobek = min(nasobek, 1.0 / spicka)
+    return min(nasobek, 1.0)
+
+
+def hlasitost_celku(skladby):
+    """Společná hlasitost a špička alba z (hlasitost, špička, délka) jednotlivých skladeb."""
+    energie = delka = 0.0
+    spicka = 0.0
+    for hlasitost_skladby, spicka_skladby, delka_skladby in skladby:
+        if hlasitost_skladby is None:
+            continue
+        vaha = max(delka_skladby, 1.0)
+        energie += vaha * 10 ** (hlasitost_skladby / 10)
+        delka += vaha
+        spicka = max(spicka, spicka_skladby or 0.0)
+    if not delka:
+        return None, None
+    return 10 * math.log10(energie / delka), spicka
@@ -0,0 +1,235 @@
+import bisect
+import os
+import re
+import unicodedata
+from collections import Counter
+from itertools import chain, filterfalse
+
+SLOVO = re.compile(r"\w+")
+
+# Úrovně shody pro řazení výsledků: celé slovo, začátek slova, překlep
+PRESNE, PREFIX, PREKLEP = 0, 1, 2
+
+# Kolik naposledy hledaných slov si pamatujeme (psaní a mazání znaků se pak neopakuje)
+VELIKOST_CACHE = 256
+
+PRAZDNA = frozenset()
+
+# Úroveň výsledků, která má méně než 1/16 skladeb playlistu, se složí z pozic a seřadí
+# celá; větší se čte průchodem playlistu, jen tak daleko, kolik zobrazení potřebuje
+POMER_PRUCHODU = 16
+
+
+def normalizovat(text):
+    """Malá písmena bez diakritiky, aby "patky" našlo "Pátky"."""
+    if text.isascii():
+        return text.lower()
+    rozlozeny = unicodedata.normalize("NFKD", text)
+    return "".join(z for z in rozlozeny if not unicodedata.combining(z)).casefold()
+
+
+def slova(text):
+    return SLOVO.findall(normalizovat(text))
+
+
+def trigramy(slovo):
+    obalene = f" {slovo} "
+    return {obalene[i:i + 3] for i in range(len(obalene) - 2)}
+
+
+def max_preklepu(slovo):
+    if len(slovo) < 5:
+        return 0
+    return 1 if len(slovo) < 9 else 2
+
+
+def vzdalenost(a, b, limit):
+    """Levenshteinova vzdálenost, výpočet končí, jakmile přesáhne `limit`."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    predchozi = list(range(len(b) + 1))
+    for i, znak_a in enumerate(a, 1):
+        aktualni = [i]
+        for j, znak_b in enumerate(b, 1):
+            aktualni.append(min(
+                predchozi[j] + 1,
+                aktualni[j - 1] + 1,
+                predchozi[j - 1] + (znak_a != znak_b),
+            ))
+        if min(aktualni) > limit:
+            return limit + 1
+        predchozi = aktualni
+    return predchozi[-1]
+
+
+class VyhledavaciIndex:
+    """Index slov z názvu, interpreta, alba a jména souboru; skladby jsou v něm jako id.
+
+    Hledání slova je slovníkový dotaz, začátek slova se hledá půlením v seřazeném
+    slovníku a překlepy přes trigramy slovníku, takže se nikdy neprochází celá knihovna.
+    """
+
+    def __init__(self):
+        self.skladby_podle_slova = {}
+        self.slova_skladby = {}
+        self.slova_podle_trigramu = {}
+        self._serazena = None
+        self._cache = {}
+
+    def __len__(self):
+        return len(self.slova_skladby)
+
+    def __contains__(self, skladba):
+        return skladba in self.slova_skladby
+
+    def chybejici(self, skladby):
+        """Skladby ze `skladby`, které v indexu nejsou, každá jednou."""
+        return list(dict.fromkeys(filterfalse(self.slova_skladby.__contains__, skladby)))
+
+    def pridat(self, skladba, nazev_souboru, *texty):
+        self._cache.clear()
+        if skladba in self.slova_skladby:
+            self.odebrat(skladba)
+
+        nalezena = set(slova(os.path.splitext(nazev_souboru)[0]))
+        for text in texty:
+            if text:
+                nalezena.update(slova(text))
+
+        self.slova_skladby[skladba] = tuple(nalezena)
+        for slovo in nalezena:
+            skladby = self.skladby_podle_slova.get(slovo)
+            if skladby is None:
+                skladby = self.skladby_podle_slova[slovo] = set()
+                for trigram in trigramy(slovo):
+                    self.slova_podle_trigramu.setdefault(trigram, set()).add(slovo)
+                self._serazena = None
+            skladby.add(skladba)
+
+    def pridat_z_tabulky(self, tabulka, skladba):
+        self.pridat(skladba, tabulka.nazev(skladba), tabulka.title[skladba],
+                    tabulka.artist[skladba], tabulka.album[skladba])
+
+    def odebrat(self, skladba):
+        self._cache.clear()
+        for slovo in self.slova_skladby.pop(skladba, ()):
+            skladby = self.skladby_podle_slova.get(slovo)
+            if skladby is None:
+                continue
+            skladby.discard(skladba)
+            if not skladby:
+                del self.skladby_podle_slova[slovo]
+                for trigram in trigramy(slovo):
+                    slova_trigramu = self.slova_podle_trigramu.get(trigram)
+                    if slova_trigramu is not None:
+                        slova_trigramu.discard(slovo)
+                        if not slova_trigramu:
+                            del self.slova_podle_trigramu[trigram]
+                self._serazena = None
+
+    def _serazena_slova(self):
+        if self._serazena is None:
+            self._serazena = sorted(self.skladby_podle_slova)
+        return self._serazena
+
+    def _najit_slovo(self, slovo):
+        """Vrátí tři disjunktní množiny skladeb: přesná shoda, začátek slova, překlep."""
+        vysledek = self._cache.get(slovo)
+        if vysledek is not None:
+            return vysledek
+
+        skladby_podle_slova = self.skladby_podle_slova
+        presne = skladby_podle_slova.get(slovo, PRAZDNA)
+
+        serazena = self._serazena_slova()
+        od = bisect.bisect_right(serazena, slovo)
+        do = bisect.bisect_left(serazena, slovo + "\uffff", od)
+        prefix = set().union(*[skladby_podle_slova[s] for s in serazena[od:do]])
+
+        preklep = set()
+        limit = max_preklepu(slovo)
+        if limit:
+            hledane = trigramy(slovo)
+            # Překlep uvnitř slova rozbije nejvýš tři trigramy, na kraji dva; chceme kandidáty,
+            # kterým zbyla většina trigramů, jinak by se porovnávala půlka slovníku
+            potreba = max(2, len(hledane) - 2 * limit)
+            pocty = Counter(chain.from_iterable(
+                self.slova_podle_trigramu.get(trigram, ()) for trigram in hledane
+            ))
+            delka = len(slovo)
+            kandidati = [
+                kandidat for kandidat, pocet in pocty.items()
+                if pocet >= potreba and abs(len(kandidat) - delka) <= limit
+                and kandidat != slovo and not kandidat.startswith(slovo)
+            ]
+            preklep = set().union(*[
+                skladby_podle_slova[kandidat] for kandidat in kandidati
+                if vzdalenost(slovo, kandidat, limit) <= limit
+            ])
+            preklep -= presne
+            preklep -= prefix
+
+        if len(self._cache) >= VELIKOST_CACHE:
+            del self._cache[next(iter(self._cache))]
+        vysledek = self._cache[slovo] = (presne, prefix, preklep)
+        return vysledek
+
+    def hledat(self, dotaz):
+        """Vrátí seznam množin skladeb seřazený od nejlepší shody, nebo None pro prázdný dotaz.
+
+        Skladba musí odpovídat všem slovům dotazu, její úroveň je ta nejhorší z nich.
+        """
+        hledana_slova = slova(dotaz)
+        if not hledana_slova:
+            return None
+
+        # Množiny z indexu a cache se nesmí měnit, pracujeme jen s novými množinami
+        nalezene = [self._najit_slovo(slovo) for slovo in dict.fromkeys(hledana_slova)]
+        if len(nalezene) == 1:
+            return list(nalezene[0])
+
+        nalezene.sort(key=lambda urovne: sum(map(len, urovne)))
+        presne, prefix, preklep = nalezene[0]
+        do_presne = set(presne)
+        do_prefixu = presne | prefix
+        do_preklepu = do_prefixu | preklep
+        for presne, prefix, preklep in nalezene[1:]:
+            # Průniky jdou přes menší množinu, sjednocení úrovní dalšího slova se nestaví
+            do_presne &= presne
+            do_prefixu = (do_prefixu & presne) | (do_prefixu & prefix)
+            do_preklepu = (do_preklepu & presne) | (do_preklepu & prefix) | (do_preklepu & preklep)
+
+        return [do_presne, do_prefixu - do_presne, do_preklepu - do_prefixu]
+
+
+def mapa_pozic(skladby):
+    """Vrátí {id: pozice} a {id: [další pozice]} pro skladby, které jsou v playlistu víckrát."""
+    pozice = dict(zip(skladby, range(len(skladby))))
+    dalsi = {}
+    if len(pozice) < len(skladby):
+        for i, skladba in enumerate(skladby):
+            if pozice[skladba] != i:
+                dalsi.setdefault(skladba, []).append(i)
+    return pozice, dalsi
+
+
+def pozice_vysledku(urovne, skladby, mapa):
+    """Pozice nalezených skladeb v playlistu `skladby` jako generátor.
+
+    Nejdřív skladby z první úrovně `hledat`, pak z dalších, uvnitř úrovně v pořadí
+    playlistu. `mapa()` vrací mapa_pozic(skladby) a volá se, jen když ji malá úroveň
+    potřebuje. Čte se líně, takže hledání na znak nad velkou knihovnou nechystá desítky
+    tisíc řádků, které nikdo neuvidí.
+    """
+    for nalezene in urovne:
+        if not nalezene:
+            continue
+        if len(nalezene) * POMER_PRUCHODU < len(skladby):
+            pozice, dalsi = mapa()
+            vybrane = [i for i in map(pozice.get, nalezene) if i is not None]
+            if dalsi:
+                vybrane.extend(i for skladba in nalezene for i in dalsi.get(skladba, ()))
+            vybrane.sort()
+            yield from vybrane
+        else:
+            yield from (i for i, skladba in enumerate(skladby) if skladba in nalezene)
@@ -0,0 +1,37 @@
+import hashlib
+import re
+import struct
+
+from casomira import mereno
+from formaty import oblast_zvuku
+
+# Z oblasti se zvukem se čtou jen tři bloky (začátek, střed, konec), ať je otisk rychlý i na síti
+BLOK_OTISKU = 16 * 1024
+DELKA_OTISKU = 16
+
+ODDELOVACE = re.compile(r"[\\/]")
+
+
+@mereno("otisk souboru")
+def otisk(cesta):
+    """Otisk zvukových dat skladby; změna tagů ani přesun souboru ho nezmění. None při chybě."""
+    try:
+        with open(cesta, "rb") as f:
+            f.seek(0, 2)
+            od, do = oblast_zvuku(cesta, f, f.tell())
+            h = hashlib.blake2b(struct.pack("<Q", do - od), digest_size=DELKA_OTISKU)
+            if do - od <= 3 * BLOK_OTISKU:
+                f.seek(od)
+                h.update(f.read(do - od))
+            else:
+                for zacatek in (od, od + (do - od - BLOK_OTISKU) // 2, do - BLOK_OTISKU):
+                    f.seek(zacatek)
+                    h.update(f.read(BLOK_OTISKU))
+            return h.digest()
+    except OSError:
+        return None
+
+
+def jmeno_souboru(cesta):
+    # Playlisty z Windows mají zpětná lomítka, os.path.basename je jinde nerozdělí
+    return ODDELOVACE.split(cesta)[-1]
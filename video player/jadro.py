@@ -0,0 +1,352 @@
+import os
+from array import array
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from casomira import mereni
+import chytre
+import prenos
+from analyza import Analyza
+from duplicity import HledaniDuplicit
+from fronta import FrontaPrehravani
+from knihovna import IndexKnihovny, TabulkaSkladeb
+from kontrola import Kontrola
+from playlisty import UlozistePlaylistu, VSECHNY_SKLADBY
+from skener import Sken
+from upravy import UpravyPlaylistu
+
+# Kolik souborů se při kontrole knihovny ověřuje souběžně (stat je čekání na disk, ne CPU)
+VLAKEN_KONTROLY = 16
+
+
+def datova_slozka():
+    # Databáze, cache a výchozí složka s hudbou; CRAFTORA_DATA je přesměruje jinam (benchmark)
+    return Path(os.environ.get("CRAFTORA_DATA") or Path(__file__).parent.resolve())
+
+
+def _nic(*_):
+    pass
+
+
+def pripravit(data_dir):
+    """Playlisty, knihovna a chytré playlisty z indexu pro `JadroKnihovny.nacist`.
+
+    Otevírá vlastní spojení do indexu, takže může běžet v jiném vlákně, než kde pak jádro žije.
+    """
+    data_dir = Path(data_dir)
+    data_dir.mkdir(parents=True, exist_ok=True)
+    data = {}
+    with mereni.usek("otevření indexu"):
+        index = IndexKnihovny(data_dir / "knihovna.db")
+    try:
+        with mereni.usek("načtení playlistů"):
+            # Migrace z JSON může založit skladby mimo knihovnu, proto jde před tabulkou
+            store = UlozistePlaylistu(index)
+            store.migrovat_json(data_dir / "playlists.json")
+            data["playlisty"] = store.nacist()
+        with mereni.usek("načtení knihovny z indexu"):
+            data["knihovna"] = index.nacist_tabulku()
+        with mereni.usek("chytré playlisty"):
+            data["chytre"] = chytre.vyhodnotit(store.nacist_chytre(), index.conn, data["knihovna"][0])
+    finally:
+        index.zavrit()
+    return data
+
+
+def _stav_souboru(cesta, velikost, mtime):
+    try:
+        st = os.stat(cesta)
+    except OSError:
+        return "chybí"
+    if st.st_size != velikost or st.st_mtime != mtime:
+        return "změněno"
+    return None
+
+
+class JadroKnihovny:
+    """Knihovna, playlisty a fronta přehrávání bez GUI.
+
+    Drží index, tabulku skladeb, playlisty (pole id), chytré playlisty, frontu a historii
+    úprav a převádí na ně výsledky skenu, kontroly a přehrávání. Okno přehrávače i cli.py
+    nad ním jen zobrazují a hlásí; metody proto vrací, co se změnilo, a nic samy neukazují.
+    """
+
+    def __init__(self, data_dir=None):
+        self.data_dir = Path(data_dir) if data_dir is not None else datova_slozka()
+        # Nová datová složka (první spuštění, --data, CRAFTORA_DATA) se založí
+        self.data_dir.mkdir(parents=True, exist_ok=True)
+        self.index = IndexKnihovny(self.data_dir / "knihovna.db")
+        self.playlist_store = UlozistePlaylistu(self.index)
+        # Skladby jsou všude jen id do tabulky, playlisty jsou pole id
+        self.tabulka = TabulkaSkladeb()
+        self.playlists = {VSECHNY_SKLADBY: array("i")}
+        # Chytré playlisty: {název: ChytryPlaylist}, jejich pole skladeb je i v self.playlists
+        self.chytre = {}
+        # Co se hraje, určuje fronta, ne seznam, který je zrovna zobrazený
+        self.fronta = FrontaPrehravani()
+        self.upravy = UpravyPlaylistu(self.playlists)
+
+    def zavrit(self):
+        self.index.zavrit()
+
+    @property
+    def vsechny(self):
+        return self.playlists[VSECHNY_SKLADBY]
+
+    def nacist(self, pripraveno=None):
+        pripraveno = pripraveno or {}
+        self.nacist_playlisty(pripraveno.get("playlisty"))
+        self.nacist_knihovnu(pripraveno.get("knihovna"))
+        self.nacist_chytre(pripraveno.get("chytre"))
+
+    def nacist_playlisty(self, nactene=None):
+        if nactene is None:
+            # Starý playlists.json se při prvním spuštění převede do databáze
+            self.playlist_store.migrovat_json(self.data_dir / "playlists.json")
+            nactene = self.playlist_store.nacist()
+        self.playlists.update(nactene)
+
+    def nacist_knihovnu(self, nactena=None):
+        self.tabulka, self.playlists[VSECHNY_SKLADBY] = (
+            nactena if nactena is not None else self.index.nacist_tabulku()
+        )
+
+    def nacist_chytre(self, nactene=None):
+        if nactene is None:
+            nactene = chytre.vyhodnotit(self.playlist_store.nacist_chytre(), self.index.conn, self.tabulka)
+        self.chytre = nactene
+        for nazev, playlist in nactene.items():
+            self.playlists[nazev] = playlist.skladby
+
+    def ulozit(self, zmenene):
+        self.playlist_store.ulozit(self.playlists, zmenene)
+
+    # Změny knihovny; chytré playlisty po nich dorovná volající přes aktualizovat_chytre
+
+    def pridat_skladby(self, skladby):
+        """Převezme dávku Skladba ze skenu; vrátí pole id skladeb, které v knihovně nebyly."""
+        nove = array("i")
+        for skladba in skladby:
+            if skladba.id not in self.tabulka:
+                nove.append(skladba.id)
+            self.tabulka.nastavit_skladbu(skladba)
+        self.vsechny.extend(nove)
+        return nove
+
+    def odebrat_cesty(self, cesty):
+        """Odebere skladby, které zmizely z disku; vrátí jejich id."""
+        odebrane = {self.tabulka.id(cesta) for cesta in cesty}
+        odebrane.discard(None)
+        for skladba in odebrane:
+            self.tabulka.odebrat(skladba)
+        if odebrane:
+            vsechny = self.vsechny
+            vsechny[:] = array("i", (skladba for skladba in vsechny if skladba not in odebrane))
+        return odebrane
+
+    def premapovat(self, mapa):
+        """Převede playlisty, frontu a statistiku na skladby nalezené kontrolou {staré id: nové id}.
+
+        Index už je přesměrovaný; vrátí názvy změněných playlistů, které je potřeba uložit.
+        """
+        zmenene = []
+        for nazev, skladby in self.playlists.items():
+            if nazev == VSECHNY_SKLADBY or nazev in self.chytre:
+                continue
+            zmeneno = False
+            for i, skladba in enumerate(skladby):
+                nova = mapa.get(skladba)
+                if nova is not None:
+                    skladby[i] = nova
+                    zmeneno = True
+            if zmeneno:
+                self.upravy.zapomenout(nazev)
+                zmenene.append(nazev)
+        self.fronta.premapovat(mapa)
+        # Index už statistiku přehrávání převedl na nové skladby, tabulka se dorovná stejně
+        tabulka = self.tabulka
+        for stara, nova in mapa.items():
+            if stara < len(tabulka.plays) and nova < len(tabulka.plays):
+                tabulka.added[nova] = min(tabulka.added[nova], tabulka.added[stara])
+                tabulka.plays[nova] += tabulka.plays[stara]
+                tabulka.last_played[nova] = max(tabulka.last_played[nova], tabulka.last_played[stara])
+        return zmenene
+
+    def zapocitat_prehrani(self, skladba, ted):
+        if skladba not in self.tabulka:
+            return False
+        self.tabulka.plays[skladba] += 1
+        self.tabulka.last_played[skladba] = ted
+        self.index.zapocitat_prehrani(skladba, ted)
+        return True
+
+    def sloucit_duplicity(self, ponechana, ostatni, smazat_soubory=False):
+        """Převede playlisty, frontu a statistiku z duplicit na ponechanou skladbu.
+
+        Playlist, kde byla víc než jedna kopie, má ponechanou skladbu jen na prvním místě.
+        Se `smazat_soubory` smaže ostatní kopie z disku i z knihovny. Vrátí (názvy
+        změněných playlistů k uložení, id skladeb odebraných z knihovny).
+        """
+        self.index.sloucit_duplicity(ponechana, ostatni)
+        zmenene = self.premapovat(dict.fromkeys(ostatni, ponechana))
+        for nazev in zmenene:
+            pozice = [i for i, skladba in enumerate(self.playlists[nazev]) if skladba == ponechana]
+            if len(pozice) > 1:
+                self.upravy.odebrat(nazev, pozice[1:])
+                print(f"Playlist '{nazev}': sloučené kopie odebrány ({len(pozice) - 1})")
+        for stara in ostatni:
+            if stara < len(self.tabulka.plays):
+                self.tabulka.plays[stara] = 0
+                self.tabulka.last_played[stara] = 0
+        if not smazat_soubory:
+            return zmenene, set()
+        smazane = []
+        for stara in ostatni:
+            cesta = self.tabulka.cesta(stara)
+            try:
+                os.remove(cesta)
+            except OSError as e:
+                print(f"Nelze smazat '{cesta}': {e}")
+                continue
+            smazane.append(cesta)
+        self.index.odebrat_skladby(smazane)
+        return zmenene, self.odebrat_cesty(smazane)
+
+    # Chytré playlisty
+
+    def aktualizovat_chytre(self, skladby, ted=None):
+        """Vyhodnotí jen dané skladby; vrátí chytré playlisty, jejichž obsah se změnil."""
+        if not self.chytre or not skladby:
+            return []
+        return [p for p in self.chytre.values() if p.aktualizovat(self.tabulka, skladby, ted)]
+
+    def chytre_vyprsele(self, ted=None):
+        return [p for p in self.chytre.values() if p.vyprsele(self.tabulka, ted)]
+
+    def dalsi_cas_chytrych(self):
+        casy = [cas for cas in (p.dalsi_cas() for p in self.chytre.values()) if cas is not None]
+        return min(casy) if casy else None
+
+    def ulozit_chytry(self, nazev, pravidla, stary_nazev=None):
+        """Založí chytrý playlist, nebo mu změní pravidla (a název); vrátí ChytryPlaylist."""
+        playlist = chytre.ChytryPlaylist(nazev, pravidla)
+        playlist.naplnit(self.index.conn, self.tabulka)
+        self.playlist_store.ulozit_chytry(nazev, pravidla, stary_nazev)
+        puvodni = self.chytre.pop(stary_nazev, None)
+        if puvodni is not None:
+            # Zobrazení a fronta drží odkaz na pole, obsah se proto vymění na místě
+            puvodni.skladby[:] = playlist.skladby
+            playlist.skladby = puvodni.skladby
+            del self.playlists[stary_nazev]
+        self.chytre[nazev] = playlist
+        self.playlists[nazev] = playlist.skladby
+        return playlist
+
+    def smazat_playlist(self, nazev):
+        """Smaže playlist; chytrý hned i z databáze, běžný uloží volající. Vrátí True u chytrého."""
+        del self.playlists[nazev]
+        self.upravy.zapomenout(nazev)
+        if self.chytre.pop(nazev, None) is None:
+            return False
+        self.playlist_store.smazat_chytry(nazev)
+        return True
+
+    # Dávkové úlohy; běží synchronně, zrušit je jde z jiného vlákna přes vrácenou úlohu
+
+    def sken(self, slozky=(), procesu=None, pri_prubehu=_nic):
+        """Úloha skenu zadaných složek (přidají se ke knihovně), bez nich všech kořenů knihovny."""
+        koreny = [self.index.pridat_koren(slozka) for slozka in slozky] or self.index.koreny()
+        return Sken(self.index.db_path, [(koren, True) for koren in koreny], procesu=procesu,
+                    pri_prubehu=pri_prubehu)
+
+    def kontrola(self):
+        return Kontrola(self.index.db_path)
+
+    def analyza(self, procesu=None, pri_prubehu=_nic):
+        return Analyza(self.index.db_path, procesu, pri_prubehu=pri_prubehu)
+
+    def hledani_duplicit(self, procesu=None, pri_prubehu=_nic):
+        return HledaniDuplicit(self.index.db_path, procesu, pri_prubehu=pri_prubehu)
+
+    def statistika(self):
+        """Souhrn indexu a playlistů přímo z databáze, tabulku není potřeba načítat."""
+        conn = self.index.conn
+        pritomne, nepritomne, delka, velikost, analyzovane, s_otiskem, otisknute = conn.execute("""
+            SELECT
+                COALESCE(SUM(present = 1), 0), COALESCE(SUM(present = 0), 0),
+                COALESCE(SUM(CASE WHEN present = 1 THEN duration END), 0),
+                COALESCE(SUM(CASE WHEN present = 1 THEN size END), 0),
+                COALESCE(SUM(present = 1 AND analyzed = 1), 0),
+                COALESCE(SUM(fingerprint IS NOT NULL), 0),
+                COALESCE(SUM(present = 1 AND hashed = 1), 0)
+            FROM tracks
+        """).fetchone()
+        formaty = Counter()
+        for (cesta,) in conn.execute("SELECT path FROM tracks WHERE present = 1"):
+            formaty[os.path.splitext(cesta)[1].lower() or "?"] += 1
+        playlisty, polozky = conn.execute(
+            "SELECT COUNT(*), (SELECT COUNT(*) FROM playlist_items) FROM playlists"
+        ).fetchone()
+        return {
+            "databaze": str(self.index.db_path),
+            "velikost_databaze": sum(
+                os.path.getsize(f"{self.index.db_path}{pripona}")
+                for pripona in ("", "-wal") if os.path.exists(f"{self.index.db_path}{pripona}")
+            ),
+            "verze_schematu": conn.execute("PRAGMA user_version").fetchone()[0],
+            "koreny": self.index.koreny(),
+            "skladby": pritomne,
+            "mimo_knihovnu": nepritomne,
+            "delka_sekund": delka,
+            "velikost_souboru": velikost,
+            "analyzovano": analyzovane,
+            "s_otiskem": s_otiskem,
+            "se_zvukovym_otiskem": otisknute,
+            "formaty": dict(formaty.most_common()),
+            "playlisty": playlisty,
+            "polozky_playlistu": polozky,
+            "chytre_playlisty": conn.execute("SELECT COUNT(*) FROM smart_playlists").fetchone()[0],
+        }
+
+    def validovat(self, vlaken=VLAKEN_KONTROLY, pri_prubehu=_nic, zruseno=None):
+        """Ověří index proti disku a playlisty proti indexu; vrátí [(druh, podrobnosti)].
+
+        Soubory se ověřují souběžně ve vláknech, do indexu se nic nezapisuje.
+        """
+        conn = self.index.conn
+        problemy = [("chybí kořen", koren) for koren in self.index.koreny() if not os.path.isdir(koren)]
+        problemy.extend(
+            ("neplatná položka playlistu", f"{nazev}: skladba {track_id} není v indexu")
+            for nazev, track_id in conn.execute("""
+                SELECT p.name, i.track_id FROM playlist_items i
+                JOIN playlists p ON p.id = i.playlist_id
+                WHERE i.track_id NOT IN (SELECT id FROM tracks)
+            """)
+        )
+        for nazev, pravidla in self.playlist_store.nacist_chytre().items():
+            try:
+                chytre.Dotaz(pravidla)
+            except chytre.ChybaPravidla as e:
+                problemy.append(("neplatný chytrý playlist", f"{nazev}: {e}"))
+
+        skladby = conn.execute("SELECT path, size, mtime FROM tracks WHERE present = 1").fetchall()
+        hotovo = 0
+        pool = ThreadPoolExecutor(max_workers=max(1, vlaken))
+        try:
+            for (cesta, _, _), stav in zip(skladby, pool.map(lambda radek: _stav_souboru(*radek), skladby)):
+                if stav is not None:
+                    problemy.append((stav, cesta))
+                hotovo += 1
+                if hotovo % 1000 == 0:
+                    pri_prubehu(hotovo, len(skladby))
+                    if zruseno is not None and zruseno.is_set():
+                        break
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+        pri_prubehu(hotovo, len(skladby))
+        return problemy
+
+    def exportovat(self, nazev, cesta):
+        """Zapíše playlist (i chytrý nebo All Tracks) do M3U/M3U8/PLS; vrátí počet skladeb."""
+        return prenos.exportovat(cesta, prenos.polozky_tabulky(self.tabulka, self.playlists[nazev][:]))
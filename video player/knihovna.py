@@ -0,0 +1,710 @@
+import math
+import os
+import sqlite3
+import sys
+import time
+from array import array
+from pathlib import Path
+
+from casomira import mereno
+from formaty import je_podporovany, precist_metadata
+from mp3 import GeometrieMp3
+
+NEZNAMA = float("nan")
+
+# Každá migrace posune PRAGMA user_version o jedna, starší databáze se tak dorovnají
+MIGRACE = [
+    [
+        """
+        CREATE TABLE IF NOT EXISTS tracks (
+            id INTEGER PRIMARY KEY,
+            path TEXT NOT NULL UNIQUE,
+            dir TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            mtime REAL NOT NULL,
+            title TEXT NOT NULL DEFAULT '',
+            artist TEXT NOT NULL DEFAULT '',
+            album TEXT NOT NULL DEFAULT '',
+            genre TEXT NOT NULL DEFAULT '',
+            duration REAL NOT NULL DEFAULT 0,
+            bitrate INTEGER NOT NULL DEFAULT 0,
+            added REAL NOT NULL
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS tracks_dir ON tracks(dir)",
+    ],
+    [
+        "CREATE TABLE IF NOT EXISTS roots (path TEXT PRIMARY KEY)",
+    ],
+    [
+        # Skladby z playlistů, které zmizely z disku, zůstávají v indexu jako nepřítomné,
+        # aby odkazy v playlistech přežily a po návratu souboru se znovu spárovaly
+        "ALTER TABLE tracks ADD COLUMN present INTEGER NOT NULL DEFAULT 1",
+        """
+        CREATE TABLE IF NOT EXISTS playlists (
+            id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL UNIQUE,
+            pos INTEGER NOT NULL
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS playlist_items (
+            playlist_id INTEGER NOT NULL,
+            pos INTEGER NOT NULL,
+            track_id INTEGER NOT NULL,
+            PRIMARY KEY (playlist_id, pos)
+        ) WITHOUT ROWID
+        """,
+        "CREATE INDEX IF NOT EXISTS playlist_items_track ON playlist_items(track_id)",
+    ],
+    [
+        # Rámce MP3 pro přesný seek; 0 = ještě nespočítáno, po změně souboru se nuluje
+        "ALTER TABLE tracks ADD COLUMN frames INTEGER NOT NULL DEFAULT 0",
+        "ALTER TABLE tracks ADD COLUMN sample_rate INTEGER NOT NULL DEFAULT 0",
+        "ALTER TABLE tracks ADD COLUMN samples_per_frame INTEGER NOT NULL DEFAULT 0",
+    ],
+    [
+        # Výsledek analýzy hlasitosti; analyzed = 1 i u souborů, které nešly dekódovat
+        "ALTER TABLE tracks ADD COLUMN loudness REAL",
+        "ALTER TABLE tracks ADD COLUMN peak REAL",
+        "ALTER TABLE tracks ADD COLUMN analyzed INTEGER NOT NULL DEFAULT 0",
+    ],
+    [
+        # Otisk zvukových dat (bez tagů); počítá se líně, jen když je potřeba skladbu dohledat
+        "ALTER TABLE tracks ADD COLUMN fingerprint BLOB",
+        "CREATE INDEX IF NOT EXISTS tracks_size ON tracks(size)",
+    ],
+    [
+        # Statistika přehrávání a pravidla chytrých playlistů (JSON, viz chytre.Dotaz)
+        "ALTER TABLE tracks ADD COLUMN plays INTEGER NOT NULL DEFAULT 0",
+        "ALTER TABLE tracks ADD COLUMN last_played REAL NOT NULL DEFAULT 0",
+        """
+        CREATE TABLE IF NOT EXISTS smart_playlists (
+            id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL UNIQUE,
+            rules TEXT NOT NULL
+        )
+        """,
+    ],
+    [
+        # Zvukový otisk pro hledání duplicit (hashe dvojic špiček spektra, viz duplicity.py);
+        # hashed = 1 i u souborů, které nešly dekódovat. Dvojice, které uživatel označil
+        # za různé skladby (nebo je už sloučil), se znovu nenabízejí.
+        "ALTER TABLE tracks ADD COLUMN audio_hashes BLOB",
+        "ALTER TABLE tracks ADD COLUMN hashed INTEGER NOT NULL DEFAULT 0",
+        """
+        CREATE TABLE IF NOT EXISTS not_duplicates (
+            a INTEGER NOT NULL,
+            b INTEGER NOT NULL,
+            PRIMARY KEY (a, b)
+        ) WITHOUT ROWID
+        """,
+    ],
+    [
+        # Vlna pro posuvník (viz vlnovka.Vlna.do_bajtu); po změně souboru se maže
+        "ALTER TABLE tracks ADD COLUMN waveform BLOB",
+    ],
+]
+
+
+class Skladba:
+    """Jeden záznam v indexu knihovny (tagy, délka a bitrate se čtou jen jednou)."""
+    __slots__ = ("id", "path", "size", "mtime", "title", "artist", "album", "genre",
+                 "duration", "bitrate", "loudness", "peak", "added", "plays", "last_played")
+
+    def __init__(self, id, path, size, mtime, title="", artist="", album="", genre="",
+                 duration=0.0, bitrate=0, loudness=None, peak=None, added=0.0, plays=0,
+                 last_played=0.0):
+        self.id = id
+        self.path = path
+        self.size = size
+        self.mtime = mtime
+        self.title = title
+        self.artist = artist
+        self.album = album
+        self.genre = genre
+        self.duration = duration
+        self.bitrate = bitrate
+        self.loudness = loudness
+        self.peak = peak
+        self.added = added
+        self.plays = plays
+        self.last_played = last_played
+
+    @property
+    def nazev(self):
+        return os.path.basename(self.path)
+
+
+class TabulkaSkladeb:
+    """Skladby knihovny po sloupcích, řádek je id skladby z indexu.
+
+    Čísla jsou v polích `array`, cesta je číslo internované složky a jméno souboru,
+    opakované texty (interpret, album, žánr) jsou internované. Playlisty, fronta a
+    hledání drží jen id, cesta se skládá až tam, kde je opravdu potřeba.
+    Nepřítomné řádky zůstávají, aby playlisty pořád znaly jméno chybějící skladby.
+    """
+
+    def __init__(self):
+        self.slozky = []
+        self._cislo_slozky = {}
+        self._ve_slozce = []          # pro každou složku {jméno souboru: id}
+        self.slozka = array("i")      # -1 = id bez skladby
+        self.soubor = []
+        self.size = array("q")
+        self.mtime = array("d")
+        self.duration = array("d")
+        self.bitrate = array("i")
+        self.loudness = array("d")    # NaN = ještě neměřeno
+        self.peak = array("d")
+        self.added = array("d")
+        self.plays = array("i")
+        self.last_played = array("d")     # 0 = ještě nehráno
+        self.title = []
+        self.artist = []
+        self.album = []
+        self.genre = []
+        self.pritomna = bytearray()
+        self._pocet = 0
+
+    def __len__(self):
+        return self._pocet
+
+    def __contains__(self, id):
+        return id is not None and 0 <= id < len(self.pritomna) and self.pritomna[id] == 1
+
+    def rezervovat(self, max_id):
+        """Rozšíří sloupce až po `max_id`, ať se při načítání nezvětšují po jednom řádku."""
+        chybi = max_id + 1 - len(self.slozka)
+        if chybi <= 0:
+            return
+        self.slozka.extend(array("i", [-1]) * chybi)
+        for sloupec in (self.size, self.bitrate, self.plays):
+            sloupec.extend(array(sloupec.typecode, [0]) * chybi)
+        for sloupec in (self.mtime, self.duration, self.added, self.last_played):
+            sloupec.extend(array("d", [0.0]) * chybi)
+        for sloupec in (self.loudness, self.peak):
+            sloupec.extend(array("d", [NEZNAMA]) * chybi)
+        for sloupec in (self.soubor, self.title, self.artist, self.album, self.genre):
+            sloupec.extend([""] * chybi)
+        self.pritomna.extend(bytes(chybi))
+
+    def _cislo(self, slozka_str):
+        cislo = self._cislo_slozky.get(slozka_str)
+        if cislo is None:
+            cislo = self._cislo_slozky[slozka_str] = len(self.slozky)
+            self.slozky.append(slozka_str)
+            self._ve_slozce.append({})
+        return cislo
+
+    def nastavit(self, id, path, size=0, mtime=0.0, title="", artist="", album="", genre="",
+                 duration=0.0, bitrate=0, loudness=None, peak=None, added=0.0, plays=0,
+                 last_played=0.0, pritomna=True):
+        """Zapíše řádek; parametry jsou ve stejném pořadí jako sloupce indexu a Skladba."""
+        self.rezervovat(id)
+        slozka_str, soubor = os.path.split(path)
+        cislo = self._cislo(slozka_str)
+        if self.slozka[id] != -1 and (self.slozka[id] != cislo or self.soubor[id] != soubor):
+            self._zapomenout_cestu(id)
+        self.slozka[id] = cislo
+        self.soubor[id] = soubor
+        self._ve_slozce[cislo][soubor] = id
+        self.size[id] = size
+        self.mtime[id] = mtime
+        self.title[id] = title
+        self.artist[id] = sys.intern(artist)
+        self.album[id] = sys.intern(album)
+        self.genre[id] = sys.intern(genre)
+        self.duration[id] = duration
+        self.bitrate[id] = bitrate
+        self.nastavit_hlasitost(id, loudness, peak)
+        self.added[id] = added
+        self.plays[id] = plays
+        self.last_played[id] = last_played
+        if bool(pritomna) != (self.pritomna[id] == 1):
+            self._pocet += 1 if pritomna else -1
+        self.pritomna[id] = 1 if pritomna else 0
+        return id
+
+    def nastavit_skladbu(self, skladba):
+        return self.nastavit(
+            skladba.id, skladba.path, skladba.size, skladba.mtime, skladba.title, skladba.artist,
+            skladba.album, skladba.genre, skladba.duration, skladba.bitrate, skladba.loudness, skladba.peak,
+            skladba.added, skladba.plays, skladba.last_played,
+        )
+
+    def nastavit_hlasitost(self, id, loudness, peak):
+        self.loudness[id] = NEZNAMA if loudness is None else loudness
+        self.peak[id] = NEZNAMA if peak is None else peak
+
+    def hlasitost(self, id):
+        """(hlasitost, špička) skladby, None u dosud neměřených hodnot."""
+        hlasitost, spicka = self.loudness[id], self.peak[id]
+        return (None if math.isnan(hlasitost) else hlasitost, None if math.isnan(spicka) else spicka)
+
+    def _zapomenout_cestu(self, id):
+        ve_slozce = self._ve_slozce[self.slozka[id]]
+        if ve_slozce.get(self.soubor[id]) == id:
+            del ve_slozce[self.soubor[id]]
+
+    def odebrat(self, id):
+        """Skladba zmizí z knihovny; řádek zůstane kvůli playlistům, které na ni odkazují."""
+        if id in self:
+            self.pritomna[id] = 0
+            self._pocet -= 1
+
+    def id(self, cesta):
+        slozka_str, soubor = os.path.split(cesta)
+        cislo = self._cislo_slozky.get(slozka_str)
+        return None if cislo is None else self._ve_slozce[cislo].get(soubor)
+
+    def cesta(self, id):
+        return os.path.join(self.slozky[self.slozka[id]], self.soubor[id])
+
+    def slozka_skladby(self, id):
+        return self.slozky[self.slozka[id]]
+
+    def nazev(self, id):
+        return self.soubor[id] if 0 <= id < len(self.soubor) else ""
+
+    def skladba(self, id):
+        """Řádek jako Skladba, pro místa, kde se hodí celý záznam najednou."""
+        if not 0 <= id < len(self.slozka) or self.slozka[id] == -1:
+            return None
+        return Skladba(
+            id, self.cesta(id), self.size[id], self.mtime[id], self.title[id], self.artist[id],
+            self.album[id], self.genre[id], self.duration[id], self.bitrate[id], *self.hlasitost(id),
+            self.added[id], self.plays[id], self.last_played[id],
+        )
+
+    def pritomne(self):
+        """Id všech skladeb v knihovně (v pořadí id)."""
+        return array("i", (id for id, pritomna in enumerate(self.pritomna) if pritomna))
+
+
+@mereno("čtení tagů")
+def precist_tagy(cesta):
+    return precist_metadata(cesta)
+
+
+def precist_tagy_davky(cesty):
+    """Tagy více souborů najednou; jedna úloha pro pracovní proces skeneru."""
+    return [precist_metadata(cesta) for cesta in cesty]
+
+
+class IndexKnihovny:
+    """Trvalý index skladeb v SQLite, klíčovaný cestou, velikostí a časem změny."""
+
+    def __init__(self, db_path):
+        self.db_path = Path(db_path)
+        self.conn = sqlite3.connect(str(self.db_path))
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        # Pravidla chytrých playlistů porovnávají texty bez ohledu na velikost písmen
+        # stejně jako Python (SQLite lower() umí jen ASCII)
+        self.conn.create_function("casefold", 1, lambda text: (text or "").casefold(), deterministic=True)
+        self.vytvorit_schema()
+
+    def vytvorit_schema(self):
+        verze = self.conn.execute("PRAGMA user_version").fetchone()[0]
+        for nova_verze in range(verze + 1, len(MIGRACE) + 1):
+            with self.conn:
+                for prikaz in MIGRACE[nova_verze - 1]:
+                    self.conn.execute(prikaz)
+                self.conn.execute(f"PRAGMA user_version={nova_verze}")
+
+    def zavrit(self):
+        self.conn.close()
+
+    def _radek_na_skladbu(self, radek):
+        return Skladba(*radek)
+
+    _SLOUPCE = ("id, path, size, mtime, title, artist, album, genre, duration, bitrate, loudness, peak, "
+                "added, plays, last_played")
+
+    def nacist_vse(self):
+        radky = self.conn.execute(
+            f"SELECT {self._SLOUPCE} FROM tracks WHERE present = 1 ORDER BY path"
+        )
+        return {r[1]: self._radek_na_skladbu(r) for r in radky}
+
+    def nacist_tabulku(self):
+        """Knihovna jako TabulkaSkladeb a pole id přítomných skladeb seřazených podle cesty.
+
+        Načtou se i nepřítomné skladby, na které odkazuje některý playlist, ať mají jméno.
+        """
+        tabulka = TabulkaSkladeb()
+        poradi = array("i")
+        max_id = self.conn.execute("SELECT MAX(id) FROM tracks").fetchone()[0]
+        if max_id is not None:
+            tabulka.rezervovat(max_id)
+        radky = self.conn.execute(f"""
+            SELECT {self._SLOUPCE}, present FROM tracks
+            WHERE present = 1 OR id IN (SELECT track_id FROM playlist_items)
+            ORDER BY path
+        """)
+        for radek in radky:
+            tabulka.nastavit(*radek[:-1], pritomna=radek[-1])
+            if radek[-1]:
+                poradi.append(radek[0])
+        return tabulka, poradi
+
+    def koreny(self):
+        return [r[0] for r in self.conn.execute("SELECT path FROM roots ORDER BY path")]
+
+    def pridat_koren(self, slozka):
+        slozka_str = str(Path(slozka).resolve())
+        with self.conn:
+            self.conn.execute("INSERT OR IGNORE INTO roots (path) VALUES (?)", (slozka_str,))
+        return slozka_str
+
+    def zname_soubory(self, slozka, rekurzivne=True):
+        """Vrátí {cesta: (velikost, mtime)} pro skladby ve složce (případně i v podsložkách)."""
+        slozka_str = str(slozka)
+        if rekurzivne:
+            prefix = os.path.join(slozka_str, "")
+            radky = self.conn.execute(
+                "SELECT path, size, mtime FROM tracks "
+                "WHERE present = 1 AND (dir = ? OR substr(dir, 1, ?) = ?)",
+                (slozka_str, len(prefix), prefix),
+            )
+        else:
+            radky = self.conn.execute(
+                "SELECT path, size, mtime FROM tracks WHERE present = 1 AND dir = ?",
+                (slozka_str,),
+            )
+        return {r[0]: (r[1], r[2]) for r in radky}
+
+    def najit(self, path_str):
+        radek = self.conn.execute(
+            f"SELECT {self._SLOUPCE} FROM tracks WHERE path = ? AND present = 1", (path_str,)
+        ).fetchone()
+        return self._radek_na_skladbu(radek) if radek else None
+
+    def nacist_cesty(self, cesty):
+        vysledek = []
+        cesty = list(cesty)
+        for i in range(0, len(cesty), 500):
+            kus = cesty[i:i + 500]
+            otazniky = ",".join("?" * len(kus))
+            radky = self.conn.execute(
+                f"SELECT {self._SLOUPCE} FROM tracks WHERE path IN ({otazniky})", kus
+            )
+            vysledek.extend(self._radek_na_skladbu(r) for r in radky)
+        return vysledek
+
+    def ulozit_skladby(self, polozky):
+        """Zapíše dávku (cesta, velikost, mtime, tagy) v jedné transakci a vrátí záznamy."""
+        ted = time.time()
+        with self.conn:
+            self.conn.executemany("""
+                INSERT INTO tracks (path, dir, size, mtime, title, artist, album, genre,
+                                    duration, bitrate, added)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(path) DO UPDATE SET
+                    size = excluded.size, mtime = excluded.mtime,
+                    title = excluded.title, artist = excluded.artist,
+                    album = excluded.album, genre = excluded.genre,
+                    duration = excluded.duration, bitrate = excluded.bitrate,
+                    frames = 0, loudness = NULL, peak = NULL, analyzed = 0, fingerprint = NULL,
+                    audio_hashes = NULL, hashed = 0, waveform = NULL, present = 1
+            """, [
+                (
+                    path_str, os.path.dirname(path_str), size, mtime,
+                    tagy.get("title", ""), tagy.get("artist", ""), tagy.get("album", ""),
+                    tagy.get("genre", ""), tagy.get("duration", 0.0), tagy.get("bitrate", 0),
+                    ted,
+                )
+                for path_str, size, mtime, tagy in polozky
+            ])
+        return self.nacist_cesty(p[0] for p in polozky)
+
+    def geometrie(self, path_str):
+        radek = self.conn.execute(
+            "SELECT frames, sample_rate, samples_per_frame FROM tracks WHERE path = ? AND frames > 0",
+            (path_str,),
+        ).fetchone()
+        return GeometrieMp3(*radek) if radek else None
+
+    def ulozit_geometrii(self, path_str, geometrie):
+        """Uloží rámce MP3 a s nimi i přesnou délku (u VBR bez hlavičky je Mutagen jen odhaduje)."""
+        with self.conn:
+            self.conn.execute(
+                "UPDATE tracks SET frames = ?, sample_rate = ?, samples_per_frame = ?, duration = ? "
+                "WHERE path = ?",
+                (geometrie.ramce, geometrie.vzorkovani, geometrie.vzorku_na_ramec,
+                 geometrie.delka, path_str),
+            )
+
+    def vlna(self, path_str):
+        radek = self.conn.execute("SELECT waveform FROM tracks WHERE path = ?", (path_str,)).fetchone()
+        return radek[0] if radek else None
+
+    def ulozit_vlnu(self, path_str, data):
+        with self.conn:
+            self.conn.execute("UPDATE tracks SET waveform = ? WHERE path = ?", (data, path_str))
+
+    def neanalyzovane(self):
+        """Cesty skladeb, které ještě neprošly analýzou hlasitosti (nové nebo změněné)."""
+        return [r[0] for r in self.conn.execute(
+            "SELECT path FROM tracks WHERE present = 1 AND analyzed = 0 ORDER BY id"
+        )]
+
+    def ulozit_hlasitost(self, vysledky):
+        """Zapíše dávku (cesta, hlasitost, špička) z analýzy v jedné transakci."""
+        with self.conn:
+            self.conn.executemany(
+                "UPDATE tracks SET loudness = ?, peak = ?, analyzed = 1 WHERE path = ?",
+                [(hlasitost, spicka, path_str) for path_str, hlasitost, spicka in vysledky],
+            )
+
+    def bez_otisku(self):
+        """Skladby z playlistů, které ještě nemají otisk: [(id, cesta)]."""
+        return self.conn.execute("""
+            SELECT id, path FROM tracks
+            WHERE fingerprint IS NULL AND id IN (SELECT track_id FROM playlist_items)
+        """).fetchall()
+
+    def ulozit_otisky(self, otisky):
+        with self.conn:
+            self.conn.executemany(
+                "UPDATE tracks SET fingerprint = ? WHERE id = ?",
+                [(otisk, track_id) for track_id, otisk in otisky],
+            )
+
+    def bez_zvukoveho_otisku(self):
+        """Skladby, které ještě nemají zvukový otisk pro hledání duplicit: [(id, cesta)]."""
+        return self.conn.execute(
+            "SELECT id, path FROM tracks WHERE present = 1 AND hashed = 0 ORDER BY id"
+        ).fetchall()
+
+    def ulozit_zvukove_otisky(self, otisky):
+        """Zapíše dávku (id, otisk) v jedné transakci; otisk None = soubor nešel dekódovat."""
+        with self.conn:
+            self.conn.executemany(
+                "UPDATE tracks SET audio_hashes = ?, hashed = 1 WHERE id = ?",
+                [(otisk, track_id) for track_id, otisk in otisky],
+            )
+
+    def zvukove_otisky(self):
+        return self.conn.execute(
+            "SELECT id, audio_hashes FROM tracks WHERE present = 1 AND audio_hashes IS NOT NULL"
+        )
+
+    def ignorovane_duplicity(self):
+        return set(self.conn.execute("SELECT a, b FROM not_duplicates"))
+
+    def ignorovat_duplicity(self, skladby):
+        """Skladby se už nebudou nabízet jako duplicity jedna druhé."""
+        skladby = sorted(set(skladby))
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO not_duplicates (a, b) VALUES (?, ?)",
+                [(a, b) for i, a in enumerate(skladby) for b in skladby[i + 1:]],
+            )
+
+    def sloucit_duplicity(self, ponechana, ostatni):
+        """Přesměruje playlisty z duplicit na ponechanou skladbu a převede na ni statistiku přehrávání.
+
+        Duplicity v knihovně zůstávají (soubory jsou pořád na disku), jen bez playlistů
+        a přehrání, a skupina se už znovu nenabídne.
+        """
+        with self.conn:
+            self.conn.executemany(
+                "UPDATE playlist_items SET track_id = ? WHERE track_id = ?",
+                [(ponechana, stara) for stara in ostatni],
+            )
+            self.conn.executemany("""
+                UPDATE tracks SET
+                    added = MIN(added, (SELECT added FROM tracks WHERE id = :stara)),
+                    plays = plays + (SELECT plays FROM tracks WHERE id = :stara),
+                    last_played = MAX(last_played, (SELECT last_played FROM tracks WHERE id = :stara))
+                WHERE id = :nova
+            """, [{"stara": stara, "nova": ponechana} for stara in ostatni])
+            self.conn.executemany(
+                "UPDATE tracks SET plays = 0, last_played = 0 WHERE id = ?", [(stara,) for stara in ostatni]
+            )
+        self.ignorovat_duplicity([ponechana, *ostatni])
+
+    def zapocitat_prehrani(self, track_id, ted):
+        with self.conn:
+            self.conn.execute(
+                "UPDATE tracks SET plays = plays + 1, last_played = ? WHERE id = ?", (ted, track_id)
+            )
+
+    def nepritomne(self):
+        """Skladby z playlistů mimo knihovnu: [(id, cesta, velikost, otisk)]."""
+        return self.conn.execute(
+            "SELECT id, path, size, fingerprint FROM tracks WHERE present = 0"
+        ).fetchall()
+
+    def podle_velikosti(self, velikosti):
+        """Skladby v knihovně s danou velikostí souboru: [(id, cesta, velikost, otisk)]."""
+        vysledek = []
+        velikosti = list(velikosti)
+        for i in range(0, len(velikosti), 500):
+            kus = velikosti[i:i + 500]
+            otazniky = ",".join("?" * len(kus))
+            vysledek.extend(self.conn.execute(
+                f"SELECT id, path, size, fingerprint FROM tracks WHERE present = 1 AND size IN ({otazniky})",
+                kus,
+            ))
+        return vysledek
+
+    def pritomne_cesty(self):
+        return self.conn.execute("SELECT id, path, size FROM tracks WHERE present = 1").fetchall()
+
+    def premapovat(self, zmeny):
+        """Přesměruje playlisty ze ztracených skladeb na nalezené a ztracené smaže.
+
+        `zmeny` je [(staré id, nové id, stejný zvuk)]. Nová skladba převezme datum přidání
+        a statistiku přehrávání, u shody otisku i analýzu hlasitosti, rámce MP3, zvukový
+        otisk a vlnu, pokud je ještě nemá.
+        """
+        with self.conn:
+            self.conn.executemany(
+                "UPDATE playlist_items SET track_id = ? WHERE track_id = ?",
+                [(nove, stare) for stare, nove, _ in zmeny],
+            )
+            self.conn.executemany("""
+                UPDATE tracks SET
+                    added = MIN(added, (SELECT added FROM tracks WHERE id = :stare)),
+                    plays = plays + (SELECT plays FROM tracks WHERE id = :stare),
+                    last_played = MAX(last_played, (SELECT last_played FROM tracks WHERE id = :stare))
+                WHERE id = :nove
+            """, [{"stare": stare, "nove": nove} for stare, nove, _ in zmeny])
+            stejne = [{"stare": stare, "nove": nove} for stare, nove, stejny_zvuk in zmeny if stejny_zvuk]
+            self.conn.executemany("""
+                UPDATE tracks SET
+                    loudness = (SELECT loudness FROM tracks WHERE id = :stare),
+                    peak = (SELECT peak FROM tracks WHERE id = :stare),
+                    analyzed = 1
+                WHERE id = :nove AND analyzed = 0
+                    AND (SELECT analyzed FROM tracks WHERE id = :stare) = 1
+            """, stejne)
+            self.conn.executemany("""
+                UPDATE tracks SET
+                    frames = (SELECT frames FROM tracks WHERE id = :stare),
+                    sample_rate = (SELECT sample_rate FROM tracks WHERE id = :stare),
+                    samples_per_frame = (SELECT samples_per_frame FROM tracks WHERE id = :stare)
+                WHERE id = :nove AND frames = 0
+                    AND (SELECT frames FROM tracks WHERE id = :stare) > 0
+            """, stejne)
+            self.conn.executemany("""
+                UPDATE tracks SET
+                    audio_hashes = (SELECT audio_hashes FROM tracks WHERE id = :stare),
+                    hashed = 1
+                WHERE id = :nove AND hashed = 0
+                    AND (SELECT hashed FROM tracks WHERE id = :stare) = 1
+            """, stejne)
+            self.conn.executemany("""
+                UPDATE tracks SET waveform = (SELECT waveform FROM tracks WHERE id = :stare)
+                WHERE id = :nove AND waveform IS NULL
+            """, stejne)
+            self.conn.executemany(
+                "DELETE FROM tracks WHERE id = ?", [(stare,) for stare, _, _ in zmeny]
+            )
+
+    def odebrat_skladby(self, cesty):
+        parametry = [(p,) for p in cesty]
+        with self.conn:
+            self.conn.executemany("""
+                UPDATE tracks SET present = 0
+                WHERE path = ? AND id IN (SELECT track_id FROM playlist_items)
+            """, parametry)
+            self.conn.executemany(
+                "DELETE FROM tracks WHERE path = ? AND present = 1", parametry
+            )
+
+    def id_pro_cesty(self, cesty):
+        """Vrátí {cesta: id}; cesty mimo knihovnu se založí jako nepřítomné skladby."""
+        cesty = list(dict.fromkeys(cesty))
+        ids = {}
+        for i in range(0, len(cesty), 500):
+            kus = cesty[i:i + 500]
+            otazniky = ",".join("?" * len(kus))
+            ids.update(self.conn.execute(
+                f"SELECT path, id FROM tracks WHERE path IN ({otazniky})", kus
+            ))
+
+        chybi = [p for p in cesty if p not in ids]
+        if chybi:
+            ted = time.time()
+            with self.conn:
+                self.conn.executemany("""
+                    INSERT OR IGNORE INTO tracks (path, dir, size, mtime, added, present)
+                    VALUES (?, ?, 0, 0, ?, 0)
+                """, [(p, os.path.dirname(p), ted) for p in chybi])
+            for i in range(0, len(chybi), 500):
+                kus = chybi[i:i + 500]
+                otazniky = ",".join("?" * len(kus))
+                ids.update(self.conn.execute(
+                    f"SELECT path, id FROM tracks WHERE path IN ({otazniky})", kus
+                ))
+        return ids
+
+    def prohledat(self, slozka):
+        """Synchronní rekurzivní sken jedné složky bez Qt, tagy čte jen u nových a změněných souborů.
+
+        Vrací počet přidaných, změněných a odebraných skladeb.
+        """
+        slozka_str = str(Path(slozka).resolve())
+        na_disku, _ = projit_slozku(slozka_str, rekurzivne=True)
+        nove, zmenene, odebrane = porovnat(self.zname_soubory(slozka_str), na_disku)
+        if odebrane:
+            self.odebrat_skladby(odebrane)
+        polozky = [(p, size, mtime, precist_tagy(p)) for p, size, mtime in nove + zmenene]
+        if polozky:
+            self.ulozit_skladby(polozky)
+        return len(nove), len(zmenene), len(odebrane)
+
+
+def projit_slozku(slozka_str, rekurzivne=True, preskocit=(), zruseno=None):
+    """Projde složku na disku a vrátí ({cesta: (velikost, mtime)}, seznam prošlých složek).
+
+    Bez rekurze se vrátí i podsložky, které nejsou v `preskocit`, projdou se pak celé,
+    aby hlídání změn zachytilo nově vytvořené adresáře. Po nastavení `zruseno` skončí
+    u další složky a výsledek je neúplný.
+    """
+    na_disku = {}
+    prosle = []
+    fronta = [(slozka_str, rekurzivne)]
+    while fronta:
+        if zruseno is not None and zruseno.is_set():
+            break
+        aktualni, do_hloubky = fronta.pop()
+        try:
+            it = os.scandir(aktualni)
+        except OSError as e:
+            print(f"Nelze otevřít složku {aktualni}: {e}")
+            continue
+        prosle.append(aktualni)
+        with it:
+            for polozka in it:
+                try:
+                    if polozka.is_dir(follow_symlinks=False):
+                        if do_hloubky or polozka.path not in preskocit:
+                            fronta.append((polozka.path, True))
+                        continue
+                    if not je_podporovany(polozka.name):
+                        continue
+                    if not polozka.is_file():
+                        continue
+                    st = polozka.stat()
+                except OSError:
+                    continue
+                na_disku[polozka.path] = (st.st_size, st.st_mtime)
+    return na_disku, prosle
+
+
+def porovnat(zname, na_disku):
+    """Rozdíl mezi indexem a diskem: (nové, změněné, odebrané)."""
+    nove, zmenene = [], []
+    for path_str, (size, mtime) in na_disku.items():
+        zaznam = zname.get(path_str)
+        if zaznam is None:
+            nove.append((path_str, size, mtime))
+        elif zaznam != (size, mtime):
+            zmenene.append((path_str, size, mtime))
+    odebrane = [p for p in zname if p not in na_disku]
+    return nove, zmenene, odebrane
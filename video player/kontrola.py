@@ -0,0 +1,109 @@
+import os
+import threading
+
+from knihovna import IndexKnihovny
+from identita import otisk, jmeno_souboru
+
+VELIKOST_DAVKY = 200
+
+
+def _nic(*_):
+    pass
+
+
+class Kontrola:
+    """Najde skladby z playlistů, které zmizely z disku, a přesměruje je na nové místo.
+
+    Nic se nepřepočítává celé: otisk se počítá jen pro skladby z playlistů (jednou) a pro
+    skladby v knihovně se stejnou velikostí souboru jako ta chybějící. Kde otisk chybí
+    nebo nesedí, rozhodne jedinečné jméno souboru. Vše se zapíše v jedné transakci
+    a `pri_premapovani` dostane {staré id: nové id}.
+    """
+
+    def __init__(self, db_path, pri_premapovani=_nic):
+        self.db_path = db_path
+        self.pri_premapovani = pri_premapovani
+        self._zruseno = threading.Event()
+
+    def zrusit(self):
+        self._zruseno.set()
+
+    def spustit(self):
+        """Vrátí (přesměrováno, stále chybí)."""
+        index = IndexKnihovny(self.db_path)
+        try:
+            return self._zkontrolovat(index)
+        finally:
+            index.zavrit()
+
+    def _doplnit_otisky(self, index, skladby):
+        """Spočítá otisky existujících souborů po dávkách; vrátí {id: otisk}."""
+        otisky = {}
+        davka = []
+        for track_id, cesta in skladby:
+            if self._zruseno.is_set():
+                break
+            hodnota = otisk(cesta)
+            if hodnota is None:
+                continue
+            otisky[track_id] = hodnota
+            davka.append((track_id, hodnota))
+            if len(davka) >= VELIKOST_DAVKY:
+                index.ulozit_otisky(davka)
+                davka = []
+        if davka:
+            index.ulozit_otisky(davka)
+        return otisky
+
+    def _zkontrolovat(self, index):
+        # Otisk musí mít skladba dřív, než zmizí, jinak se pak dá dohledat už jen podle jména
+        self._doplnit_otisky(index, [(i, cesta) for i, cesta in index.bez_otisku() if os.path.exists(cesta)])
+
+        chybi = [radek for radek in index.nepritomne() if not os.path.exists(radek[1])]
+        if not chybi or self._zruseno.is_set():
+            return 0, len(chybi)
+
+        zmeny = []
+
+        # 1) Stejná velikost a stejný otisk: jde o tentýž soubor, jen jinde
+        s_otiskem = [radek for radek in chybi if radek[3] is not None and radek[2] > 0]
+        kandidati = {}
+        bez = []
+        for track_id, cesta, velikost, hodnota in index.podle_velikosti({r[2] for r in s_otiskem}):
+            kandidati.setdefault(velikost, []).append([track_id, cesta, hodnota])
+            if hodnota is None:
+                bez.append((track_id, cesta))
+        dopocitane = self._doplnit_otisky(index, bez)
+        for skupina in kandidati.values():
+            for kandidat in skupina:
+                kandidat[2] = kandidat[2] or dopocitane.get(kandidat[0])
+
+        for track_id, cesta, velikost, hodnota in s_otiskem:
+            shody = [k for k in kandidati.get(velikost, ()) if k[2] == hodnota]
+            if not shody:
+                continue
+            # Duplicitní soubory: přednost má ten se stejným jménem
+            jmeno = jmeno_souboru(cesta)
+            shoda = next((k for k in shody if jmeno_souboru(k[1]) == jmeno), shody[0])
+            zmeny.append((track_id, shoda[0], True))
+
+        # 2) Zbytek (skladby z cizího počítače, změněné tagy) podle jedinečného jména souboru
+        prirazene = {z[0] for z in zmeny}
+        zbyva = [radek for radek in chybi if radek[0] not in prirazene]
+        if zbyva and not self._zruseno.is_set():
+            podle_jmena = {}
+            for track_id, cesta, velikost in index.pritomne_cesty():
+                podle_jmena.setdefault(jmeno_souboru(cesta).casefold(), []).append((track_id, velikost))
+            for track_id, cesta, velikost, _ in zbyva:
+                shody = podle_jmena.get(jmeno_souboru(cesta).casefold(), ())
+                if len(shody) > 1 and velikost > 0:
+                    shody = [k for k in shody if k[1] == velikost]
+                if len(shody) == 1:
+                    zmeny.append((track_id, shody[0][0], False))
+
+        if self._zruseno.is_set():
+            zmeny = []
+        if zmeny:
+            index.premapovat(zmeny)
+            self.pri_premapovani({stare: nove for stare, nove, _ in zmeny})
+        return len(zmeny), len(chybi) - len(zmeny)
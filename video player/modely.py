@@ -0,0 +1,323 @@
+from array import array
+from itertools import islice
+
+from PySide6.QtCore import Qt, QAbstractListModel, QMimeData, QModelIndex, QRectF, QSize
+from PySide6.QtGui import QColor, QPainter, QPainterPath
+from PySide6.QtWidgets import QAbstractItemView, QHeaderView, QStyle, QStyledItemDelegate, QTableView
+
+CESTA_ROLE = Qt.UserRole + 1
+# Přetahované řádky nesou jen pozice v playlistu, skladby se přesouvají v poli id
+MIME_POZICE = "application/x-craftora-pozice"
+
+
+class ModelSkladeb(QAbstractListModel):
+    """Model seznamu skladeb nad polem id z playlistu.
+
+    Pole se nekopíruje a názvy i cesty se zjišťují až při vykreslení; Qt se ptá jen na
+    viditelné řádky. Přepnutí playlistu nebo filtru je reset modelu, který je konstantní
+    jen v SeznamSkladeb: QListView by po něm znovu rozložil všechny řádky. Filtr zadaný
+    iterátorem se čte po dávkách (canFetchMore/fetchMore), jak pohled roluje.
+    """
+
+    # Kolik řádků filtru se přečte najednou; víc, než se vejde na obrazovku
+    DAVKA_RADKU = 256
+
+    def __init__(self, popisek, cesta, parent=None, obal=None):
+        super().__init__(parent)
+        self.popisek = popisek
+        self.cesta_skladby = cesta
+        self.obal = obal   # id -> QPixmap nebo None; volá se jen pro vykreslované řádky
+        self.presun = None  # (pozice, cíl) -> None; když je nastavený, řádky jdou přetahovat
+        self.skladby = []
+        self.radky = None  # při filtrování seznam pozic ve `skladby`, jinak None
+        self._dalsi_radky = None  # zbytek filtru, který se ještě nečetl
+        self._radek_podle_pozice = None
+
+    def nastavit(self, skladby):
+        self.beginResetModel()
+        self.skladby = skladby
+        self.radky = None
+        self._dalsi_radky = None
+        self._radek_podle_pozice = None
+        self.endResetModel()
+
+    def filtrovat(self, pozice):
+        """Zobrazí jen dané pozice z playlistu (seznam nebo iterátor), None filtr zruší."""
+        self.beginResetModel()
+        if pozice is None or isinstance(pozice, list):
+            self.radky, self._dalsi_radky = pozice, None
+        else:
+            self.radky, self._dalsi_radky = [], iter(pozice)
+            self._precist_davku()
+        self._radek_podle_pozice = None
+        self.endResetModel()
+
+    def _precist_davku(self):
+        davka = list(islice(self._dalsi_radky, self.DAVKA_RADKU))
+        if len(davka) < self.DAVKA_RADKU:
+            self._dalsi_radky = None
+        return davka
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and self._dalsi_radky is not None
+
+    def fetchMore(self, parent=QModelIndex()):
+        if not self.canFetchMore(parent):
+            return
+        davka = self._precist_davku()
+        if davka:
+            konec = len(self.radky)
+            self.beginInsertRows(QModelIndex(), konec, konec + len(davka) - 1)
+            self.radky.extend(davka)
+            self._radek_podle_pozice = None
+            self.endInsertRows()
+
+    def nacist_vse(self):
+        """Dočte celý filtr (označení všeho, hledání řádku skladby)."""
+        while self.canFetchMore():
+            self.fetchMore()
+
+    def obnovit(self):
+        self.beginResetModel()
+        self._radek_podle_pozice = None
+        self.endResetModel()
+
+    def pripojeno(self, pocet):
+        """Na konec `skladby` přibylo `pocet` položek (např. dávka ze skeneru)."""
+        if self.radky is not None or pocet <= 0:
+            return
+        konec = len(self.skladby)
+        self.beginInsertRows(QModelIndex(), konec - pocet, konec - 1)
+        self.endInsertRows()
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.skladby) if self.radky is None else len(self.radky)
+
+    def pozice(self, radek):
+        if radek < 0 or radek >= self.rowCount():
+            return -1
+        return radek if self.radky is None else self.radky[radek]
+
+    def skladba(self, radek):
+        pozice = self.pozice(radek)
+        return self.skladby[pozice] if pozice != -1 else None
+
+    def radek(self, pozice):
+        """Opak `pozice`: řádek v pohledu pro pozici v playlistu, -1 když je odfiltrovaná."""
+        if self.radky is None:
+            return pozice if 0 <= pozice < len(self.skladby) else -1
+        self.nacist_vse()
+        if self._radek_podle_pozice is None:
+            self._radek_podle_pozice = {p: r for r, p in enumerate(self.radky)}
+        return self._radek_podle_pozice.get(pozice, -1)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        skladba = self.skladba(index.row())
+        if skladba is None:
+            return None
+        if role == Qt.DisplayRole:
+            return self.popisek(skladba)
+        if role == Qt.ToolTipRole or role == CESTA_ROLE:
+            return self.cesta_skladby(skladba)
+        if role == Qt.DecorationRole and self.obal is not None:
+            return self.obal(skladba)
+        return None
+
+    def flags(self, index):
+        priznaky = super().flags(index)
+        # Přetahovat jde jen nefiltrovaný seznam, jinak by cíl mezi skrytými řádky nedával smysl
+        if self.presun is None or self.radky is not None:
+            return priznaky
+        if index.isValid():
+            return priznaky | Qt.ItemIsDragEnabled
+        return priznaky | Qt.ItemIsDropEnabled
+
+    def supportedDropActions(self):
+        return Qt.MoveAction
+
+    def mimeTypes(self):
+        return [MIME_POZICE]
+
+    def mimeData(self, indexes):
+        data = QMimeData()
+        data.setData(MIME_POZICE, array("i", sorted({self.pozice(i.row()) for i in indexes})).tobytes())
+        return data
+
+    def dropMimeData(self, data, action, row, column, parent):
+        if self.presun is None or not data.hasFormat(MIME_POZICE):
+            return False
+        if row == -1:
+            row = parent.row() if parent.isValid() else self.rowCount()
+        pozice = array("i")
+        pozice.frombytes(bytes(data.data(MIME_POZICE)))
+        self.presun(pozice, row)
+        # Přesun už je hotový; False zabrání pohledu, aby pak zdrojové řádky ještě mazal
+        return False
+
+
+class ModelPlaylistu(QAbstractListModel):
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.nazvy = []
+        self.chytre = set()
+
+    def nastavit(self, nazvy, chytre=()):
+        self.beginResetModel()
+        self.nazvy = list(nazvy)
+        self.chytre = set(chytre)
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.nazvy)
+
+    def nazev(self, radek):
+        return self.nazvy[radek] if 0 <= radek < len(self.nazvy) else None
+
+    def data(self, index, role=Qt.DisplayRole):
+        if index.isValid() and role == Qt.DisplayRole:
+            nazev = self.nazev(index.row())
+            return f"⚡ {nazev}" if nazev in self.chytre else nazev
+        return None
+
+
+class ModelSkupin(QAbstractListModel):
+    """Seznam skupin při procházení (interpreti, alba, žánry).
+
+    Drží jen klíče; popisek i s počtem skladeb se skládá až při vykreslení, takže živé
+    počty během skenu stojí jen překreslení viditelných řádků.
+    """
+
+    obal = None
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.klice = []
+        self.popisek = str
+        self.radky = None  # při filtrování seznam indexů do `klice`
+
+    def nastavit(self, klice, popisek):
+        self.beginResetModel()
+        self.klice = klice
+        self.popisek = popisek
+        self.radky = None
+        self.endResetModel()
+
+    def filtrovat(self, text):
+        self.beginResetModel()
+        text = text.strip().casefold()
+        if text:
+            self.radky = [i for i, klic in enumerate(self.klice) if text in self.popisek(klic).casefold()]
+        else:
+            self.radky = None
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.klice) if self.radky is None else len(self.radky)
+
+    def klic(self, radek):
+        if radek < 0 or radek >= self.rowCount():
+            return None
+        return self.klice[radek if self.radky is None else self.radky[radek]]
+
+    def data(self, index, role=Qt.DisplayRole):
+        if index.isValid() and role == Qt.DisplayRole:
+            return self.popisek(self.klic(index.row()))
+        return None
+
+
+class DelegatSkladby(QStyledItemDelegate):
+    """Kreslí zaoblené řádky ručně místo stylesheetu na každou položku."""
+
+    POZADI = QColor(60, 65, 85, 200)
+    POZADI_HOVER = QColor(80, 85, 105, 220)
+    POZADI_VYBRANE = QColor("#0078D7")
+    POZADI_OBALU = QColor(255, 255, 255, 25)
+    PADDING = 10
+    OKRAJ_OBALU = 3
+    MEZERA = 8
+    RADIUS = 8
+
+    @classmethod
+    def vyska(cls, metriky):
+        return metriky.height() + 2 * cls.PADDING + cls.MEZERA
+
+    def sizeHint(self, option, index):
+        return QSize(option.rect.width(), self.vyska(option.fontMetrics))
+
+    def paint(self, painter, option, index):
+        painter.save()
+        painter.setRenderHint(QPainter.Antialiasing)
+
+        obdelnik = QRectF(option.rect).adjusted(0, 0, 0, -self.MEZERA)
+        if option.state & QStyle.State_Selected:
+            pozadi = self.POZADI_VYBRANE
+        elif option.state & QStyle.State_MouseOver:
+            pozadi = self.POZADI_HOVER
+        else:
+            pozadi = self.POZADI
+
+        cesta = QPainterPath()
+        cesta.addRoundedRect(obdelnik, self.RADIUS, self.RADIUS)
+        painter.fillPath(cesta, pozadi)
+
+        obsah = obdelnik.adjusted(self.PADDING, 0, -self.PADDING, 0)
+        if index.model().obal is not None:
+            # Místo na obal je v každém řádku, aby text nepřeskakoval, až obal dorazí
+            strana = obdelnik.height() - 2 * self.OKRAJ_OBALU
+            misto = QRectF(
+                obdelnik.left() + self.OKRAJ_OBALU, obdelnik.top() + self.OKRAJ_OBALU, strana, strana
+            )
+            obal = index.data(Qt.DecorationRole)
+            if obal is not None:
+                painter.setRenderHint(QPainter.SmoothPixmapTransform)
+                painter.drawPixmap(misto, obal, QRectF(obal.rect()))
+            else:
+                painter.fillRect(misto, self.POZADI_OBALU)
+            obsah.setLeft(misto.right() + self.PADDING)
+
+        painter.setPen(QColor(255, 255, 255))
+        text = option.fontMetrics.elidedText(
+            index.data(Qt.DisplayRole) or "", Qt.ElideRight, int(obsah.width()),
+        )
+        painter.drawText(obsah, Qt.AlignVCenter | Qt.AlignLeft, text)
+        painter.restore()
+
+
+class SeznamSkladeb(QTableView):
+    """Seznam skladeb jako tabulka o jednom sloupci a řádcích pevné výšky.
+
+    QListView si i s jednotnou výškou řádků po každém resetu modelu spočítá polohu všech
+    řádků (u 100k skladeb stovky ms při každém přepnutí playlistu nebo znaku hledání).
+    Tabulka má výšku řádků z hlavičky, a tak vykresluje jen to, co je vidět.
+    """
+
+    def __init__(self, font, parent=None):
+        super().__init__(parent)
+        self.setFont(font)
+        self.setItemDelegate(DelegatSkladby(self))
+        self.setShowGrid(False)
+        self.setWordWrap(False)
+        self.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
+        self.setVerticalScrollMode(QAbstractItemView.ScrollPerPixel)
+        # Přetažení mezi řádky, ne na řádek (výchozí u tabulky je přepsání položky)
+        self.setDragDropOverwriteMode(False)
+        self.horizontalHeader().hide()
+        self.horizontalHeader().setStretchLastSection(True)
+        radky = self.verticalHeader()
+        radky.hide()
+        radky.setSectionResizeMode(QHeaderView.Fixed)
+        radky.setMinimumSectionSize(1)
+        radky.setDefaultSectionSize(DelegatSkladby.vyska(self.fontMetrics()))
+
+    def selectAll(self):
+        # Ctrl+A označí i výsledky hledání, které se ještě nenačetly
+        self.model().nacist_vse()
+        super().selectAll()
@@ -0,0 +1,140 @@
+import mmap
+import struct
+
+# Tabulky z hlavičky MPEG audio rámce (kbit/s), index 0 = "free", 15 = neplatný
+BITRATY = {
+    (1, 1): (0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448),
+    (1, 2): (0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384),
+    (1, 3): (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+    (2, 1): (0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256),
+    (2, 2): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+    (2, 3): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+}
+VZORKOVANI = {
+    3: (44100, 48000, 32000),    # MPEG 1
+    2: (22050, 24000, 16000),    # MPEG 2
+    0: (11025, 12000, 8000),     # MPEG 2.5
+}
+
+MAX_HLEDANI_SYNCHRONIZACE = 64 * 1024
+
+
+class GeometrieMp3:
+    """Co potřebuje přesný seek: počet rámců a délka rámce ve vzorcích."""
+    __slots__ = ("ramce", "vzorkovani", "vzorku_na_ramec")
+
+    def __init__(self, ramce, vzorkovani, vzorku_na_ramec):
+        self.ramce = ramce
+        self.vzorkovani = vzorkovani
+        self.vzorku_na_ramec = vzorku_na_ramec
+
+    @property
+    def delka(self):
+        return self.ramce * self.vzorku_na_ramec / self.vzorkovani
+
+    def zarovnat(self, sekundy):
+        """Zarovná čas na začátek rámce, ve kterém leží."""
+        delka_ramce = self.vzorku_na_ramec / self.vzorkovani
+        ramec = min(max(int(sekundy / delka_ramce), 0), max(self.ramce - 1, 0))
+        return ramec * delka_ramce
+
+
+def _hlavicka(data, pos):
+    """Rozloží 4bajtovou hlavičku rámce; vrací (verze, vrstva, vzorkování, délka, vzorků, mono)."""
+    if pos + 4 > len(data):
+        return None
+    b1, b2, b3, b4 = data[pos], data[pos + 1], data[pos + 2], data[pos + 3]
+    if b1 != 0xFF or (b2 & 0xE0) != 0xE0:
+        return None
+    verze = (b2 >> 3) & 3
+    vrstva = 4 - ((b2 >> 1) & 3)
+    bitrate_idx = b3 >> 4
+    vzorkovani_idx = (b3 >> 2) & 3
+    if verze == 1 or vrstva == 4 or bitrate_idx in (0, 15) or vzorkovani_idx == 3:
+        return None
+
+    bitrate = BITRATY[(1 if verze == 3 else 2, vrstva)][bitrate_idx] * 1000
+    vzorkovani = VZORKOVANI[verze][vzorkovani_idx]
+    padding = (b3 >> 1) & 1
+    mono = (b4 >> 6) == 3
+
+    if vrstva == 1:
+        return verze, vrstva, vzorkovani, (12 * bitrate // vzorkovani + padding) * 4, 384, mono
+    if vrstva == 3 and verze != 3:
+        return verze, vrstva, vzorkovani, 72 * bitrate // vzorkovani + padding, 576, mono
+    return verze, vrstva, vzorkovani, 144 * bitrate // vzorkovani + padding, 1152, mono
+
+
+def _zacatek_dat(data):
+    # Přeskočí ID3v2 tag (velikost je "synchsafe", 7 bitů na bajt)
+    if data[:3] != b"ID3" or len(data) < 10:
+        return 0
+    velikost = 0
+    for b in data[6:10]:
+        velikost = (velikost << 7) | (b & 0x7F)
+    paticka = 10 if data[5] & 0x10 else 0
+    return 10 + velikost + paticka
+
+
+def _prvni_ramec(data, pos):
+    konec = min(len(data), pos + MAX_HLEDANI_SYNCHRONIZACE)
+    while pos < konec:
+        pos = data.find(b"\xff", pos, konec)
+        if pos == -1:
+            return None, None
+        hlavicka = _hlavicka(data, pos)
+        # Falešnou synchronizaci odhalí, že na konci rámce nezačíná další
+        if hlavicka and _hlavicka(data, pos + hlavicka[3]) is not None:
+            return pos, hlavicka
+        pos += 1
+    return None, None
+
+
+def _ramce_z_vbr_hlavicky(data, pos, hlavicka):
+    verze, _, _, _, _, mono = hlavicka
+    if verze == 3:
+        bocni_info = 17 if mono else 32
+    else:
+        bocni_info = 9 if mono else 17
+
+    xing = pos + 4 + bocni_info
+    if data[xing:xing + 4] in (b"Xing", b"Info"):
+        priznaky = struct.unpack(">I", data[xing + 4:xing + 8])[0]
+        if priznaky & 1:
+            return struct.unpack(">I", data[xing + 8:xing + 12])[0]
+
+    vbri = pos + 4 + 32
+    if data[vbri:vbri + 4] == b"VBRI":
+        return struct.unpack(">I", data[vbri + 14:vbri + 18])[0]
+    return None
+
+
+def precist_geometrii(cesta):
+    """Zjistí počet rámců MP3 z Xing/VBRI hlavičky, jinak jedním průchodem přes hlavičky."""
+    try:
+        with open(cesta, "rb") as f:
+            try:
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                return None
+            with data:
+                pos, hlavicka = _prvni_ramec(data, _zacatek_dat(data))
+                if pos is None:
+                    return None
+                vzorkovani, vzorku = hlavicka[2], hlavicka[4]
+
+                ramce = _ramce_z_vbr_hlavicky(data, pos, hlavicka)
+                if ramce:
+                    return GeometrieMp3(ramce, vzorkovani, vzorku)
+
+                ramce = 0
+                while True:
+                    hlavicka = _hlavicka(data, pos)
+                    if hlavicka is None:
+                        break
+                    ramce += 1
+                    pos += hlavicka[3]
+                return GeometrieMp3(ramce, vzorkovani, vzorku) if ramce else None
+    except OSError as e:
+        print(f"Nelze přečíst rámce MP3 '{cesta}': {e}")
+        return None
@@ -0,0 +1,271 @@
+import base64
+import hashlib
+import os
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+
+from PySide6.QtCore import QBuffer, QIODevice, QObject, Qt, Signal
+from PySide6.QtGui import QImage, QPixmap
+
+from casomira import mereno
+
+# Náhledy se generují jednou v těchto velikostech, GUI si vezme nejbližší větší
+VELIKOSTI = (32, 64, 128)
+KVALITA_JPEG = 85
+LIMIT_CACHE = 128 * 1024 * 1024
+LIMIT_PAMETI = 32 * 1024 * 1024
+# Úklid disku prochází celou složku, dělá se jen jednou za tolik zápisů
+UKLID_PO_ZAPISECH = 256
+# Při rychlém posouvání se nejstarší požadavky zahodí, ty řádky už stejně nejsou vidět
+MAX_POZADAVKU = 256
+OBALY_VE_SLOZCE = ("cover.jpg", "cover.png", "folder.jpg", "folder.png", "front.jpg", "front.png")
+# Typ obrázku "přední obal" v ID3 APIC i ve FLAC PICTURE
+PREDNI_OBAL = 3
+
+
+def vybrat_velikost(pixely):
+    for velikost in VELIKOSTI:
+        if velikost >= pixely:
+            return velikost
+    return VELIKOSTI[-1]
+
+
+def _vlozeny_obal(cesta):
+    try:
+        import mutagen
+    except ImportError:
+        return None
+    try:
+        audio = mutagen.File(cesta)
+    except Exception as e:
+        print(f"Chyba Mutagen při čtení obalu '{cesta}': {e}")
+        return None
+    if audio is None:
+        return None
+
+    obrazky = list(getattr(audio, "pictures", None) or [])     # FLAC
+    tagy = audio.tags
+    if tagy is not None:
+        if hasattr(tagy, "getall"):                              # ID3 (MP3, WAV)
+            obrazky += tagy.getall("APIC")
+        else:
+            for obal in tagy.get("covr") or []:                  # MP4
+                return bytes(obal)
+            for kodovany in tagy.get("metadata_block_picture") or []:   # Ogg
+                try:
+                    from mutagen.flac import Picture
+                    obrazky.append(Picture(base64.b64decode(kodovany)))
+                except Exception:
+                    continue
+    if not obrazky:
+        return None
+    predni = [obrazek for obrazek in obrazky if getattr(obrazek, "type", None) == PREDNI_OBAL]
+    return bytes((predni or obrazky)[0].data)
+
+
+def precist_obal(cesta):
+    """Bajty obrázku obalu: vložený v tagu, jinak cover/folder obrázek ve složce, jinak None."""
+    data = _vlozeny_obal(cesta)
+    if data:
+        return data
+    slozka = os.path.dirname(cesta)
+    for jmeno in OBALY_VE_SLOZCE:
+        try:
+            with open(os.path.join(slozka, jmeno), "rb") as f:
+                return f.read()
+        except OSError:
+            continue
+    return None
+
+
+def zmensit(data):
+    """Náhledy {velikost: JPEG} ze středového čtverce obrázku; {} když obrázek nejde přečíst."""
+    obrazek = QImage()
+    if not data or not obrazek.loadFromData(data):
+        return {}
+    strana = min(obrazek.width(), obrazek.height())
+    obrazek = obrazek.copy(
+        (obrazek.width() - strana) // 2, (obrazek.height() - strana) // 2, strana, strana
+    ).convertToFormat(QImage.Format.Format_RGB32)
+    nahledy = {}
+    for velikost in VELIKOSTI:
+        nahled = obrazek.scaled(
+            velikost, velikost, Qt.AspectRatioMode.IgnoreAspectRatio, Qt.TransformationMode.SmoothTransformation
+        )
+        buffer = QBuffer()
+        buffer.open(QIODevice.OpenModeFlag.WriteOnly)
+        nahled.save(buffer, "JPG", KVALITA_JPEG)
+        nahledy[velikost] = bytes(buffer.data())
+    return nahledy
+
+
+class CacheObalu:
+    """Náhledy obalů na disku s omezenou velikostí.
+
+    Skladba (cesta, velikost, mtime) má malý odkaz na otisk svého obrázku, prázdný
+    u skladby bez obalu. Náhledy jsou uložené podle otisku, takže skladby jednoho alba
+    sdílejí tytéž soubory. Nad limitem se mažou nejdéle nepoužité soubory.
+    """
+
+    def __init__(self, slozka, limit=LIMIT_CACHE):
+        self.slozka = slozka
+        self.limit = limit
+        self._zapisu = 0
+        os.makedirs(slozka, exist_ok=True)
+
+    def _odkaz(self, cesta):
+        try:
+            st = os.stat(cesta)
+        except OSError:
+            return None
+        klic = f"{cesta}\0{st.st_size}\0{st.st_mtime_ns}".encode("utf-8", "surrogatepass")
+        return os.path.join(self.slozka, hashlib.sha1(klic).hexdigest() + ".ref")
+
+    def _nahled(self, otisk, velikost):
+        return os.path.join(self.slozka, f"{otisk}-{velikost}.jpg")
+
+    def nacist(self, cesta, velikost):
+        """Bajty náhledu, b"" u skladby bez obalu, None když v cache ještě není."""
+        odkaz = self._odkaz(cesta)
+        if odkaz is None:
+            return b""
+        try:
+            with open(odkaz, "rb") as f:
+                otisk = f.read().decode("ascii")
+            if not otisk:
+                return b""
+            soubor = self._nahled(otisk, velikost)
+            with open(soubor, "rb") as f:
+                data = f.read()
+            os.utime(soubor)
+        except (OSError, UnicodeDecodeError):
+            return None
+        return data
+
+    def ulozit(self, cesta, nahledy):
+        odkaz = self._odkaz(cesta)
+        if odkaz is None:
+            return
+        otisk = hashlib.sha1(nahledy[max(nahledy)]).hexdigest() if nahledy else ""
+        try:
+            for velikost, data in nahledy.items():
+                soubor = self._nahled(otisk, velikost)
+                if os.path.exists(soubor):
+                    continue
+                self._zapsat(soubor, data)
+            self._zapsat(odkaz, otisk.encode("ascii"))
+        except OSError as e:
+            print(f"Nelze uložit obal do cache: {e}")
+            return
+        self._zapisu += 1
+        if self._zapisu % UKLID_PO_ZAPISECH == 0:
+            self._uklidit()
+
+    def _zapsat(self, soubor, data):
+        docasny = f"{soubor}.{threading.get_ident()}.tmp"
+        with open(docasny, "wb") as f:
+            f.write(data)
+        os.replace(docasny, soubor)
+
+    def _uklidit(self):
+        soubory = []
+        celkem = 0
+        with os.scandir(self.slozka) as polozky:
+            for polozka in polozky:
+                if polozka.name.endswith((".jpg", ".ref")):
+                    st = polozka.stat()
+                    soubory.append((st.st_mtime, st.st_size, polozka.path))
+                    celkem += st.st_size
+        if celkem <= self.limit:
+            return
+        soubory.sort()
+        for _, velikost, soubor in soubory:
+            if celkem <= self.limit:
+                break
+            try:
+                os.remove(soubor)
+                celkem -= velikost
+            except OSError:
+                pass
+
+
+class NacitacObalu(QObject):
+    """Obaly skladeb pro GUI: QPixmap z paměti, jinak se na pozadí načte z disku nebo z tagů.
+
+    Žádají jen viditelné řádky a přehrávač. Nejnovější požadavek má přednost, takže
+    při posouvání se nejdřív načte to, co je právě na obrazovce. Na GUI vlákně se jen
+    převede hotový malý QImage na QPixmap.
+    """
+
+    nacteno = Signal(str, int, object)   # cesta, velikost, QImage nebo None
+    zmena = Signal(str)                  # cesta skladby, jejíž obal je nově v paměti
+
+    def __init__(self, slozka, vlaken=2, parent=None):
+        super().__init__(parent)
+        self.cache = CacheObalu(slozka)
+        self._pamet = OrderedDict()      # (cesta, velikost) -> QPixmap, None = bez obalu
+        self._bajtu = 0
+        self._fronta = deque()
+        self._cekajici = set()
+        self._zamek = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=vlaken, thread_name_prefix="obaly")
+        self.nacteno.connect(self._prevzit)
+
+    def pixmap(self, cesta, pixely):
+        """Náhled aspoň `pixely` velký z paměti; jinak None a načtení se naplánuje."""
+        klic = (cesta, vybrat_velikost(pixely))
+        if klic in self._pamet:
+            self._pamet.move_to_end(klic)
+            return self._pamet[klic]
+        with self._zamek:
+            if klic in self._cekajici:
+                return None
+            if len(self._fronta) >= MAX_POZADAVKU:
+                self._cekajici.discard(self._fronta.popleft())
+            self._fronta.append(klic)
+            self._cekajici.add(klic)
+        self._pool.submit(self._zpracovat)
+        return None
+
+    def _zpracovat(self):
+        with self._zamek:
+            if not self._fronta:
+                return
+            klic = self._fronta.pop()
+        try:
+            obrazek = self._nacist(*klic)
+        except Exception as e:
+            print(f"Nelze načíst obal '{klic[0]}': {e}")
+            obrazek = None
+        self.nacteno.emit(*klic, obrazek)
+
+    @mereno("načtení obalu")
+    def _nacist(self, cesta, velikost):
+        data = self.cache.nacist(cesta, velikost)
+        if data is None:
+            nahledy = zmensit(precist_obal(cesta))
+            self.cache.ulozit(cesta, nahledy)
+            data = nahledy.get(velikost, b"")
+        if not data:
+            return None
+        obrazek = QImage()
+        return obrazek if obrazek.loadFromData(data) else None
+
+    def _prevzit(self, cesta, velikost, obrazek):
+        klic = (cesta, velikost)
+        with self._zamek:
+            self._cekajici.discard(klic)
+        pixmap = QPixmap.fromImage(obrazek) if obrazek is not None else None
+        if klic not in self._pamet:
+            self._bajtu += velikost * velikost * 4 if pixmap is not None else 64
+        self._pamet[klic] = pixmap
+        while self._bajtu > LIMIT_PAMETI and self._pamet:
+            (_, stara), stary = self._pamet.popitem(last=False)
+            self._bajtu -= stara * stara * 4 if stary is not None else 64
+        self.zmena.emit(cesta)
+
+    def ukoncit(self):
+        with self._zamek:
+            self._fronta.clear()
+        self._pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,132 @@
+import json
+import os
+from array import array
+
+VSECHNY_SKLADBY = "⭐ All Tracks"
+
+
+class UlozistePlaylistu:
+    """Playlisty v SQLite vedle indexu knihovny.
+
+    Playlist je v paměti i v databázi jen pole id skladeb (`array("i")`), cesty se
+    nikde neopakují. Ukládají se jen změněné playlisty a vždy v jedné transakci, takže
+    pád aplikace nechá v databázi buď starý, nebo nový stav. "All Tracks" se neukládá,
+    skládá se z knihovny.
+    """
+
+    def __init__(self, index):
+        self.index = index
+        self.conn = index.conn
+
+    def je_prazdne(self):
+        return self.conn.execute("SELECT 1 FROM playlists LIMIT 1").fetchone() is None
+
+    def nacist(self):
+        playlisty = {}
+        radky = self.conn.execute("""
+            SELECT p.name, i.track_id
+            FROM playlists p
+            LEFT JOIN playlist_items i ON i.playlist_id = p.id
+            ORDER BY p.pos, i.pos
+        """)
+        for nazev, track_id in radky:
+            polozky = playlisty.get(nazev)
+            if polozky is None:
+                polozky = playlisty[nazev] = array("i")
+            if track_id is not None:
+                polozky.append(track_id)
+        return playlisty
+
+    def ulozit(self, playlisty, zmenene):
+        """Zapíše změněné playlisty (smazané podle toho, že v `playlisty` chybí)."""
+        poradi = {nazev: i for i, nazev in enumerate(playlisty)}
+        with self.conn:
+            for nazev in zmenene:
+                if nazev == VSECHNY_SKLADBY:
+                    continue
+
+                if nazev not in playlisty:
+                    radek = self.conn.execute(
+                        "SELECT id FROM playlists WHERE name = ?", (nazev,)
+                    ).fetchone()
+                    if radek:
+                        self.conn.execute("DELETE FROM playlist_items WHERE playlist_id = ?", radek)
+                        self.conn.execute("DELETE FROM playlists WHERE id = ?", radek)
+                    continue
+
+                self.conn.execute("""
+                    INSERT INTO playlists (name, pos) VALUES (?, ?)
+                    ON CONFLICT(name) DO UPDATE SET pos = excluded.pos
+                """, (nazev, poradi[nazev]))
+                playlist_id = self.conn.execute(
+                    "SELECT id FROM playlists WHERE name = ?", (nazev,)
+                ).fetchone()[0]
+
+                self.conn.execute("DELETE FROM playlist_items WHERE playlist_id = ?", (playlist_id,))
+                self.conn.executemany(
+                    "INSERT INTO playlist_items (playlist_id, pos, track_id) VALUES (?, ?, ?)",
+                    [(playlist_id, pos, track_id) for pos, track_id in enumerate(playlisty[nazev])],
+                )
+
+    def ulozit_novy(self, nazev, skladby):
+        """Založí playlist na konci seznamu v jedné transakci (import z jiného vlákna než GUI)."""
+        with self.conn:
+            pozice = self.conn.execute("SELECT COALESCE(MAX(pos) + 1, 0) FROM playlists").fetchone()[0]
+            playlist_id = self.conn.execute(
+                "INSERT INTO playlists (name, pos) VALUES (?, ?)", (nazev, pozice)
+            ).lastrowid
+            self.conn.executemany(
+                "INSERT INTO playlist_items (playlist_id, pos, track_id) VALUES (?, ?, ?)",
+                ((playlist_id, pos, track_id) for pos, track_id in enumerate(skladby)),
+            )
+
+    def nacist_chytre(self):
+        """Pravidla chytrých playlistů {název: pravidla}; vyhodnocuje je chytre.ChytryPlaylist."""
+        chytre = {}
+        for nazev, pravidla in self.conn.execute("SELECT name, rules FROM smart_playlists ORDER BY id"):
+            try:
+                chytre[nazev] = json.loads(pravidla)
+            except json.JSONDecodeError as e:
+                print(f"Poškozená pravidla playlistu '{nazev}', přeskakuji: {e}")
+        return chytre
+
+    def ulozit_chytry(self, nazev, pravidla, stary_nazev=None):
+        with self.conn:
+            if stary_nazev is not None and stary_nazev != nazev:
+                self.conn.execute("DELETE FROM smart_playlists WHERE name = ?", (stary_nazev,))
+            self.conn.execute("""
+                INSERT INTO smart_playlists (name, rules) VALUES (?, ?)
+                ON CONFLICT(name) DO UPDATE SET rules = excluded.rules
+            """, (nazev, json.dumps(pravidla, ensure_ascii=False)))
+
+    def smazat_chytry(self, nazev):
+        with self.conn:
+            self.conn.execute("DELETE FROM smart_playlists WHERE name = ?", (nazev,))
+
+    def migrovat_json(self, json_path):
+        """Jednorázově převezme starý playlists.json; soubor se pak přejmenuje na .bak."""
+        if not json_path.exists() or not self.je_prazdne():
+            return False
+
+        try:
+            with open(json_path, 'r', encoding='utf-8') as f:
+                playlisty = json.load(f)
+        except (json.JSONDecodeError, OSError) as e:
+            # Poškozený soubor necháme být, ať o data nepřijdeme úplně
+            print(f"Chyba při čtení {json_path.name}, migrace přeskočena: {e}")
+            return False
+        if not isinstance(playlisty, dict) or not all(
+            isinstance(cesty, list) and all(isinstance(p, str) for p in cesty)
+            for cesty in playlisty.values()
+        ):
+            print(f"{json_path.name} nemá očekávaný tvar {{název: [cesty]}}, migrace přeskočena")
+            return False
+
+        playlisty.pop(VSECHNY_SKLADBY, None)
+        # Cesty mimo knihovnu dostanou id jako nepřítomné skladby
+        ids = self.index.id_pro_cesty(p for cesty in playlisty.values() for p in cesty)
+        playlisty = {nazev: array("i", (ids[p] for p in cesty)) for nazev, cesty in playlisty.items()}
+        self.ulozit(playlisty, list(playlisty))
+        os.replace(json_path, json_path.with_name(json_path.name + ".bak"))
+        print(f"Playlisty převedeny z {json_path.name} do databáze ({len(playlisty)}).")
+        return True
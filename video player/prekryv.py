@@ -0,0 +1,63 @@
+from PySide6.QtCore import Qt, QTimer
+from PySide6.QtGui import QFont
+from PySide6.QtWidgets import QLabel
+
+from casomira import instrumentace
+
+INTERVAL_OBNOVY_MS = 500
+RADKU_OPERACI = 12
+
+
+class PrekryvVykonu(QLabel):
+    """Průhledný panel v rohu okna s dobami operací, čítači a posledním zaseknutím GUI."""
+
+    def __init__(self, parent):
+        super().__init__(parent)
+        self.setAttribute(Qt.WidgetAttribute.WA_TransparentForMouseEvents)
+        self.setTextFormat(Qt.TextFormat.PlainText)
+        self.setAlignment(Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignTop)
+        self.setFont(QFont("Monospace", 9))
+        self.setStyleSheet(
+            "QLabel { background-color: rgba(10, 12, 20, 210); color: #d0ffd0;"
+            " border: 1px solid rgba(0, 191, 255, 120); border-radius: 6px; padding: 8px; }"
+        )
+        self.timer = QTimer(self)
+        self.timer.setInterval(INTERVAL_OBNOVY_MS)
+        self.timer.timeout.connect(self.obnovit)
+        self.hide()
+
+    def prepnout(self):
+        if self.isVisible():
+            self.timer.stop()
+            self.hide()
+            return
+        self.obnovit()
+        self.show()
+        self.raise_()
+        self.timer.start()
+
+    def umistit(self):
+        rodic = self.parentWidget()
+        self.move(rodic.width() - self.width() - 12, 12)
+
+    def obnovit(self):
+        souhrn = instrumentace.souhrn()
+        radky = ["Výkon (Ctrl+Shift+P skrýt, Ctrl+Shift+E export)"]
+        radky.append(f"{'operace':<22}{'počet':>7}{'p50':>9}{'p95':>9}{'max':>9}")
+        operace = sorted(souhrn["operace"].items(), key=lambda polozka: -polozka[1]["p95_ms"])
+        for nazev, h in operace[:RADKU_OPERACI]:
+            radky.append(
+                f"{nazev[:21]:<22}{h['pocet']:>7}{h['p50_ms']:>9.2f}{h['p95_ms']:>9.2f}{h['max_ms']:>9.1f}"
+            )
+        if souhrn["pocitadla"]:
+            radky.append("")
+            for nazev, pocet in souhrn["pocitadla"].items():
+                radky.append(f"{nazev[:29]:<30}{pocet:>10}")
+        if souhrn["zaseknuti"]:
+            posledni = souhrn["zaseknuti"][-1]
+            kde = posledni["useky"][-1] if posledni["useky"] else "mimo měřené úseky"
+            radky.append("")
+            radky.append(f"Poslední zaseknutí: {posledni['trvani_ms']:.0f} ms ({kde})")
+        self.setText("\n".join(radky))
+        self.adjustSize()
+        self.umistit()
@@ -0,0 +1,254 @@
+import os
+import re
+from array import array
+from urllib.parse import unquote
+
+PRIPONY = (".m3u", ".m3u8", ".pls")
+# Po kolika položkách se cesty dohledávají v indexu; víc se v paměti nedrží
+DAVKA = 5000
+
+_PLS_KLIC = re.compile(r"^(File|Title|Length)(\d+)$", re.IGNORECASE)
+_DISK = re.compile(r"[A-Za-z]:[\\/]")
+
+
+def _dekodovat(radek):
+    # M3U bez "8" bývá v kódování systému, kde vznikl; UTF-8 poznáme, jinak Windows-1250
+    radek = radek.rstrip(b"\r\n")
+    try:
+        return radek.decode("utf-8")
+    except UnicodeDecodeError:
+        return radek.decode("cp1250", errors="replace")
+
+
+def _m3u(f, popisky):
+    titulek = delka = None
+    for radek in f:
+        # Komentáře se bez popisků ani nedekódují, u velkých playlistů je to polovina řádků
+        if radek[:1] == b"#":
+            if popisky and radek[:8].upper() == b"#EXTINF:":
+                hlavicka, _, titulek = _dekodovat(radek[8:]).partition(",")
+                try:
+                    delka = float(hlavicka.split()[0]) if hlavicka.strip() else None
+                except ValueError:
+                    delka = None
+            continue
+        radek = _dekodovat(radek).strip().lstrip("\ufeff")
+        if not radek or radek[0] == "#":
+            continue
+        yield radek, titulek or None, delka if delka is None or delka >= 0 else None
+        titulek = delka = None
+
+
+def _pls(f):
+    # Položky se čtou po číslech; hotová je, jakmile začne další číslo
+    cislo, polozka = None, {}
+    for radek in f:
+        klic, rovnitko, hodnota = _dekodovat(radek).strip().lstrip("\ufeff").partition("=")
+        shoda = _PLS_KLIC.match(klic.strip()) if rovnitko else None
+        if shoda is None:
+            continue
+        druh, jeho_cislo = shoda.group(1).lower(), shoda.group(2)
+        if jeho_cislo != cislo:
+            if polozka.get("file"):
+                yield _polozka_pls(polozka)
+            cislo, polozka = jeho_cislo, {}
+        polozka[druh] = hodnota.strip()
+    if polozka.get("file"):
+        yield _polozka_pls(polozka)
+
+
+def _polozka_pls(polozka):
+    try:
+        delka = float(polozka.get("length", ""))
+    except ValueError:
+        delka = None
+    return polozka["file"], polozka.get("title") or None, delka if delka is None or delka >= 0 else None
+
+
+def cist(cesta, popisky=True):
+    """Položky playlistu (umístění jak je v souboru, titulek, délka) postupně po řádcích.
+
+    S `popisky=False` jsou titulek a délka M3U vždy None (import je bere z indexu).
+    """
+    with open(cesta, "rb") as f:
+        if os.path.splitext(cesta)[1].lower() == ".pls":
+            yield from _pls(f)
+        else:
+            yield from _m3u(f, popisky)
+
+
+def absolutni_cesta(umisteni, slozka):
+    """Cesta k souboru z položky playlistu; relativní vůči složce playlistu, URL mimo file:// None."""
+    if "://" in umisteni:
+        if umisteni[:7].lower() != "file://":
+            return None
+        # file://host/cesta nebo file:///cesta; host (obvykle prázdný) se zahodí
+        umisteni = umisteni[umisteni.find("/", 7):] if umisteni.find("/", 7) != -1 else ""
+        if "%" in umisteni:
+            umisteni = unquote(umisteni)
+        # file:///C:/Hudba/... z Windows
+        if _DISK.match(umisteni, 1):
+            umisteni = umisteni[1:]
+    if os.sep == "/" and "\\" in umisteni:
+        umisteni = umisteni.replace("\\", "/")
+    if umisteni[:1] == "/" and os.sep == "/":
+        # Běžný případ absolutní cesty; normovat je potřeba jen s "." nebo "//" uvnitř
+        return os.path.normpath(umisteni) if "/." in umisteni or "//" in umisteni else umisteni
+    if not os.path.isabs(umisteni) and not _DISK.match(umisteni):
+        umisteni = os.path.join(slozka, umisteni)
+    return os.path.normpath(umisteni)
+
+
+def _konec_cesty(cesta, casti):
+    # Posledních pár složek cesty bez ohledu na oddělovač a velikost písmen
+    return "/".join(cesta.replace("\\", "/").casefold().rsplit("/", casti)[-casti:])
+
+
+class PrirazeniCest:
+    """Dohledá cesty z cizího playlistu v indexu knihovny.
+
+    Index se projde jednou (cesty jsou pak v paměti úměrně knihovně, ne playlistu)
+    a každá položka je jen vyhledání ve slovníku: nejdřív přesná cesta, potom shoda
+    konce cesty se skladbou v knihovně ("Album/01 - skladba.mp3", nakonec jen jméno
+    souboru), pokud je jednoznačná. To pokryje playlisty z jiného počítače nebo
+    s jiným kořenem knihovny. Co se nenajde, založí se v indexu jako nepřítomná
+    skladba, stejně jako při převodu starého playlists.json.
+    """
+
+    def __init__(self, index):
+        self.index = index
+        self.conn = index.conn
+        self._cesty = None      # {cesta: id}
+        self._nepritomne = set()
+        self._konce = None      # {konec cesty: id, -1 = nejednoznačné}
+        self.mimo = []          # [(id, cesta)] skladeb, které nejsou v knihovně přítomné
+        self.presne = self.podle_konce = self.chybi = 0      # počty různých cest
+
+    def _mapa_cest(self):
+        if self._cesty is None:
+            self._cesty = {}
+            for track_id, cesta, pritomna in self.conn.execute("SELECT id, path, present FROM tracks"):
+                self._cesty[cesta] = track_id
+                if not pritomna:
+                    self._nepritomne.add(track_id)
+        return self._cesty
+
+    def _mapa_koncu(self):
+        if self._konce is None:
+            self._konce = {}
+            for cesta, track_id in self._mapa_cest().items():
+                if track_id in self._nepritomne:
+                    continue
+                for casti in (2, 1):
+                    klic = _konec_cesty(cesta, casti)
+                    self._konce[klic] = track_id if klic not in self._konce else -1
+        return self._konce
+
+    def priradit(self, cesty):
+        """Pole id pro dávku cest (v jejich pořadí)."""
+        zname = self._mapa_cest()
+        nalezene = {}
+        chybi = []
+        for cesta in dict.fromkeys(cesty):
+            track_id = zname.get(cesta)
+            if track_id is None:
+                chybi.append(cesta)
+                continue
+            nalezene[cesta] = track_id
+            if track_id in self._nepritomne:
+                self.mimo.append((track_id, cesta))
+        self.presne += len(nalezene)
+
+        if chybi:
+            konce = self._mapa_koncu()
+            zbyva = []
+            for cesta in chybi:
+                track_id = konce.get(_konec_cesty(cesta, 2), -1)
+                if track_id == -1:
+                    track_id = konce.get(_konec_cesty(cesta, 1), -1)
+                if track_id == -1:
+                    zbyva.append(cesta)
+                else:
+                    nalezene[cesta] = track_id
+                    self.podle_konce += 1
+            if zbyva:
+                # id_pro_cesty zapisuje ve vlastní transakci: zámek zápisu do indexu se drží
+                # jen po dobu dávky a okno mezitím může zapisovat (počty přehrání, playlisty)
+                zalozene = self.index.id_pro_cesty(zbyva)
+                nalezene.update(zalozene)
+                zname.update(zalozene)
+                self._nepritomne.update(zalozene.values())
+                self.mimo.extend((zalozene[cesta], cesta) for cesta in zbyva)
+                self.chybi += len(zbyva)
+        return array("i", (nalezene[cesta] for cesta in cesty))
+
+
+def importovat(index, cesta, prubeh=None, zruseno=None):
+    """Načte playlist ze souboru do pole id; vrátí (skladby, PrirazeniCest, přeskočeno).
+
+    Soubor se čte postupně a v paměti je vždy jen jedna dávka cest. Přeskočí se
+    položky, které nejsou soubor (internetová rádia apod.).
+    """
+    slozka = os.path.dirname(os.path.abspath(cesta))
+    prirazeni = PrirazeniCest(index)
+    skladby = array("i")
+    davka = []
+    preskoceno = 0
+    for umisteni, _, _ in cist(cesta, popisky=False):
+        plna = absolutni_cesta(umisteni, slozka)
+        if plna is None:
+            preskoceno += 1
+            continue
+        davka.append(plna)
+        if len(davka) >= DAVKA:
+            if zruseno is not None and zruseno.is_set():
+                return None, prirazeni, preskoceno
+            skladby.extend(prirazeni.priradit(davka))
+            davka = []
+            if prubeh is not None:
+                prubeh(len(skladby))
+    if davka:
+        skladby.extend(prirazeni.priradit(davka))
+    return skladby, prirazeni, preskoceno
+
+
+def _relativni(cesta, predpona):
+    # Skladby pod složkou playlistu se zapíšou relativně, ať jde složka přenést i s ním
+    return cesta[len(predpona):] if cesta.startswith(predpona) else cesta
+
+
+def exportovat(cesta, polozky):
+    """Zapíše playlist podle přípony (.m3u, .m3u8, .pls); `polozky` jsou (cesta, délka, titulek).
+
+    Píše se průběžně, vrátí počet zapsaných položek.
+    """
+    predpona = os.path.join(os.path.dirname(os.path.abspath(cesta)), "")
+    pls = os.path.splitext(cesta)[1].lower() == ".pls"
+    pocet = 0
+    docasny = f"{cesta}.tmp"
+    with open(docasny, "w", encoding="utf-8", newline="\n") as f:
+        f.write("[playlist]\n" if pls else "#EXTM3U\n")
+        for plna, delka, titulek in polozky:
+            pocet += 1
+            umisteni = _relativni(plna, predpona)
+            sekund = int(round(delka)) if delka and delka > 0 else -1
+            titulek = titulek.replace("\n", " ")
+            if pls:
+                f.write(f"File{pocet}={umisteni}\nTitle{pocet}={titulek}\nLength{pocet}={sekund}\n")
+            else:
+                f.write(f"#EXTINF:{sekund},{titulek}\n{umisteni}\n")
+        if pls:
+            f.write(f"NumberOfEntries={pocet}\nVersion=2\n")
+    os.replace(docasny, cesta)
+    return pocet
+
+
+def polozky_tabulky(tabulka, skladby):
+    """(cesta, délka, titulek) skladeb pro `exportovat`; titulek je "Interpret - Název" nebo jméno souboru."""
+    for skladba in skladby:
+        titulek, interpret = tabulka.title[skladba], tabulka.artist[skladba]
+        if not titulek:
+            titulek = os.path.splitext(tabulka.soubor[skladba])[0]
+        elif interpret:
+            titulek = f"{interpret} - {titulek}"
+        yield tabulka.cesta(skladba), tabulka.duration[skladba], titulek
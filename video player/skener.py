@@ -0,0 +1,239 @@
+import multiprocessing
+import os
+import queue
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, as_completed, wait
+from concurrent.futures.process import BrokenProcessPool
+
+from casomira import instrumentace
+from knihovna import IndexKnihovny, precist_tagy, precist_tagy_davky, projit_slozku, porovnat
+
+VELIKOST_DAVKY = 200
+INTERVAL_DAVKY_SEC = 0.1
+
+# Na jeden rotační disk pouštíme jen jednoho čtenáře, ať se hlavičky netahají po plotně
+CTENARU_NA_PLOTNU = 1
+# Od kolika souborů se tagy čtou v procesech; start procesů stojí desetiny sekundy
+MIN_SOUBORU_PRO_PROCESY = 256
+SOUBORU_NA_ULOHU = 64
+
+
+def pocet_procesu():
+    return max(1, (os.cpu_count() or 2) // 2)
+
+
+def zarizeni(cesta):
+    try:
+        return os.stat(cesta).st_dev
+    except OSError:
+        return None
+
+
+def rotacni_disk(dev):
+    """True/False, když to systém prozradí (Linux), jinak None."""
+    if dev is None or not sys.platform.startswith("linux"):
+        return None
+    zaklad = f"/sys/dev/block/{os.major(dev)}:{os.minor(dev)}"
+    # Oddíl nemá vlastní frontu, příznak je u celého disku o úroveň výš
+    for cesta in (zaklad + "/queue/rotational", zaklad + "/../queue/rotational"):
+        try:
+            with open(cesta) as f:
+                return f.read().strip() == "1"
+        except OSError:
+            continue
+    return None
+
+
+def _nic(*_):
+    pass
+
+
+class Sken:
+    """Prohledá složky a výsledky hlásí po dávkách přes zpětná volání; bez GUI.
+
+    `cile` je seznam (složka, rekurzivně). Složky na různých discích se skenují souběžně,
+    každý disk má vlastní vlákno. Tagy větších dávek se parsují v procesech, takže se
+    smíšená knihovna (MP3, FLAC, Ogg, ...) čte paralelně a GIL aplikace zůstane volný;
+    na rotačním disku ale čte vždy jen jeden proces najednou. Hlášení (nové nebo změněné
+    Skladba záznamy, odebrané cesty, prošlé složky k hlídání, průběh hotovo/celkem) chodí
+    z vlákna, ve kterém běží `spustit`; v GUI je převádí na signály vlakna.SkenerKnihovny.
+    """
+
+    def __init__(self, db_path, cile, sledovane=(), procesu=None,
+                 pri_davce=_nic, pri_odebrani=_nic, pri_slozkach=_nic, pri_prubehu=_nic):
+        self.db_path = db_path
+        self.cile = [(str(slozka), rekurzivne) for slozka, rekurzivne in cile]
+        self.sledovane = frozenset(sledovane)
+        self.procesu = procesu or pocet_procesu()
+        self.pri_davce = pri_davce
+        self.pri_odebrani = pri_odebrani
+        self.pri_slozkach = pri_slozkach
+        self.pri_prubehu = pri_prubehu
+        self._zruseno = threading.Event()
+        self._pool = None
+        self._zamek_poolu = threading.Lock()
+
+    def zrusit(self):
+        self._zruseno.set()
+
+    def spustit(self):
+        """Proskenuje cíle; vrátí (přidáno, změněno, odebráno)."""
+        # SQLite spojení nesmí přecházet mezi vlákny, skener si otevře vlastní
+        index = IndexKnihovny(self.db_path)
+        try:
+            with instrumentace.usek("sken"):
+                return self._skenovat(index)
+        finally:
+            if self._pool is not None:
+                self._pool.shutdown(wait=not self._zruseno.is_set(), cancel_futures=True)
+                self._pool = None
+            index.zavrit()
+
+    def _pool_procesu(self):
+        # Jeden pool pro všechna zařízení, vzniká až u první velké dávky
+        with self._zamek_poolu:
+            if self._pool is None:
+                # "spawn": fork by do procesu zkopíroval i otevřený mixer a vlákna Qt
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.procesu,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            return self._pool
+
+    def _skenovat(self, index):
+        podle_zarizeni = {}
+        zname = {}
+        for slozka, rekurzivne in self.cile:
+            # Smazaná složka: odebereme i všechno, co bylo pod ní
+            zname[slozka] = index.zname_soubory(slozka, rekurzivne or not os.path.isdir(slozka))
+            podle_zarizeni.setdefault(zarizeni(slozka), []).append((slozka, rekurzivne))
+
+        fronta = queue.Queue()
+        vlakna = [
+            threading.Thread(
+                target=self._projit_zarizeni, args=(dev, cile, zname, fronta), daemon=True
+            )
+            for dev, cile in podle_zarizeni.items()
+        ]
+        for vlakno in vlakna:
+            vlakno.start()
+
+        pridano = zmeneno = odebrano = 0
+        hotovo = celkem = 0
+        zbyva_vlaken = len(vlakna)
+        davka = []
+        posledni_odeslani = time.monotonic()
+
+        while zbyva_vlaken:
+            if self._zruseno.is_set():
+                # Procházení skončí samo u další složky; rozpracovaná dávka se neuloží,
+                # okno ji po zrušení už nepřevezme a příští sken ji najde znovu
+                return pridano, zmeneno, odebrano
+            try:
+                druh, data = fronta.get(timeout=INTERVAL_DAVKY_SEC)
+            except queue.Empty:
+                druh, data = None, None
+
+            if druh == "konec":
+                zbyva_vlaken -= 1
+            elif druh == "slozky":
+                self.pri_slozkach(data)
+            elif druh == "odebrane":
+                index.odebrat_skladby(data)
+                odebrano += len(data)
+                self.pri_odebrani(data)
+            elif druh == "celkem":
+                nove, zmenene = data
+                pridano += nove
+                zmeneno += zmenene
+                celkem += nove + zmenene
+                self.pri_prubehu(hotovo, celkem)
+            elif druh == "skladba":
+                davka.append(data)
+                hotovo += 1
+
+            ted = time.monotonic()
+            if davka and (len(davka) >= VELIKOST_DAVKY or ted - posledni_odeslani >= INTERVAL_DAVKY_SEC):
+                with instrumentace.usek("zápis dávky do indexu"):
+                    ulozene = index.ulozit_skladby(davka)
+                instrumentace.pocitat("naskenované skladby", len(davka))
+                self.pri_davce(ulozene)
+                self.pri_prubehu(hotovo, celkem)
+                davka = []
+                posledni_odeslani = ted
+
+        if davka:
+            instrumentace.pocitat("naskenované skladby", len(davka))
+            self.pri_davce(index.ulozit_skladby(davka))
+            self.pri_prubehu(hotovo, celkem)
+
+        return pridano, zmeneno, odebrano
+
+    def _projit_zarizeni(self, dev, cile, zname, fronta):
+        ctenaru = CTENARU_NA_PLOTNU if rotacni_disk(dev) else self.procesu
+        try:
+            for slozka, rekurzivne in cile:
+                if self._zruseno.is_set():
+                    break
+
+                na_disku, prosle = projit_slozku(slozka, rekurzivne, self.sledovane, self._zruseno)
+                if self._zruseno.is_set():
+                    # Neúplný výpis složky by se porovnal jako smazané skladby
+                    break
+                nove, zmenene, odebrane = porovnat(zname[slozka], na_disku)
+
+                fronta.put(("slozky", prosle))
+                if odebrane:
+                    fronta.put(("odebrane", odebrane))
+                fronta.put(("celkem", (len(nove), len(zmenene))))
+
+                for zaznam in self._precist(nove + zmenene, ctenaru):
+                    fronta.put(("skladba", zaznam))
+        finally:
+            fronta.put(("konec", None))
+
+    def _precist(self, polozky, ctenaru):
+        """Ke každé (cesta, velikost, mtime) přidá tagy; vrací je v pořadí dokončení."""
+        if len(polozky) < MIN_SOUBORU_PRO_PROCESY:
+            yield from self._precist_ve_vlaknech(polozky, ctenaru)
+            return
+
+        pool = self._pool_procesu()
+        dalsi = 0
+        bezi = {}
+        try:
+            while True:
+                # Naráz jen `ctenaru` úloh, ať rotační disk čte jeden soubor po druhém
+                while len(bezi) < ctenaru and dalsi < len(polozky) and not self._zruseno.is_set():
+                    kus = polozky[dalsi:dalsi + SOUBORU_NA_ULOHU]
+                    bezi[pool.submit(precist_tagy_davky, [cesta for cesta, _, _ in kus])] = kus
+                    dalsi += len(kus)
+                if not bezi:
+                    return
+                hotove, _ = wait(bezi, return_when=FIRST_COMPLETED)
+                for future in hotove:
+                    tagy = future.result()
+                    for polozka, tagy_souboru in zip(bezi.pop(future), tagy):
+                        yield (*polozka, tagy_souboru)
+                if self._zruseno.is_set():
+                    return
+        except BrokenProcessPool as e:
+            # Zbytek se dočte tady, jen pomaleji
+            print(f"Proces čtení tagů spadl, pokračuji ve vlákně: {e}")
+            zbyva = [polozka for kus in bezi.values() for polozka in kus] + polozky[dalsi:]
+            bezi = {}
+            yield from self._precist_ve_vlaknech(zbyva, 1)
+        finally:
+            for future in bezi:
+                future.cancel()
+
+    def _precist_ve_vlaknech(self, polozky, ctenaru):
+        with ThreadPoolExecutor(max_workers=ctenaru) as pool:
+            futures = {pool.submit(precist_tagy, polozka[0]): polozka for polozka in polozky}
+            for future in as_completed(futures):
+                if self._zruseno.is_set():
+                    pool.shutdown(wait=False, cancel_futures=True)
+                    break
+                yield (*futures[future], future.result())
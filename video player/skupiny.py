@@ -0,0 +1,105 @@
+from array import array
+
+NEZNAMY_INTERPRET = "Neznámý interpret"
+NEZNAME_ALBUM = "Neznámé album"
+BEZ_ZANRU = "Bez žánru"
+
+
+def _razeni(klic):
+    # Prázdné (neznámé) skupiny až na konec, jinak abecedně bez ohledu na velikost písmen
+    if isinstance(klic, tuple):
+        return tuple(_razeni(cast) for cast in klic)
+    return (klic == "", klic.casefold())
+
+
+class Seskupeni:
+    """Skladby rozdělené do skupin podle jednoho klíče.
+
+    Každá skladba si pamatuje klíč, pod kterým je zařazená, takže přetagování ji jen
+    přesune a odebrání nepotřebuje znát staré tagy. Seřazené klíče se počítají až při
+    zobrazení a jen když od minula nějaká skupina vznikla nebo zanikla.
+    """
+
+    def __init__(self):
+        self.skupiny = {}     # klíč -> set(id)
+        self.klice = []       # id -> klíč, None = skladba tu není
+        self._serazene = None
+
+    def __len__(self):
+        return len(self.skupiny)
+
+    def pridat(self, skladba, klic):
+        if skladba >= len(self.klice):
+            self.klice.extend([None] * (skladba + 1 - len(self.klice)))
+        stary = self.klice[skladba]
+        if stary == klic:
+            return
+        if stary is not None:
+            self._vyjmout(skladba, stary)
+        self.klice[skladba] = klic
+        skupina = self.skupiny.get(klic)
+        if skupina is None:
+            skupina = self.skupiny[klic] = set()
+            self._serazene = None
+        skupina.add(skladba)
+
+    def odebrat(self, skladba):
+        if skladba < len(self.klice) and self.klice[skladba] is not None:
+            self._vyjmout(skladba, self.klice[skladba])
+            self.klice[skladba] = None
+
+    def _vyjmout(self, skladba, klic):
+        skupina = self.skupiny[klic]
+        skupina.discard(skladba)
+        if not skupina:
+            del self.skupiny[klic]
+            self._serazene = None
+
+    def serazene(self):
+        """Klíče všech skupin seřazené pro zobrazení; dokud se sada nezmění, je to tentýž seznam."""
+        if self._serazene is None:
+            self._serazene = sorted(self.skupiny, key=_razeni)
+        return self._serazene
+
+    def pocet(self, klic):
+        return len(self.skupiny.get(klic, ()))
+
+    def skladby(self, klic):
+        return self.skupiny.get(klic, ())
+
+
+class IndexSkupin:
+    """Procházení knihovny: interpret -> alba -> skladby a žánr -> skladby.
+
+    Udržuje se po jednotlivých skladbách (přidání ze skeneru, změna tagů, odebrání),
+    nic se nepřepočítává celé. Zařazené jsou jen skladby přítomné v knihovně.
+    """
+
+    def __init__(self):
+        self.interpreti = Seskupeni()
+        self.alba = Seskupeni()       # (interpret, album)
+        self.zanry = Seskupeni()
+
+    def pridat(self, tabulka, skladba):
+        if skladba not in tabulka:
+            self.odebrat(skladba)
+            return
+        interpret = tabulka.artist[skladba]
+        self.interpreti.pridat(skladba, interpret)
+        self.alba.pridat(skladba, (interpret, tabulka.album[skladba]))
+        self.zanry.pridat(skladba, tabulka.genre[skladba])
+
+    def odebrat(self, skladba):
+        self.interpreti.odebrat(skladba)
+        self.alba.odebrat(skladba)
+        self.zanry.odebrat(skladba)
+
+    def alba_interpreta(self, interpret):
+        return [klic for klic in self.alba.serazene() if klic[0] == interpret]
+
+    def skladby_serazene(self, tabulka, skladby):
+        """Pole id seřazené podle interpreta, alba a cesty (čísla stop bývají v názvu souboru)."""
+        return array("i", sorted(
+            skladby,
+            key=lambda s: (_razeni(tabulka.artist[s]), _razeni(tabulka.album[s]), tabulka.cesta(s)),
+        ))
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# Moduly přehrávače se importují jako sourozenci, stejně jako při spuštění ze složky aplikace
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
@@ -0,0 +1,22 @@
+import math
+import threading
+
+import analyza
+
+
+def test_chybna_uloha_se_preskoci(capsys):
+    ulozene = []
+    ulozeno = analyza.zpracovat_v_procesech(
+        math.sqrt, [(4,), (-1,), (9,)], ulozene.extend, 1, threading.Event(), "Test",
+    )
+    assert ulozeno == 2
+    assert sorted(ulozene) == [2.0, 3.0]
+    assert "Test: '-1' přeskočeno" in capsys.readouterr().out
+
+
+def test_zruseni_nic_nespusti():
+    zruseno = threading.Event()
+    zruseno.set()
+    ulozene = []
+    assert analyza.zpracovat_v_procesech(math.sqrt, [(4,)], ulozene.extend, 1, zruseno, "Test") == 0
+    assert ulozene == []
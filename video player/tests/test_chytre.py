@@ -0,0 +1,129 @@
+import pytest
+
+import chytre
+from chytre import ChybaPravidla, ChytryPlaylist, Dotaz, DEN
+from knihovna import IndexKnihovny
+
+TED = 1_800_000_000.0
+SKLADBY = [
+    # cesta, interpret, žánr, délka, přehrání, naposledy hráno (dní zpět)
+    ("/h/a.mp3", "ŽLUŤOUČKÝ kůň", "Rock", 200, 5, 1),
+    ("/h/b.mp3", "Kůň", "Rock", 400, 0, None),
+    ("/h/c.mp3", "Straße", "Jazz", 90, 2, 30),
+    ("/h/d.mp3", "Strasse", "Pop", 300, 9, 3),
+]
+
+
+@pytest.fixture
+def knihovna(tmp_path):
+    index = IndexKnihovny(tmp_path / "knihovna.db")
+    index.ulozit_skladby([
+        (cesta, 1, 1.0, {"title": cesta, "artist": interpret, "genre": zanr, "duration": delka})
+        for cesta, interpret, zanr, delka, _, _ in SKLADBY
+    ])
+    ids = index.id_pro_cesty([s[0] for s in SKLADBY])
+    for cesta, _, _, _, prehrani, dni in SKLADBY:
+        for _ in range(prehrani):
+            index.zapocitat_prehrani(ids[cesta], TED - (dni or 0) * DEN)
+    tabulka, _ = index.nacist_tabulku()
+    yield index, tabulka, [ids[s[0]] for s in SKLADBY]
+    index.zavrit()
+
+
+@pytest.mark.parametrize("pravidla", [
+    {"pole": "genre", "op": "neznámý"},
+    {"pole": "cesta", "op": "je", "hodnota": "x"},
+    {"pole": "plays", "op": "obsahuje", "hodnota": "1"},
+    {"pole": "plays", "op": ">", "hodnota": "hodně"},
+    {"pole": "added", "op": "za posledních", "hodnota": None},
+])
+def test_neplatna_podminka(pravidla):
+    with pytest.raises(ChybaPravidla):
+        Dotaz({"podminky": [pravidla]})
+
+
+def test_neplatne_razeni():
+    with pytest.raises(ChybaPravidla):
+        Dotaz({"razeni": "title"})
+
+
+def test_preklad_do_sql():
+    dotaz = Dotaz({
+        "shoda": "kterakoli",
+        "podminky": [
+            {"pole": "artist", "op": "začíná", "hodnota": "Kůň"},
+            {"pole": "plays", "op": ">=", "hodnota": 3},
+            {"pole": "last_played", "op": "za posledních", "hodnota": 7},
+        ],
+        "razeni": "plays",
+        "limit": 2,
+    })
+    sql, parametry = dotaz.sql(TED)
+    assert sql == (
+        "SELECT id FROM tracks WHERE present = 1 AND ((substr(casefold(artist), 1, ?) = ?) OR "
+        "(plays >= ?) OR (last_played >= ?)) ORDER BY plays DESC, id"
+    )
+    assert parametry == [3, "kůň", 3.0, TED - 7 * DEN]
+    assert dotaz.limit == 2 and [p.pole for p in dotaz.casove] == ["last_played"]
+    # Bez řazení se limit nepoužije a pořadí je podle cesty
+    assert Dotaz({"limit": 5}).limit == 0
+    assert Dotaz({}).sql(TED) == ("SELECT id FROM tracks WHERE present = 1 ORDER BY path", [])
+
+
+@pytest.mark.parametrize("pravidla", [
+    {"podminky": [{"pole": "artist", "op": "obsahuje", "hodnota": "kůň"}]},
+    {"podminky": [{"pole": "artist", "op": "je", "hodnota": "STRASSE"}]},
+    {"podminky": [{"pole": "artist", "op": "neobsahuje", "hodnota": "žluť"}]},
+    {"podminky": [
+        {"pole": "genre", "op": "není", "hodnota": "rock"},
+        {"pole": "duration", "op": "<", "hodnota": 250},
+    ]},
+    {"shoda": "kterakoli", "podminky": [
+        {"pole": "genre", "op": "je", "hodnota": "pop"},
+        {"pole": "plays", "op": "=", "hodnota": 0},
+    ]},
+    {"podminky": [{"pole": "last_played", "op": "za posledních", "hodnota": 7}]},
+    {"podminky": [{"pole": "last_played", "op": "před více než", "hodnota": 7}]},
+])
+def test_sql_a_predikat_se_shoduji(knihovna, pravidla):
+    index, tabulka, ids = knihovna
+    dotaz = Dotaz(pravidla)
+    sql, parametry = dotaz.sql(TED)
+    ze_sql = {radek[0] for radek in index.conn.execute(sql, parametry)}
+    assert ze_sql == {id for id in ids if dotaz.plati(tabulka, id, TED)}
+
+
+def test_razeny_playlist_s_limitem(knihovna):
+    index, tabulka, (a, b, c, d) = knihovna
+    playlist = ChytryPlaylist("Nejhranější", {"razeni": "plays", "limit": 2})
+    playlist.naplnit(index.conn, tabulka, TED)
+    assert list(playlist.skladby) == [d, a]
+
+    tabulka.plays[c] = 7
+    assert playlist.aktualizovat(tabulka, [c], TED)
+    assert list(playlist.skladby) == [d, c]
+    assert not playlist.aktualizovat(tabulka, [b], TED)
+
+
+def test_casova_podminka_vyprsi(knihovna):
+    index, tabulka, (a, b, c, d) = knihovna
+    playlist = ChytryPlaylist("Nedávno", {
+        "podminky": [{"pole": "last_played", "op": "za posledních", "hodnota": 7}],
+    })
+    playlist.naplnit(index.conn, tabulka, TED)
+    assert sorted(playlist.skladby) == sorted([a, d])
+    assert playlist.dalsi_cas() == tabulka.last_played[d] + 7 * DEN
+
+    assert playlist.vyprsele(tabulka, TED + 5 * DEN)
+    assert list(playlist.skladby) == [a]
+
+
+def test_vyhodnotit_preskoci_neplatny(knihovna, capsys):
+    index, tabulka, _ = knihovna
+    chytre_playlisty = chytre.vyhodnotit({
+        "Rock": {"podminky": [{"pole": "genre", "op": "je", "hodnota": "rock"}]},
+        "Rozbitý": {"podminky": [{"pole": "nic", "op": "je"}]},
+    }, index.conn, tabulka)
+    assert list(chytre_playlisty) == ["Rock"]
+    assert len(chytre_playlisty["Rock"].skladby) == 2
+    assert "Rozbitý" in capsys.readouterr().out
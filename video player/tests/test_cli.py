@@ -0,0 +1,19 @@
+import json
+
+import cli
+
+
+def test_nova_datova_slozka_se_zalozi(tmp_path, capsys):
+    data = tmp_path / "nova" / "knihovna"
+    assert cli.main(["--data", str(data), "index-stats", "--json"]) == 0
+    stat = json.loads(capsys.readouterr().out)
+    assert stat["skladby"] == 0
+    assert (data / "knihovna.db").exists()
+
+
+def test_neotevrena_knihovna_vrati_chybu(tmp_path, capsys):
+    soubor = tmp_path / "soubor"
+    soubor.write_text("")
+    assert cli.main(["--data", str(soubor), "index-stats"]) == 2
+    chyba = capsys.readouterr().err
+    assert chyba.startswith("Knihovnu nejde otevřít:") and len(chyba.splitlines()) == 1
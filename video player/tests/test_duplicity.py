@@ -0,0 +1,78 @@
+from array import array
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+import duplicity
+from jadro import JadroKnihovny
+
+DELKA = 100
+
+
+class FalesnyIndex:
+    def __init__(self, otisky, ignorovane=()):
+        self.otisky = otisky
+        self.ignorovane = set(ignorovane)
+
+    def zvukove_otisky(self):
+        return [(skladba, hashe.astype("<u4").tobytes()) for skladba, hashe in self.otisky.items()]
+
+    def ignorovane_duplicity(self):
+        return self.ignorovane
+
+
+def _otisk(zacatek, delka=DELKA):
+    return np.arange(zacatek, zacatek + delka, dtype=np.uint32)
+
+
+def test_skupiny_podle_spolecnych_hashu():
+    index = FalesnyIndex({
+        1: _otisk(0),
+        2: _otisk(0),
+        3: _otisk(50),           # s 1 a 2 sdílí polovinu
+        4: _otisk(10_000),
+        5: _otisk(10_090),       # s 4 sdílí jen 10 hashů
+    })
+    assert duplicity.najit_skupiny(index) == [([1, 2, 3], 0.5)]
+
+
+def test_ignorovane_dvojice_ani_pres_treti_skladbu():
+    # 1 a 3 jsou označené jako různé, 2 je podobná oběma
+    index = FalesnyIndex({1: _otisk(0), 2: _otisk(30), 3: _otisk(60)}, ignorovane={(1, 3)})
+    skupiny = duplicity.najit_skupiny(index)
+    assert len(skupiny) == 1
+    assert skupiny[0][0] in ([1, 2], [2, 3])
+
+
+def test_zruseni():
+    zruseno = duplicity.threading.Event()
+    zruseno.set()
+    assert duplicity.najit_skupiny(FalesnyIndex({1: _otisk(0), 2: _otisk(0)}), zruseno) is None
+
+
+def test_index_otisku_kandidati():
+    hledani = duplicity.IndexOtisku({1: _otisk(0), 2: _otisk(40), 7: _otisk(5000)})
+    ids, pocty = hledani.kandidati(_otisk(0))
+    assert ids.tolist() == [1, 2]
+    assert pocty.tolist() == [DELKA, DELKA - 40]
+    assert hledani.skladby.dtype == np.int32
+
+
+def test_sloucit_duplicity_v_playlistu(tmp_path):
+    jadro = JadroKnihovny(tmp_path)
+    try:
+        cesty = [str(tmp_path / f"{i}.mp3") for i in range(3)]
+        jadro.index.ulozit_skladby([(cesta, 1, 1.0, {}) for cesta in cesty])
+        jadro.nacist()
+        a, b, c = (jadro.tabulka.id(cesta) for cesta in cesty)
+        jadro.playlists["P"] = array("i", [b, c, a, b])
+
+        zmenene, smazane = jadro.sloucit_duplicity(a, [b])
+        assert zmenene == ["P"] and not smazane
+        # Ponechaná skladba zůstane jen na místě první kopie
+        assert list(jadro.playlists["P"]) == [a, c]
+        assert jadro.upravy.vratit() == "P"
+        assert list(jadro.playlists["P"]) == [a, c, a, a]
+    finally:
+        jadro.zavrit()
@@ -0,0 +1,40 @@
+from array import array
+from itertools import islice
+
+import hledani
+from hledani import VyhledavaciIndex, mapa_pozic, pozice_vysledku
+
+
+def _vysledky(urovne, skladby):
+    return list(pozice_vysledku(urovne, skladby, lambda: mapa_pozic(skladby)))
+
+
+def test_poradi_urovni_a_playlistu():
+    skladby = array("i", [5, 3, 9, 3, 7, 1])
+    urovne = [{9, 1}, {3}, set(), {42}]
+    assert _vysledky(urovne, skladby) == [2, 5, 1, 3]
+
+
+def test_mala_i_velka_uroven_davaji_totez():
+    skladby = array("i", [*range(1000), 500, 3])
+    mala = {999, 3, 500, 5000}
+    velka = set(range(0, 1000, 2))
+    assert len(mala) * hledani.POMER_PRUCHODU < len(skladby) <= len(velka) * hledani.POMER_PRUCHODU
+    assert _vysledky([mala], skladby) == [3, 500, 999, 1000, 1001]
+    assert _vysledky([velka], skladby) == [*range(0, 1000, 2), 1000]
+
+
+def test_velka_uroven_se_cte_line():
+    skladby = array("i", range(100_000))
+
+    def mapa():
+        raise AssertionError("velká úroveň mapu pozic nepotřebuje")
+
+    vysledky = pozice_vysledku([set(skladby)], skladby, mapa)
+    assert list(islice(vysledky, 3)) == [0, 1, 2]
+
+
+def test_chybejici():
+    index = VyhledavaciIndex()
+    index.pridat(1, "jedna.mp3")
+    assert index.chybejici(array("i", [3, 1, 2, 3])) == [3, 2]
@@ -0,0 +1,90 @@
+import os
+import struct
+
+import pytest
+
+import identita
+
+ZVUK = bytes(range(256)) * 40
+
+
+def _id3v2(delka, paticka=False):
+    velikost = bytes((delka >> posun) & 0x7F for posun in (21, 14, 7, 0))
+    hlavicka = b"ID3\x04\x00" + (b"\x10" if paticka else b"\x00") + velikost
+    return hlavicka + b"\x01" * delka + (b"3DI" + bytes(7) if paticka else b"")
+
+
+def _id3v1(titulek):
+    return b"TAG" + titulek.ljust(125, b"\x00")
+
+
+def _ape(obsah, s_hlavickou=True):
+    # Velikost v patičce zahrnuje položky a patičku, ne hlavičku
+    delka = len(obsah) + 32
+    priznaky = 0x80000000 if s_hlavickou else 0
+    zaklad = b"APETAGEX" + struct.pack("<IIII", 2000, delka, 1, priznaky)
+    hlavicka = zaklad + bytes(8) if s_hlavickou else b""
+    return hlavicka + obsah + zaklad + bytes(8)
+
+
+def _flac_metadata(*bloky):
+    data = b"fLaC"
+    for i, blok in enumerate(bloky):
+        typ = 0x80 if i == len(bloky) - 1 else 0
+        data += bytes([typ]) + len(blok).to_bytes(3, "big") + blok
+    return data
+
+
+def _zapsat(tmp_path, jmeno, data):
+    cesta = tmp_path / jmeno
+    cesta.write_bytes(data)
+    return str(cesta)
+
+
+@pytest.mark.parametrize("pred, po", [
+    (_id3v2(300), b""),
+    (_id3v2(40, paticka=True), b""),
+    (b"", _id3v1(b"Pisen")),
+    (b"", _ape(b"Title\x00Pisen" * 3)),
+    (b"", _ape(b"Artist\x00Nekdo", s_hlavickou=False)),
+    (_id3v2(1000), _ape(b"x" * 50) + _id3v1(b"Oboje")),
+])
+def test_mp3_tagy_otisk_nezmeni(tmp_path, pred, po):
+    holy = identita.otisk(_zapsat(tmp_path, "holy.mp3", ZVUK))
+    assert holy is not None and len(holy) == identita.DELKA_OTISKU
+    assert identita.otisk(_zapsat(tmp_path, "s tagy.mp3", pred + ZVUK + po)) == holy
+
+
+def test_flac_metadata_otisk_nezmeni(tmp_path):
+    ramce = b"\xff\xf8" + ZVUK
+    holy = identita.otisk(_zapsat(tmp_path, "a.flac", _flac_metadata(b"\x00" * 34) + ramce))
+    s_obrazkem = _flac_metadata(b"\x00" * 34, b"TITLE=Pisen", b"\x89PNG" * 500)
+    assert identita.otisk(_zapsat(tmp_path, "b.flac", _id3v2(20) + s_obrazkem + ramce)) == holy
+
+
+def test_zmena_zvuku_otisk_zmeni(tmp_path):
+    puvodni = identita.otisk(_zapsat(tmp_path, "a.mp3", ZVUK))
+    upraveny = bytearray(ZVUK)
+    upraveny[len(ZVUK) // 2] ^= 0xFF
+    assert identita.otisk(_zapsat(tmp_path, "b.mp3", bytes(upraveny))) != puvodni
+    assert identita.otisk(_zapsat(tmp_path, "c.mp3", ZVUK + b"\x00")) != puvodni
+
+
+def test_velky_soubor_cte_jen_bloky(tmp_path):
+    blok = identita.BLOK_OTISKU
+    data = bytearray(os.urandom(10 * blok))
+    puvodni = identita.otisk(_zapsat(tmp_path, "a.mp3", bytes(data)))
+    # Mimo začátek, střed a konec se změna neprojeví, v nich ano
+    data[2 * blok] ^= 0xFF
+    assert identita.otisk(_zapsat(tmp_path, "b.mp3", bytes(data))) == puvodni
+    data[5 * blok] ^= 0xFF
+    assert identita.otisk(_zapsat(tmp_path, "c.mp3", bytes(data))) != puvodni
+
+
+def test_chybejici_soubor(tmp_path):
+    assert identita.otisk(str(tmp_path / "neni.mp3")) is None
+
+
+@pytest.mark.parametrize("cesta", ["C:\\Hudba\\a.mp3", "/hudba/a.mp3", "Album\\Disk/a.mp3", "a.mp3"])
+def test_jmeno_souboru(cesta):
+    assert identita.jmeno_souboru(cesta) == "a.mp3"
@@ -0,0 +1,93 @@
+import sqlite3
+
+import pytest
+
+import knihovna
+from knihovna import IndexKnihovny, MIGRACE
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = IndexKnihovny(tmp_path / "knihovna.db")
+    yield index
+    index.zavrit()
+
+
+def _verze(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def _sloupce(conn):
+    return {radek[1] for radek in conn.execute("PRAGMA table_info(tracks)")}
+
+
+def test_nova_databaze_dostane_vsechny_migrace(index):
+    assert _verze(index.conn) == len(MIGRACE)
+    pridane = {"present", "frames", "loudness", "fingerprint", "plays", "audio_hashes", "waveform"}
+    assert pridane <= _sloupce(index.conn)
+
+
+def test_upgrade_ze_stare_verze_zachova_skladby(tmp_path):
+    cesta = tmp_path / "knihovna.db"
+    conn = sqlite3.connect(str(cesta))
+    for prikaz in MIGRACE[0]:
+        conn.execute(prikaz)
+    conn.execute(
+        "INSERT INTO tracks (path, dir, size, mtime, title, added) VALUES ('/h/a.mp3', '/h', 10, 1.5, 'A', 7)"
+    )
+    conn.execute("PRAGMA user_version=1")
+    conn.commit()
+    conn.close()
+
+    index = IndexKnihovny(cesta)
+    try:
+        assert _verze(index.conn) == len(MIGRACE)
+        (skladba,) = index.nacist_vse().values()
+        assert (skladba.path, skladba.size, skladba.title, skladba.added) == ("/h/a.mp3", 10, "A", 7)
+        assert (skladba.plays, skladba.loudness) == (0, None)
+        assert index.conn.execute("SELECT present, hashed FROM tracks").fetchone() == (1, 0)
+    finally:
+        index.zavrit()
+
+
+def test_selhana_migrace_nezvysi_verzi(tmp_path, monkeypatch):
+    IndexKnihovny(tmp_path / "knihovna.db").zavrit()
+    # Nová migrace se spustí i nad existující databází; když selže, verze zůstane
+    monkeypatch.setattr(knihovna, "MIGRACE", MIGRACE + [["SELECT * FROM neexistuje"]])
+    with pytest.raises(sqlite3.OperationalError):
+        IndexKnihovny(tmp_path / "knihovna.db")
+    monkeypatch.setattr(knihovna, "MIGRACE", MIGRACE)
+    index = IndexKnihovny(tmp_path / "knihovna.db")
+    assert _verze(index.conn) == len(MIGRACE)
+    index.zavrit()
+
+
+def test_zmena_souboru_vynuluje_odvozena_data(index):
+    (puvodni,) = index.ulozit_skladby([("/h/a.mp3", 10, 1.0, {"title": "A"})])
+    index.ulozit_vlnu("/h/a.mp3", b"vlna")
+    index.zapocitat_prehrani(puvodni.id, 100.0)
+    index.conn.execute("UPDATE tracks SET loudness = -9, analyzed = 1 WHERE id = ?", (puvodni.id,))
+
+    (zmenena,) = index.ulozit_skladby([("/h/a.mp3", 20, 2.0, {"title": "B"})])
+    assert zmenena.id == puvodni.id
+    assert (zmenena.size, zmenena.title, zmenena.loudness, zmenena.plays) == (20, "B", None, 1)
+    assert index.vlna("/h/a.mp3") is None
+    assert index.neanalyzovane() == ["/h/a.mp3"]
+
+
+def test_odebrana_skladba_z_playlistu_zustane_nepritomna(index):
+    index.ulozit_skladby([("/h/a.mp3", 1, 1.0, {}), ("/h/b.mp3", 1, 1.0, {})])
+    ids = index.id_pro_cesty(["/h/a.mp3", "/h/b.mp3", "/jinde/c.mp3"])
+    index.conn.execute("INSERT INTO playlist_items VALUES (1, 0, ?)", (ids["/h/a.mp3"],))
+    index.conn.commit()
+
+    index.odebrat_skladby(["/h/a.mp3", "/h/b.mp3"])
+    assert index.nacist_vse() == {}
+    nepritomne = {cesta for _, cesta, _, _ in index.nepritomne()}
+    assert nepritomne == {"/h/a.mp3", "/jinde/c.mp3"}
+
+
+def test_porovnat():
+    zname = {"/a": (1, 1.0), "/b": (2, 2.0), "/c": (3, 3.0)}
+    na_disku = {"/a": (1, 1.0), "/b": (2, 2.5), "/d": (4, 4.0)}
+    assert knihovna.porovnat(zname, na_disku) == ([("/d", 4, 4.0)], [("/b", 2, 2.5)], ["/c"])
@@ -0,0 +1,128 @@
+import os
+import sqlite3
+
+import pytest
+
+import prenos
+from knihovna import IndexKnihovny
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = IndexKnihovny(tmp_path / "knihovna.db")
+    yield index
+    index.zavrit()
+
+
+def _zapsat(cesta, data):
+    cesta.write_bytes(data)
+    return str(cesta)
+
+
+def test_m3u_s_popisky(tmp_path):
+    cesta = _zapsat(tmp_path / "a.m3u8", (
+        "\ufeff#EXTM3U\n"
+        "#EXTINF:215,Interpret - Píseň\n"
+        "Album/01 - píseň.mp3\n"
+        "\n"
+        "# komentář\n"
+        "#EXTINF:-1,Rádio\n"
+        "http://radio.example/stream\n"
+        "/hudba/bez popisku.mp3\r\n"
+    ).encode("utf-8"))
+    assert list(prenos.cist(cesta)) == [
+        ("Album/01 - píseň.mp3", "Interpret - Píseň", 215.0),
+        ("http://radio.example/stream", "Rádio", None),
+        ("/hudba/bez popisku.mp3", None, None),
+    ]
+    assert [titulek for _, titulek, _ in prenos.cist(cesta, popisky=False)] == [None, None, None]
+
+
+def test_m3u_v_kodovani_windows(tmp_path):
+    cesta = _zapsat(tmp_path / "a.m3u", "C:\\Hudba\\Žluťoučký kůň.mp3\n".encode("cp1250"))
+    assert list(prenos.cist(cesta)) == [("C:\\Hudba\\Žluťoučký kůň.mp3", None, None)]
+
+
+def test_pls(tmp_path):
+    cesta = _zapsat(tmp_path / "a.pls", (
+        "[playlist]\n"
+        "File1=/hudba/a.mp3\nTitle1=A\nLength1=100\n"
+        "File2=b.mp3\n"
+        "Title3=bez souboru\n"
+        "NumberOfEntries=3\nVersion=2\n"
+    ).encode("utf-8"))
+    assert list(prenos.cist(cesta)) == [("/hudba/a.mp3", "A", 100.0), ("b.mp3", None, None)]
+
+
+@pytest.mark.skipif(os.sep != "/", reason="cesty ve tvaru POSIX")
+@pytest.mark.parametrize("umisteni, ocekavano", [
+    ("Album/a.mp3", "/playlisty/Album/a.mp3"),
+    ("../hudba/./a.mp3", "/hudba/a.mp3"),
+    ("/hudba/a.mp3", "/hudba/a.mp3"),
+    ("Album\\a.mp3", "/playlisty/Album/a.mp3"),
+    ("file:///hudba/p%C3%ADse%C5%88.mp3", "/hudba/píseň.mp3"),
+    ("file://localhost/hudba/a.mp3", "/hudba/a.mp3"),
+    ("http://radio.example/stream", None),
+])
+def test_absolutni_cesta(umisteni, ocekavano):
+    assert prenos.absolutni_cesta(umisteni, "/playlisty") == ocekavano
+
+
+@pytest.mark.parametrize("pripona", ["m3u8", "pls"])
+def test_export_a_zpet(tmp_path, pripona):
+    cesta = str(tmp_path / f"a.{pripona}")
+    polozky = [
+        (str(tmp_path / "Album" / "a.mp3"), 61.4, "Interpret - A"),
+        ("/jinde/b.mp3", 0, "b"),
+    ]
+    assert prenos.exportovat(cesta, polozky) == 2
+    nactene = list(prenos.cist(cesta))
+    # Skladby vedle playlistu jsou relativně, ostatní absolutně
+    assert [umisteni for umisteni, _, _ in nactene] == [os.path.join("Album", "a.mp3"), "/jinde/b.mp3"]
+    assert nactene[0][1:] == ("Interpret - A", 61.0)
+    assert nactene[1][2] is None
+    assert not os.path.exists(cesta + ".tmp")
+
+
+def _skladba(index, cesta):
+    index.ulozit_skladby([(cesta, 1, 1.0, {})])
+    return index.id_pro_cesty([cesta])[cesta]
+
+
+def test_import_prirazeni_podle_konce_cesty(tmp_path, index):
+    zname = _skladba(index, "/hudba/Album/01 - a.mp3")
+    jedinecne = _skladba(index, "/hudba/Jine/jedinecne.mp3")
+    _skladba(index, "/hudba/X/spolecne.mp3")
+    _skladba(index, "/hudba/Y/spolecne.mp3")
+    cesta = _zapsat(tmp_path / "a.m3u8", (
+        "D:\\Music\\Album\\01 - a.mp3\n"
+        "/jiny/pocitac/jedinecne.mp3\n"
+        "/jinde/spolecne.mp3\n"
+        "http://radio.example/stream\n"
+    ).encode("utf-8"))
+
+    skladby, prirazeni, preskoceno = prenos.importovat(index, cesta)
+    assert preskoceno == 1
+    assert list(skladby[:2]) == [zname, jedinecne]
+    # Nejednoznačné jméno souboru se nepřiřadí, skladba se založí jako nepřítomná
+    assert prirazeni.podle_konce == 2
+    assert prirazeni.chybi == 1
+    assert [cesta for _, cesta in prirazeni.mimo] == ["/jinde/spolecne.mp3"]
+
+
+def test_import_uvolni_zamek_po_kazde_davce(tmp_path, index, monkeypatch):
+    monkeypatch.setattr(prenos, "DAVKA", 10)
+    cesta = _zapsat(tmp_path / "a.m3u8", "".join(f"/chybi/{i}.mp3\n" for i in range(35)).encode())
+    druhe = sqlite3.connect(str(index.db_path), timeout=0)
+    zapisy = []
+
+    def prubeh(hotovo):
+        # Jako okno, které mezitím započítá přehrání
+        with druhe:
+            druhe.execute("UPDATE tracks SET plays = plays + 1 WHERE id = 1")
+        zapisy.append(hotovo)
+
+    skladby, prirazeni, _ = prenos.importovat(index, cesta, prubeh)
+    druhe.close()
+    assert zapisy == [10, 20, 30]
+    assert len(skladby) == 35 and prirazeni.chybi == 35
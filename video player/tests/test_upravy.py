@@ -0,0 +1,93 @@
+from array import array
+
+import upravy
+from upravy import UpravyPlaylistu
+
+
+def _upravy(*skladby):
+    playlisty = {"P": array("i", skladby)}
+    return playlisty, UpravyPlaylistu(playlisty)
+
+
+def test_pridat_jen_chybejici():
+    playlisty, u = _upravy(1, 2)
+    playlist = playlisty["P"]
+    assert u.pridat("P", [2, 3, 3, 4]) == 2
+    assert list(playlisty["P"]) == [1, 2, 3, 4]
+    # Pole se mění na místě, zobrazení drží pořád stejný objekt
+    assert playlisty["P"] is playlist
+    assert u.pridat("P", [1, 4]) == 0
+    assert len(u.zpet) == 1
+
+
+def test_odebrat_a_presunout():
+    playlisty, u = _upravy(1, 2, 3, 4, 5)
+    assert u.odebrat("P", [1, 3, 99]) == 2
+    assert list(playlisty["P"]) == [1, 3, 5]
+    assert not u.obsahuje("P", 2)
+    assert u.presunout("P", [2], 0) == 0
+    assert list(playlisty["P"]) == [5, 1, 3]
+    # Blok, který už na cíli je, se nepřesouvá a nezapisuje do historie
+    assert u.presunout("P", [1, 2], 1) is None
+    assert len(u.zpet) == 2
+
+
+def test_odstranit_duplicity():
+    playlisty, u = _upravy(1, 2, 1, 3, 2)
+    assert u.odstranit_duplicity("P") == 2
+    assert list(playlisty["P"]) == [1, 2, 3]
+    assert u.odstranit_duplicity("P") == 0
+    assert u.pridat("P", [1]) == 0
+
+
+def test_odstranit_duplicity_po_odebrani():
+    playlisty, u = _upravy(1, 1, 2)
+    u.odebrat("P", [2])
+    assert u.odstranit_duplicity("P") == 1
+    assert list(playlisty["P"]) == [1]
+    assert u.vratit() == "P"
+    assert list(playlisty["P"]) == [1, 1]
+    assert u.odstranit_duplicity("P") == 1
+
+
+def test_zpet_a_znovu():
+    playlisty, u = _upravy(1, 2, 3)
+    u.pridat("P", [4])
+    u.odebrat("P", [0])
+    assert list(playlisty["P"]) == [2, 3, 4]
+
+    assert u.vratit() == "P"
+    assert list(playlisty["P"]) == [1, 2, 3, 4]
+    assert u.vratit() == "P"
+    assert list(playlisty["P"]) == [1, 2, 3]
+    assert u.vratit() is None
+    # Členství se po vrácení počítá znovu z obsahu
+    assert not u.obsahuje("P", 4)
+
+    assert u.znovu() == "P"
+    assert list(playlisty["P"]) == [1, 2, 3, 4]
+    # Nová úprava zahodí kroky vpřed
+    u.pridat("P", [5])
+    assert u.znovu() is None
+
+
+def test_smazany_playlist_se_v_historii_preskoci():
+    playlisty, u = _upravy(1)
+    playlisty["Q"] = array("i")
+    u.pridat("Q", [1])
+    u.pridat("P", [2])
+    del playlisty["P"]
+    assert u.vratit() == "Q"
+    assert list(playlisty["Q"]) == []
+
+
+def test_zapomenout_a_hloubka_historie(monkeypatch):
+    monkeypatch.setattr(upravy, "HLOUBKA_HISTORIE", 3)
+    playlisty, u = _upravy()
+    for skladba in range(5):
+        u.pridat("P", [skladba])
+    assert len(u.zpet) == 3
+    playlisty["P"].append(7)
+    u.zapomenout("P")
+    assert u.vratit() is None
+    assert u.obsahuje("P", 7)
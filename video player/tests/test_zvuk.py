@@ -0,0 +1,103 @@
+import time
+import wave
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("pygame")
+
+import zvuk
+
+FREKVENCE = 44100
+VZORKU = FREKVENCE // 2
+# Skladbu z fronty SDL_mixer pustí až od začátku dalšího bufferu (výchozích 512 vzorků)
+BUFFER = 512
+PRVNI, DRUHA = 1000, 2000
+
+
+def _ton(cesta, hodnota):
+    with wave.open(str(cesta), "wb") as f:
+        f.setnchannels(2)
+        f.setsampwidth(2)
+        f.setframerate(FREKVENCE)
+        f.writeframes(np.full((VZORKU, 2), hodnota, np.int16).tobytes())
+    return str(cesta)
+
+
+@pytest.fixture(scope="module")
+def vystup(tmp_path_factory):
+    if zvuk.pygame is not None:
+        pytest.skip("mixer už je otevřený s jiným ovladačem")
+    # Ovladač "disk" zapisuje smíchaný výstup do souboru, takže se dá počítat ve vzorcích;
+    # s 1 ms na buffer běží rychleji než v reálném čase
+    soubor = tmp_path_factory.mktemp("zvuk") / "vystup.raw"
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setenv("SDL_AUDIODRIVER", "disk")
+        mp.setenv("SDL_DISKAUDIOFILE", str(soubor))
+        mp.setenv("SDL_DISKAUDIODELAY", "1")
+        mp.setenv("SDL_VIDEODRIVER", "dummy")
+        zvuk.nacist_backend(FREKVENCE)
+        mixer = zvuk.VystupMixeru()
+    yield mixer, soubor
+    mixer.zastavit()
+
+
+def _zaznam(soubor, od, limit=5.0):
+    """Levý kanál výstupu od bajtu `od`, oříznutý na zvuk; čeká, až za ním je buffer ticha."""
+    konec = time.monotonic() + limit
+    while True:
+        vzorky = np.fromfile(soubor, np.int16, offset=od)
+        vzorky = vzorky[:len(vzorky) // 2 * 2].reshape(-1, 2)[:, 0]
+        nenulove = np.flatnonzero(vzorky)
+        if len(nenulove) and len(vzorky) - nenulove[-1] > BUFFER:
+            return vzorky[nenulove[0]:nenulove[-1] + 1]
+        assert time.monotonic() < konec, "mixer nedohrál"
+        time.sleep(0.01)
+
+
+def _useky(vzorky):
+    """[(hodnota, počet)] pro úseky stejných vzorků za sebou."""
+    hranice = np.flatnonzero(np.diff(vzorky)) + 1
+    return [(int(usek[0]), len(usek)) for usek in np.split(vzorky, hranice)]
+
+
+def _zacatek(soubor):
+    od = soubor.stat().st_size
+    return od - od % 4
+
+
+def test_prechod_na_dalsi_skladbu(tmp_path, vystup):
+    mixer, soubor = vystup
+    druha = _ton(tmp_path / "b.wav", DRUHA)
+    od = _zacatek(soubor)
+    mixer.hrat(_ton(tmp_path / "a.wav", PRVNI), 0.5)
+    mixer.pripravit_dalsi(druha, 0.5)
+
+    vzorky = _zaznam(soubor, od)
+    skladby = [(hodnota, pocet) for hodnota, pocet in _useky(vzorky) if hodnota]
+    # Obě skladby celé a v pořadí; ticho mezi nimi je jen zbytek bufferu, kde první skončila
+    assert [pocet for _, pocet in skladby] == [VZORKU, VZORKU]
+    assert 0 < skladby[0][0] < skladby[1][0]
+    assert len(vzorky) - 2 * VZORKU < BUFFER
+
+    assert mixer.zkontrolovat_prechod()
+    assert mixer.cesta == druha
+
+
+def test_zrusena_dalsi_skladba_nezacne(tmp_path, vystup, monkeypatch):
+    mixer, soubor = vystup
+    od = _zacatek(soubor)
+    mixer.hrat(_ton(tmp_path / "a.wav", PRVNI), 0.5)
+    mixer.pripravit_dalsi(_ton(tmp_path / "b.wav", DRUHA), 0.5)
+
+    def znovu_otevrit(*args):
+        raise AssertionError("zrušení fronty nesmí přerušit hranou skladbu")
+
+    monkeypatch.setattr(zvuk.pygame.mixer.music, "load", znovu_otevrit)
+    mixer.zrusit_dalsi()
+    assert mixer.dalsi is None
+
+    # První skladba dohrála jednou a celá, druhá vůbec
+    assert [pocet for _, pocet in _useky(_zaznam(soubor, od))] == [VZORKU]
+    assert mixer.dohrala()
+    assert not mixer.zkontrolovat_prechod()
@@ -0,0 +1,134 @@
+from array import array
+from collections import Counter
+
+# Kolik úprav playlistů jde vrátit; krok drží jen kopii pole id před a po úpravě
+HLOUBKA_HISTORIE = 100
+
+
+class UpravyPlaylistu:
+    """Hromadné úpravy playlistů (přidat, odebrat, přesunout, odstranit duplicity) s historií.
+
+    Playlisty jsou pole id a mění se na místě, takže zobrazení i ukládání s nimi dál
+    pracují beze změny. Členství se hlídá počítadlem id pro každý upravovaný playlist,
+    kontrola duplicity je tak O(1) místo procházení pole. Každá operace je jeden krok
+    historie a volající ji ukládá jednou, ať se týká jedné skladby nebo tisíce.
+    """
+
+    def __init__(self, playlisty):
+        self.playlisty = playlisty
+        self._clenove = {}        # název -> Counter(id), staví se při první úpravě
+        self.zpet = []            # [(název, před, po)]
+        self.vpred = []
+
+    def clenove(self, nazev):
+        clenove = self._clenove.get(nazev)
+        if clenove is None:
+            clenove = self._clenove[nazev] = Counter(self.playlisty[nazev])
+        return clenove
+
+    def obsahuje(self, nazev, skladba):
+        return self.clenove(nazev)[skladba] > 0
+
+    def _zapsat(self, nazev, pred):
+        self.zpet.append((nazev, pred, self.playlisty[nazev][:]))
+        if len(self.zpet) > HLOUBKA_HISTORIE:
+            del self.zpet[0]
+        self.vpred.clear()
+
+    def pridat(self, nazev, skladby):
+        """Připojí skladby, které v playlistu ještě nejsou; vrátí počet přidaných."""
+        clenove = self.clenove(nazev)
+        nove = array("i")
+        for skladba in skladby:
+            if not clenove[skladba]:
+                clenove[skladba] += 1
+                nove.append(skladba)
+        if nove:
+            playlist = self.playlisty[nazev]
+            pred = playlist[:]
+            playlist.extend(nove)
+            self._zapsat(nazev, pred)
+        return len(nove)
+
+    def odebrat(self, nazev, pozice):
+        """Odebere položky na daných pozicích; vrátí počet odebraných."""
+        playlist = self.playlisty[nazev]
+        pozice = {p for p in pozice if 0 <= p < len(playlist)}
+        if not pozice:
+            return 0
+        pred = playlist[:]
+        clenove = self.clenove(nazev)
+        for p in pozice:
+            skladba = playlist[p]
+            clenove[skladba] -= 1
+            # Klíč s nulou by se dál počítal do počtu různých skladeb
+            if not clenove[skladba]:
+                del clenove[skladba]
+        playlist[:] = array("i", (s for i, s in enumerate(pred) if i not in pozice))
+        self._zapsat(nazev, pred)
+        return len(pozice)
+
+    def presunout(self, nazev, pozice, cil):
+        """Přesune položky na `pozice` (v jejich pořadí) před položku `cil`.
+
+        Vrátí pozici, kde přesunutý blok začíná, nebo None, když se nic nezměnilo.
+        """
+        playlist = self.playlisty[nazev]
+        pozice = sorted({p for p in pozice if 0 <= p < len(playlist)})
+        if not pozice:
+            return None
+        cil = min(max(cil, 0), len(playlist))
+        # Cíl se posune o přesouvané položky, které byly před ním
+        zacatek = cil - sum(1 for p in pozice if p < cil)
+        if pozice == list(range(zacatek, zacatek + len(pozice))):
+            return None
+        pred = playlist[:]
+        vybrane = set(pozice)
+        blok = array("i", (pred[p] for p in pozice))
+        zbytek = array("i", (s for i, s in enumerate(pred) if i not in vybrane))
+        playlist[:] = zbytek[:zacatek] + blok + zbytek[zacatek:]
+        self._zapsat(nazev, pred)
+        return zacatek
+
+    def odstranit_duplicity(self, nazev):
+        """Nechá každou skladbu jen na jejím prvním místě; vrátí počet odebraných."""
+        playlist = self.playlisty[nazev]
+        clenove = self.clenove(nazev)
+        if len(clenove) == len(playlist):
+            return 0
+        pred = playlist[:]
+        videne = set()
+        playlist[:] = array("i", (s for s in pred if not (s in videne or videne.add(s))))
+        self._clenove[nazev] = Counter(dict.fromkeys(videne, 1))
+        self._zapsat(nazev, pred)
+        return len(pred) - len(playlist)
+
+    def _obnovit(self, nazev, obsah):
+        if nazev not in self.playlisty:
+            return None
+        self.playlisty[nazev][:] = obsah
+        self._clenove.pop(nazev, None)
+        return nazev
+
+    def vratit(self):
+        """Vrátí poslední úpravu; vrátí název dotčeného playlistu, nebo None."""
+        while self.zpet:
+            nazev, pred, po = self.zpet.pop()
+            self.vpred.append((nazev, pred, po))
+            if self._obnovit(nazev, pred) is not None:
+                return nazev
+        return None
+
+    def znovu(self):
+        while self.vpred:
+            nazev, pred, po = self.vpred.pop()
+            self.zpet.append((nazev, pred, po))
+            if self._obnovit(nazev, po) is not None:
+                return nazev
+        return None
+
+    def zapomenout(self, nazev):
+        """Playlist se změnil jinudy (smazání, přesměrování skladeb); jeho historie už neplatí."""
+        self._clenove.pop(nazev, None)
+        self.zpet = [krok for krok in self.zpet if krok[0] != nazev]
+        self.vpred = [krok for krok in self.vpred if krok[0] != nazev]
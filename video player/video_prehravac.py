@@ -1,30 +1,80 @@
+from casomira import mereni, instrumentace, mereno, INTERVAL_TEPU_MS
+
 import sys 
 import os
-import json
+import sqlite3
+import threading
+import time
+import importlib.util
+import multiprocessing
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from pathlib import Path
 
-from PySide6.QtMultimedia import QMediaPlayer
-from PySide6.QtMultimediaWidgets import QVideoWidget
-
-from PySide6.QtWidgets import (
-    QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, 
-    QLabel, QListWidget, QSlider, QPushButton, QLineEdit, QFileDialog,
-    QInputDialog, QMessageBox, QMenu, QDialog
-)
-from PySide6.QtCore import Qt, QSize, QTimer, QUrl
-from PySide6.QtGui import QFont, QColor, QPalette, QIcon, QPixmap
+with mereni.usek("import PySide6"):
+    from PySide6.QtWidgets import (
+        QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, 
+        QLabel, QListView, QSlider, QPushButton, QLineEdit, QFileDialog,
+        QInputDialog, QMessageBox, QMenu, QDialog, QAbstractItemView
+    )
+    from PySide6.QtCore import (
+        Qt, QSize, QTimer, QUrl, QFileSystemWatcher, Signal, QEvent, QObject, QItemSelection,
+        QItemSelectionModel
+    )
+    from PySide6.QtGui import QFont, QColor, QPalette, QIcon, QPixmap, QShortcut, QKeySequence
+
+# Mutagen, pygame a QtMultimedia se načítají až ve chvíli, kdy jsou potřeba
+with mereni.usek("import modulů přehrávače"):
+    from knihovna import IndexKnihovny
+    import jadro
+    from jadro import JadroKnihovny, datova_slozka
+    from vlakna import SkenerKnihovny, AnalyzaHlasitosti, KontrolaKnihovny, HledacDuplicit
+    from modely import ModelSkladeb, ModelPlaylistu, ModelSkupin, DelegatSkladby, SeznamSkladeb
+    from skupiny import IndexSkupin, NEZNAMY_INTERPRET, NEZNAME_ALBUM, BEZ_ZANRU
+    from hledani import VyhledavaciIndex, mapa_pozic, pozice_vysledku
+    from playlisty import UlozistePlaylistu
+    from chytry_dialog import DialogChytrehoPlaylistu
+    from duplicity_dialog import DialogDuplicit
+    import prenos
+    from zvuk import ZvukovyVystup, ChybaZvuku, nacist_backend, ukoncit
+    from mp3 import precist_geometrii
+    from formaty import precist_metadata
+    from hlasitost import zesileni, hlasitost_celku
+    import vlnovka
+    from vlnovka import PosuvnikVlny, Vlna
+    from obaly import NacitacObalu
+    from prekryv import PrekryvVykonu
+
+# Posuvník se překresluje nejvýš takhle často, i když by se jezdec posunul o pixel dřív
+MIN_INTERVAL_PRUBEHU_MS = 40
+# O kolik později než podle hodin se ověřuje konec skladby u mixeru. Mixer ohlásí konec,
+# když mu při plnění bufferu dojdou data, tedy do jednoho bufferu (512 vzorků, ~12 ms) od
+# konce podle hodin; 30 ms to pokryje i s nepřesností časovače. Když skladba ještě hraje
+# (délka v indexu je kratší než skutečná), čeká se pokaždé dvakrát déle, nejvýš sekundu
+REZERVA_KONCE_MS = 30
+MAX_REZERVA_KONCE_MS = 1000
+# Strana obalu alba v přehrávači (v logických pixelech)
+VELIKOST_OBALU = 44
+
+# Časovač chytrých playlistů se nastavuje nejvýš takhle dopředu, ať nezávisí na dlouhém spánku
+MAX_CEKANI_CHYTRYCH_MS = 3600 * 1000
+
+# Vyrovnání hlasitosti: vypnuto, podle skladby, podle alba
+NORMALIZACE = ("vypnuto", "skladba", "album")
 
-try:
-    from mutagen.mp3 import MP3
-except ImportError:
-    print("Knihovna Mutagen není nalezena. Nainstalujte ji: pip install mutagen")
-    sys.exit()
-
-import pygame
 
 class LoadingScreen(QDialog):
+    """Úvodní video, za kterým se aplikace připravuje; kliknutím nebo klávesou jde přeskočit."""
+
     def __init__(self, assets_path):
         super().__init__()
+        # QtMultimedia je potřeba jen pro úvodní video
+        from PySide6.QtMultimedia import QMediaPlayer
+        from PySide6.QtMultimediaWidgets import QVideoWidget
+        self.konec_videa = (QMediaPlayer.MediaStatus.EndOfMedia, QMediaPlayer.MediaStatus.InvalidMedia)
+        self.zobrazit_okno = None
+        self.dohrano = False
         
         self.setWindowFlags(Qt.FramelessWindowHint | Qt.WindowStaysOnTopHint)
         self.setAttribute(Qt.WA_DeleteOnClose) 
@@ -44,7 +94,7 @@ class LoadingScreen(QDialog):
 
         if not video_file.exists():
             print(f"'loading.mp4' nenalezeno ve složce {assets_path}.")
-            QTimer.singleShot(0, self.close) 
+            self.dohrano = True
             return
 
         self.player.setSource(QUrl.fromLocalFile(str(video_file.resolve())))
@@ -55,41 +105,195 @@ class LoadingScreen(QDialog):
         self.player.play()
 
     def video_skoncilo(self, status):
-        if status == QMediaPlayer.MediaStatus.EndOfMedia:
+        if status in self.konec_videa:
             print("Video dokončeno, spouštím aplikaci.")
-            self.player.stop()
-            self.close()
+            self.dohrano = True
+            self.dokoncit()
+
+    def aplikace_pripravena(self, zobrazit_okno):
+        self.zobrazit_okno = zobrazit_okno
+        if self.dohrano:
+            self.dokoncit()
+
+    def dokoncit(self):
+        # Dokud okno aplikace není hotové, úvod běží dál (případně stojí na posledním snímku)
+        if self.zobrazit_okno is None:
+            return
+        zobrazit_okno, self.zobrazit_okno = self.zobrazit_okno, None
+        self.player.stop()
+        # Okno se musí ukázat dřív, než se úvod zavře, jinak by aplikace skončila
+        zobrazit_okno()
+        self.close()
+
+    def mousePressEvent(self, event):
+        self.dohrano = True
+        self.dokoncit()
+
+    def keyPressEvent(self, event):
+        self.dohrano = True
+        self.dokoncit()
+
+
+class PripravaStartu(QObject):
+    """Zatímco běží úvodní video, načte na pozadí zvukový backend, knihovnu a playlisty."""
+
+    hotovo = Signal(object)
+
+    def __init__(self, data_dir):
+        super().__init__()
+        self.data_dir = data_dir
+
+    def start(self):
+        threading.Thread(target=self._pripravit, name="priprava", daemon=True).start()
+
+    def _pripravit(self):
+        with mereni.usek("pygame + otevření mixeru"):
+            try:
+                nacist_backend()
+            except Exception as e:
+                # Zkusí se znovu při vytvoření okna, tam se chyba ukáže
+                print(f"Zvukový backend se nepodařilo připravit: {e}")
+
+        # SQLite spojení nesmí přecházet mezi vlákny, jádro okna si pak otevře vlastní.
+        # Okno musí vzniknout vždy: po chybě (poškozená nebo zamčená databáze) se knihovna
+        # načte až v okně, které případnou chybu ukáže
+        pripraveno = None
+        try:
+            pripraveno = jadro.pripravit(self.data_dir)
+        except Exception as e:
+            print(f"Příprava knihovny na pozadí selhala, načtu ji v okně: {type(e).__name__}: {e}")
+        finally:
+            self.hotovo.emit(pripraveno)
+
 
 class ModerniPrehravac(QMainWindow):
     
-    def __init__(self):
+    hledani_postaveno = Signal(object, object)
+    geometrie_nactena = Signal(str, object)
+    vlna_nactena = Signal(str, object)
+    prubeh_importu = Signal(str, int)
+    playlist_importovan = Signal(object)
+    playlist_exportovan = Signal(object)
+
+    # Knihovnu, playlisty, frontu a historii úprav drží jádro, okno je jen zobrazuje
+    index = property(lambda self: self.jadro.index)
+    playlist_store = property(lambda self: self.jadro.playlist_store)
+    tabulka = property(lambda self: self.jadro.tabulka)
+    playlists = property(lambda self: self.jadro.playlists)
+    chytre = property(lambda self: self.jadro.chytre)
+    fronta = property(lambda self: self.jadro.fronta)
+    upravy = property(lambda self: self.jadro.upravy)
+    
+    def __init__(self, pripraveno=None):
         super().__init__()
         self.setWindowTitle(" Craftora player v2.21")
         self.setGeometry(100, 100, 1366, 768)
+        pripraveno = pripraveno or {}
         
-        pygame.mixer.init()
+        with mereni.usek("zvukový výstup"):
+            self.zvuk = ZvukovyVystup()
         self.current_track = None
         self.current_song_duration_sec = 0
         
         script_dir = Path(__file__).parent.resolve()
+        data_dir = datova_slozka()
         self.assets_path = script_dir / "assets"
-        self.playlists_file = script_dir / "playlists.json"
+        self.jadro = JadroKnihovny(data_dir)
+        self.skener = None
+        self.cekajici_sken = []
+        self.analyza = None
+        self.analyzovat_znovu = False
+        self.kontrola = None
+        self.kontrolovat_znovu = False
+        self.duplicity = None
+        self.normalizace = "skladba"
+        self._hlasitost_alb = None
         
         self.icons = {} 
-        self.track_library = {} 
-        self.playlists = {}     
-        self.currently_viewing_paths = [] 
+        self.currently_viewing_ids = [] 
+        # Název zobrazeného playlistu, pokud ho jde ručně upravovat (ne All Tracks ani chytrý)
+        self.upravovany_playlist = None
         self.repeat_mode = 0 
         
         # Nová proměnná pro řízení stavu bočního menu
         self.sidebar_mode = "HOME" # Může být "HOME" nebo "PLAYLISTS"
+        # Procházení podle interpretů a žánrů: None, nebo cesta jako ["ARTISTS", interpret, album]
+        self.prochazeni = None
+        self.skupiny = IndexSkupin()
 
+        # Průběh se překresluje jen při viditelném okně a jen tak často, jak je to vidět;
+        # konec skladby hlídá jediný časovač nastavený na okamžik, kdy má skončit
         self.timer = QTimer(self)
-        self.timer.setInterval(500) 
+        self.timer.setSingleShot(True)
+        self.timer.setTimerType(Qt.TimerType.PreciseTimer)
         self.timer.timeout.connect(self.aktualizovat_progress)
-        
-        self.nacist_ikony() 
-        self.load_playlists_from_file() 
+        self.konec_timer = QTimer(self)
+        self.konec_timer.setSingleShot(True)
+        self.konec_timer.setTimerType(Qt.TimerType.PreciseTimer)
+        self.konec_timer.timeout.connect(self.konec_skladby)
+        self.rezerva_konce = REZERVA_KONCE_MS
+        
+        # Hlídání složek knihovny, změny sbíráme a zpracujeme najednou po chvíli klidu
+        self.watcher = QFileSystemWatcher(self)
+        self.watcher.directoryChanged.connect(self.slozka_zmenena)
+        self.sledovane_slozky = set()
+        self.zmenene_slozky = set()
+        self.watch_timer = QTimer(self)
+        self.watch_timer.setSingleShot(True)
+        self.watch_timer.setInterval(500)
+        self.watch_timer.timeout.connect(self.zpracovat_zmeny_slozek)
+        
+        # Vyhledávací index se staví na pozadí, změny z mezidobí se dohrají po převzetí
+        self.hledani = VyhledavaciIndex()
+        self.cekajici_hledani = None
+        self._pozice_hledani = None
+        self.hledani_postaveno.connect(self.prevzit_hledani)
+        # Počty ve skupinách se během skenu obnovují nejvýš čtyřikrát za sekundu
+        self.prochazeni_timer = QTimer(self)
+        self.prochazeni_timer.setSingleShot(True)
+        self.prochazeni_timer.setInterval(250)
+        self.prochazeni_timer.timeout.connect(self.obnovit_prochazeni)
+        self.geometrie_nactena.connect(self.prevzit_geometrii)
+        
+        # Vlna skladby pro posuvník se čte z indexu, nebo ji spočítá pracovní proces;
+        # dekódovaná skladba tak nikdy nezabírá paměť okna
+        self.vlny_pool = None
+        self._vlna_future = None
+        self.vlna_nactena.connect(self.prevzit_vlnu)
+
+        # Obaly alb: náhledy z paměti, z cache na disku, nebo z tagů ve vláknech na pozadí
+        self.obaly = NacitacObalu(data_dir / "cache" / "obaly", parent=self)
+        self.obaly.zmena.connect(self.prevzit_obal)
+        self.obaly_timer = QTimer(self)
+        self.obaly_timer.setSingleShot(True)
+        self.obaly_timer.setInterval(50)
+        self.obaly_timer.timeout.connect(lambda: self.song_list_widget.viewport().update())
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(120)
+        self.search_timer.timeout.connect(lambda: self.filtrovat_skladby(self.content_title_label.text()))
+        
+        # Změny playlistů se ukládají dávkově chvíli po poslední úpravě
+        self.zmenene_playlisty = set()
+        self.save_timer = QTimer(self)
+        self.save_timer.setSingleShot(True)
+        self.save_timer.setInterval(1000)
+        self.save_timer.timeout.connect(self.ulozit_zmenene_playlisty)
+        # Import a export playlistů běží ve vláknech, GUI dostane jen hotový výsledek
+        self.importovane = set()
+        self.zrusit_prenos = threading.Event()
+        self.prubeh_importu.connect(
+            lambda nazev, pocet: self.statusBar().showMessage(f"Importuji '{nazev}': {pocet} položek"))
+        self.playlist_importovan.connect(self.prevzit_import)
+        self.playlist_exportovan.connect(self.export_dokoncen)
+        # Chytré playlisty s podmínkou "za posledních N dní" se přepočítají, až čas vyprší
+        self.chytre_timer = QTimer(self)
+        self.chytre_timer.setSingleShot(True)
+        self.chytre_timer.timeout.connect(self.chytre_vyprsely)
+        
+        with mereni.usek("ikony"):
+            self.nacist_ikony() 
+        self.load_playlists_from_file(pripraveno.get("playlisty")) 
 
         self.nastavit_tmavy_styl()
 
@@ -113,14 +317,30 @@ class ModerniPrehravac(QMainWindow):
         self.player_bar = self.vytvorit_player_bar()
         main_layout.addWidget(self.player_bar)
         
-        self.skenovat_lokalni_hudbu() 
+        # Měření výkonu: Ctrl+Shift+P ho zapne a ukáže přehled, Ctrl+Shift+E uloží export
+        self.prekryv = PrekryvVykonu(central_widget)
+        self.tep_timer = QTimer(self)
+        self.tep_timer.setInterval(INTERVAL_TEPU_MS)
+        self.tep_timer.timeout.connect(instrumentace.tep)
+        if instrumentace.zapnuto:
+            self.tep_timer.start()
+        QShortcut(QKeySequence("Ctrl+Shift+P"), self, activated=self.prepnout_mereni)
+        QShortcut(QKeySequence("Ctrl+Shift+E"), self, activated=self.exportovat_mereni)
+        QShortcut(QKeySequence.Undo, self, activated=self.vratit_upravu)
+        QShortcut(QKeySequence.Redo, self, activated=self.zopakovat_upravu)
+        
+        with mereni.usek("knihovna do seznamu"):
+            self.nacist_knihovnu(pripraveno.get("knihovna"))
+            self.nacist_chytre(pripraveno.get("chytre"))
+        with mereni.usek("spuštění skenu"):
+            self.skenovat_lokalni_hudbu() 
         self.aktualizovat_playlist_list() 
         
         # Inicializujeme sidebar po vytvoření widgetů pro playlisty
         self.prepnout_sidebar_mode(self.sidebar_mode)
         
-        if self.playlist_list_widget.count() > 0:
-            self.zobrazit_playlist(self.playlist_list_widget.item(0))
+        if self.playlist_model.rowCount() > 0:
+            self.zobrazit_playlist()
 
 
     def nacist_ikony(self):
@@ -245,7 +465,11 @@ class ModerniPrehravac(QMainWindow):
         self.playlist_management_container.setVisible(is_playlists)
         self.nav_menu_container.setVisible(not is_playlists)
 
-        # Můžeme také aktualizovat centrální obsah, ale pro tuto verzi jen přepneme menu.
+        # Interpreti a žánry mají vlastní procházení, ostatní sekce ukazují seznam skladeb
+        if mode in ("ARTISTS", "CATEGORIES"):
+            self.otevrit_prochazeni([mode])
+        else:
+            self.zavrit_prochazeni()
 
     def vytvorit_playlist_management_panel(self):
         """Vytvoří widget obsahující vše pro správu playlistů."""
@@ -262,12 +486,14 @@ class ModerniPrehravac(QMainWindow):
         management_layout = QHBoxLayout()
         create_playlist_btn = QPushButton("Vytvořit")
         create_playlist_btn.clicked.connect(self.vytvorit_novy_playlist)
+        smart_playlist_btn = QPushButton("Chytrý")
+        smart_playlist_btn.clicked.connect(lambda: self.upravit_chytry_playlist())
         delete_playlist_btn = QPushButton("Smazat")
         delete_playlist_btn.clicked.connect(self.smazat_playlist)
-        scan_button = QPushButton("Skenovat složku")
-        scan_button.clicked.connect(self.vybrat_slozku_pro_skenovani)
+        self.scan_button = QPushButton("Skenovat složku")
+        self.scan_button.clicked.connect(self.vybrat_slozku_pro_skenovani)
         
-        for btn in [create_playlist_btn, delete_playlist_btn, scan_button]:
+        for btn in [create_playlist_btn, smart_playlist_btn, delete_playlist_btn, self.scan_button]:
             btn.setStyleSheet("""
                 QPushButton {
                     padding: 5px; 
@@ -283,20 +509,40 @@ class ModerniPrehravac(QMainWindow):
         
         layout.addLayout(management_layout)
 
+        prenos_layout = QHBoxLayout()
+        import_btn = QPushButton("Importovat")
+        import_btn.setToolTip("Importovat playlist M3U, M3U8 nebo PLS")
+        import_btn.clicked.connect(self.importovat_playlist)
+        export_btn = QPushButton("Exportovat")
+        export_btn.setToolTip("Uložit vybraný playlist jako M3U8, M3U nebo PLS")
+        export_btn.clicked.connect(self.exportovat_playlist)
+        self.duplicity_button = QPushButton("Duplicity")
+        self.duplicity_button.setToolTip("Najít stejné skladby v různých souborech podle zvuku")
+        self.duplicity_button.clicked.connect(self.najit_duplicity)
+        for btn in [import_btn, export_btn, self.duplicity_button]:
+            btn.setStyleSheet(create_playlist_btn.styleSheet())
+            prenos_layout.addWidget(btn)
+        layout.addLayout(prenos_layout)
+
         # List widget pro playlisty
-        self.playlist_list_widget = QListWidget()
-        self.playlist_list_widget.itemClicked.connect(self.zobrazit_playlist)
+        self.playlist_model = ModelPlaylistu(self)
+        self.playlist_list_widget = QListView()
+        self.playlist_list_widget.setModel(self.playlist_model)
+        self.playlist_list_widget.setUniformItemSizes(True)
+        self.playlist_list_widget.clicked.connect(self.zobrazit_playlist)
+        self.playlist_list_widget.setContextMenuPolicy(Qt.CustomContextMenu)
+        self.playlist_list_widget.customContextMenuRequested.connect(self.zobrazit_menu_playlistu)
         self.playlist_list_widget.setStyleSheet("""
-            QListWidget {
+            QListView {
                 border: none;
                 background-color: transparent;
                 padding-left: 5px; 
             }
-            QListWidget::item {
+            QListView::item {
                 padding: 5px;
                 border-radius: 4px;
             }
-            QListWidget::item:selected {
+            QListView::item:selected {
                 background-color: rgba(0, 191, 255, 50); 
                 color: white;
             }
@@ -369,32 +615,55 @@ class ModerniPrehravac(QMainWindow):
             pixmap = search_icon.pixmap(QSize(28, 28)) 
             self.content_title_label.addAction(QIcon(pixmap), QLineEdit.LeadingPosition)
 
-        self.content_title_label.textChanged.connect(self.filtrovat_skladby)
+        self.content_title_label.textChanged.connect(lambda _text: self.search_timer.start())
         central_layout.addWidget(self.content_title_label)
-        
-        song_list = QListWidget()
-        song_list.setFont(QFont("Segoe UI", 11))
-        
-        song_list.itemClicked.connect(self.pustit_vybranou_skladbu)
+
+        # Lišta procházení: zpět o úroveň a kde právě jsme
+        self.prochazeni_bar = QWidget()
+        prochazeni_layout = QHBoxLayout(self.prochazeni_bar)
+        prochazeni_layout.setContentsMargins(0, 0, 0, 0)
+        zpet_btn = QPushButton("←")
+        zpet_btn.setFixedSize(QSize(32, 28))
+        zpet_btn.clicked.connect(self.prochazeni_zpet)
+        self.prochazeni_label = QLabel()
+        self.prochazeni_label.setFont(QFont("Segoe UI", 12))
+        prochazeni_layout.addWidget(zpet_btn)
+        prochazeni_layout.addWidget(self.prochazeni_label, 1)
+        self.prochazeni_bar.setVisible(False)
+        central_layout.addWidget(self.prochazeni_bar)
+
+        self.skupiny_model = ModelSkupin(self)
+        self.skupiny_list = QListView()
+        self.skupiny_list.setModel(self.skupiny_model)
+        self.skupiny_list.setFont(QFont("Segoe UI", 11))
+        self.skupiny_list.setUniformItemSizes(True)
+        self.skupiny_list.setMouseTracking(True)
+        self.skupiny_list.setItemDelegate(DelegatSkladby(self.skupiny_list))
+        self.skupiny_list.setStyleSheet("QListView { border: none; background-color: transparent; }")
+        self.skupiny_list.clicked.connect(self.otevrit_skupinu)
+        self.skupiny_list.setVisible(False)
+        central_layout.addWidget(self.skupiny_list)
+        
+        # Model/view: Qt kreslí jen viditelné řádky a všechny mají stejnou výšku
+        self.song_model = ModelSkladeb(self.nazev_skladby, self.tabulka_cesta, self, obal=self.obal_radku)
+        song_list = SeznamSkladeb(QFont("Segoe UI", 11))
+        song_list.setModel(self.song_model)
+        song_list.setMouseTracking(True)
+        # Ctrl/Shift označí víc skladeb pro hromadné úpravy, v playlistu jdou přetahovat
+        song_list.setSelectionMode(QAbstractItemView.ExtendedSelection)
+        song_list.setDragDropMode(QAbstractItemView.InternalMove)
+        song_list.setDefaultDropAction(Qt.MoveAction)
+        song_list.setDropIndicatorShown(True)
+        
+        song_list.clicked.connect(self.pustit_vybranou_skladbu)
+        QShortcut(QKeySequence.Delete, song_list, activated=self.odebrat_vybrane,
+                  context=Qt.WidgetShortcut)
         
         song_list.setStyleSheet("""
-            QListWidget {
+            QTableView {
                 border: none;
                 background-color: transparent;
             }
-            QListWidget::item {
-                background-color: rgba(60, 65, 85, 200); 
-                border-radius: 8px; 
-                padding: 10px; 
-                margin-bottom: 8px; 
-            }
-            QListWidget::item:selected {
-                background-color: #0078D7; 
-                color: white;
-            }
-            QListWidget::item:hover {
-                background-color: rgba(80, 85, 105, 220);
-            }
         """)
         
         song_list.setContextMenuPolicy(Qt.CustomContextMenu)
@@ -414,7 +683,7 @@ class ModerniPrehravac(QMainWindow):
         
         progress_layout = QHBoxLayout()
         self.time_label = QLabel("0:00")
-        self.position_slider = QSlider(Qt.Orientation.Horizontal)
+        self.position_slider = PosuvnikVlny()
         self.position_slider.sliderReleased.connect(self.posunout_pozici)
         self.duration_label = QLabel("0:00")
         
@@ -424,12 +693,16 @@ class ModerniPrehravac(QMainWindow):
         
         controls_layout = QHBoxLayout()
         
+        self.obal_label = QLabel()
+        self.obal_label.setFixedSize(VELIKOST_OBALU, VELIKOST_OBALU)
+        self.obal_label.setAlignment(Qt.AlignCenter)
+        self.zobrazit_obal(None)
+
         self.song_info_label = QLabel()
-        if not self.icons["note"].isNull():
-            self.song_info_label.setPixmap(self.icons["note"].pixmap(QSize(20,20)))
         self.song_info_label.setText(" Zvolte skladbu")
         self.song_info_label.setFixedWidth(300)
         
+        controls_layout.addWidget(self.obal_label)
         controls_layout.addWidget(self.song_info_label)
         controls_layout.addStretch()
 
@@ -441,6 +714,7 @@ class ModerniPrehravac(QMainWindow):
             prev_button.setIcon(self.icons["arrow_left"])
             prev_button.setIconSize(icon_size)
             prev_button.setFixedSize(btn_size)
+        prev_button.clicked.connect(self.pustit_predchozi_skladbu)
         controls_layout.addWidget(prev_button)
 
         self.play_button = QPushButton()
@@ -456,10 +730,18 @@ class ModerniPrehravac(QMainWindow):
             next_button.setIcon(self.icons["arrow_right"])
             next_button.setIconSize(icon_size)
             next_button.setFixedSize(btn_size)
+        next_button.clicked.connect(lambda: self.pustit_dalsi_skladbu(rucne=True))
         controls_layout.addWidget(next_button)
 
         controls_layout.addStretch()
 
+        self.shuffle_button = QPushButton("🔀")
+        self.shuffle_button.setCheckable(True)
+        self.shuffle_button.setFixedSize(btn_size)
+        self.shuffle_button.setToolTip("Náhodné pořadí")
+        self.shuffle_button.toggled.connect(self.prepnout_nahodne)
+        controls_layout.addWidget(self.shuffle_button)
+
         self.repeat_button = QPushButton()
         self.repeat_button.setIconSize(icon_size)
         self.repeat_button.setFixedSize(btn_size)
@@ -467,6 +749,12 @@ class ModerniPrehravac(QMainWindow):
         controls_layout.addWidget(self.repeat_button)
         self.aktualizovat_repeat_ikonu()
 
+        self.normalize_button = QPushButton("🎚")
+        self.normalize_button.setFixedSize(btn_size)
+        self.normalize_button.clicked.connect(self.prepnout_normalizaci)
+        controls_layout.addWidget(self.normalize_button)
+        self.aktualizovat_normalizaci_tlacitko()
+
         self.volume_label = QLabel()
         if not self.icons["volume"].isNull():
             self.volume_label.setPixmap(self.icons["volume"].pixmap(QSize(20,20)))
@@ -492,55 +780,391 @@ class ModerniPrehravac(QMainWindow):
         seconds = int(seconds % 60)
         return f"{minutes}:{seconds:02d}"
 
+    def nacist_knihovnu(self, nactena=None):
+        # Známé skladby ukážeme hned z indexu, změny na disku dorazí ze skeneru po dávkách
+        self.jadro.nacist_knihovnu(nactena)
+        self.postavit_hledani()
+
+    def tabulka_cesta(self, skladba):
+        return self.tabulka.cesta(skladba)
+
+    def nacist_chytre(self, nactene=None):
+        self.jadro.nacist_chytre(nactene)
+        self.naplanovat_chytre()
+
+    @mereno("chytré playlisty")
+    def aktualizovat_chytre(self, skladby):
+        # Vyhodnotí se jen změněné skladby, pole playlistů se mění na místě
+        if not self.chytre or not skladby:
+            return
+        self.po_zmene_chytrych(self.jadro.aktualizovat_chytre(skladby))
+
+    def chytre_vyprsely(self):
+        self.po_zmene_chytrych(self.jadro.chytre_vyprsele(time.time()))
+
+    def po_zmene_chytrych(self, zmenene):
+        if any(p.skladby is self.currently_viewing_ids for p in zmenene):
+            self.song_model.obnovit()
+            if self.content_title_label.text():
+                self.filtrovat_skladby(self.content_title_label.text())
+        self.naplanovat_chytre()
+
+    def naplanovat_chytre(self):
+        cas = self.jadro.dalsi_cas_chytrych()
+        if cas is None:
+            self.chytre_timer.stop()
+            return
+        za = int((cas - time.time()) * 1000) + 1
+        self.chytre_timer.start(min(max(za, 0), MAX_CEKANI_CHYTRYCH_MS))
+
+    def zapocitat_prehrani(self, cela_cesta):
+        skladba = self.tabulka.id(cela_cesta)
+        if self.jadro.zapocitat_prehrani(skladba, time.time()):
+            self.aktualizovat_chytre([skladba])
+
+    def postavit_hledani(self):
+        tabulka = self.tabulka
+        skladby = self.playlists["⭐ All Tracks"][:]
+        self.cekajici_hledani = []
+        
+        def stavet():
+            # Tabulku mezitím mění GUI, ale každá změna čeká v cekajici_hledani a dohraje se
+            hledani = VyhledavaciIndex()
+            skupiny = IndexSkupin()
+            for skladba in skladby:
+                hledani.pridat_z_tabulky(tabulka, skladba)
+                skupiny.pridat(tabulka, skladba)
+            self.hledani_postaveno.emit(hledani, skupiny)
+        
+        threading.Thread(target=stavet, daemon=True).start()
+
+    def prevzit_hledani(self, hledani, skupiny):
+        for skladba, pridana in self.cekajici_hledani:
+            if pridana:
+                hledani.pridat_z_tabulky(self.tabulka, skladba)
+                skupiny.pridat(self.tabulka, skladba)
+            else:
+                hledani.odebrat(skladba)
+                skupiny.odebrat(skladba)
+        self.cekajici_hledani = None
+        self.hledani = hledani
+        self.skupiny = skupiny
+        self._pozice_hledani = None
+        if self.prochazeni is not None:
+            self.obnovit_prochazeni()
+        if self.content_title_label.text():
+            self.filtrovat_skladby(self.content_title_label.text())
+
+    def aktualizovat_indexy(self, pridane=(), odebrane=()):
+        # Hledání, skupiny pro procházení i chytré playlisty se mění po skladbách,
+        # nikdy se nestaví znovu
+        self.aktualizovat_chytre([*pridane, *odebrane])
+        if self.prochazeni is not None and not self.prochazeni_timer.isActive():
+            self.prochazeni_timer.start()
+        if self.cekajici_hledani is not None:
+            self.cekajici_hledani.extend((skladba, True) for skladba in pridane)
+            self.cekajici_hledani.extend((skladba, False) for skladba in odebrane)
+            return
+        for skladba in pridane:
+            self.hledani.pridat_z_tabulky(self.tabulka, skladba)
+            self.skupiny.pridat(self.tabulka, skladba)
+        for skladba in odebrane:
+            self.hledani.odebrat(skladba)
+            self.skupiny.odebrat(skladba)
+
     def skenovat_lokalni_hudbu(self, cesta=None):
         if cesta is None:
-            script_dir = Path(__file__).parent.resolve()
-            cesta = script_dir / "MojeHudba" 
-            if not cesta.exists():
-                cesta.mkdir(exist_ok=True)
-                
-        print(f"Skenuji MP3 soubory v: {cesta.resolve()}")
+            koreny = self.index.koreny()
+            if not koreny:
+                cesta = self.jadro.data_dir / "MojeHudba" 
+                if not cesta.exists():
+                    cesta.mkdir(exist_ok=True)
+                koreny = [self.index.pridat_koren(cesta)]
+        else:
+            # Nová složka se ke knihovně přidá, stávající skladby zůstanou
+            koreny = [self.index.pridat_koren(cesta)]
                 
-        self.track_library.clear() 
-        for soubor in cesta.glob("*.mp3"):
-            path_str = str(soubor.resolve())
-            self.track_library[path_str] = soubor.name 
-            
-        self.playlists["⭐ All Tracks"] = list(self.track_library.keys())
+        print(f"Skenuji hudbu v: {', '.join(koreny)}")
+        self.naplanovat_sken([(koren, True) for koren in koreny])
+
+    def naplanovat_sken(self, cile):
+        self.cekajici_sken.extend(cile)
+        if self.skener is None:
+            self.spustit_cekajici_sken()
+
+    def spustit_cekajici_sken(self):
+        if not self.cekajici_sken:
+            return
+        
+        cile = list(dict.fromkeys(self.cekajici_sken))
+        self.cekajici_sken = []
+        
+        self.skener = SkenerKnihovny(self.index.db_path, cile, self.sledovane_slozky)
+        self.skener.davka_skladeb.connect(self.pridat_davku_skladeb)
+        self.skener.odebrane_skladby.connect(self.odebrat_skladby_z_knihovny)
+        self.skener.prosle_slozky.connect(self.sledovat_slozky)
+        self.skener.prubeh.connect(self.zobrazit_prubeh_skenu)
+        self.skener.hotovo.connect(self.sken_dokoncen)
+        self.scan_button.setText("Zrušit sken")
+        self.skener.start()
+
+    def zrusit_sken(self):
+        self.cekajici_sken = []
+        if self.skener is not None and self.skener.bezi():
+            self.skener.zrusit()
+            self.skener.pockat()
+            self.statusBar().showMessage("Sken zrušen", 3000)
+        self.skener = None
+        self.scan_button.setText("Skenovat složku")
+
+    def sledovat_slozky(self, slozky):
+        if self.sender() is not self.skener:
+            return
+        nove = [s for s in slozky if s not in self.sledovane_slozky]
+        if nove:
+            self.watcher.addPaths(nove)
+            self.sledovane_slozky.update(nove)
+
+    def slozka_zmenena(self, slozka):
+        if not os.path.isdir(slozka):
+            # Smazanou složku watcher sám zahodí, musíme ji zapomenout i my
+            self.sledovane_slozky.discard(slozka)
+        self.zmenene_slozky.add(slozka)
+        self.watch_timer.start()
+
+    def zpracovat_zmeny_slozek(self):
+        cile = [(slozka, False) for slozka in sorted(self.zmenene_slozky)]
+        self.zmenene_slozky.clear()
+        self.naplanovat_sken(cile)
+
+    @mereno("dávka skenu do seznamu")
+    def pridat_davku_skladeb(self, skladby):
+        # Ignorujeme opožděné signály ze zrušeného skeneru
+        if self.sender() is not self.skener:
+            return
+        vsechny = self.playlists["⭐ All Tracks"]
+        nove = self.jadro.pridat_skladby(skladby)
+        self.aktualizovat_indexy(pridane=[skladba.id for skladba in skladby])
+        
+        if not nove:
+            return
+        
+        # Pokud se právě díváme na All Tracks, jen připojíme nové řádky
+        if self.currently_viewing_ids is vsechny:
+            self.song_model.pripojeno(len(nove))
+            if self.content_title_label.text():
+                self.filtrovat_skladby(self.content_title_label.text())
+
+    def odebrat_skladby_z_knihovny(self, cesty):
+        if self.sender() is not self.skener:
+            return
+        odebrane = self.jadro.odebrat_cesty(cesty)
+        self.aktualizovat_indexy(odebrane=odebrane)
+        
+        if self.currently_viewing_ids is self.playlists["⭐ All Tracks"]:
+            self.song_model.obnovit()
+            if self.content_title_label.text():
+                self.filtrovat_skladby(self.content_title_label.text())
+
+    def zobrazit_prubeh_skenu(self, hotovo, celkem):
+        if self.sender() is not self.skener:
+            return
+        if celkem:
+            self.statusBar().showMessage(f"Skenuji knihovnu: {hotovo}/{celkem}")
+
+    def sken_dokoncen(self, pridano, zmeneno, odebrano):
+        if self.sender() is not self.skener:
+            return
+        print(f"Sken hotov: {len(self.tabulka)} skladeb (+{pridano} ~{zmeneno} -{odebrano})")
+        self.statusBar().showMessage(f"Sken hotov: {len(self.tabulka)} skladeb", 5000)
+        # Vlákno po signálu hned končí, počkáme na něj, ať se QThread neruší za běhu
+        self.skener.pockat()
+        self.skener = None
+        self.scan_button.setText("Skenovat složku")
+        self.spustit_cekajici_sken()
+        if self.skener is None:
+            self.spustit_kontrolu()
+            self.spustit_analyzu()
+
+    def spustit_analyzu(self):
+        # Měří se jen skladby bez hlasitosti v indexu; běžící analýza se po doběhnutí zopakuje
+        if self.analyza is not None:
+            self.analyzovat_znovu = True
+            return
+        self.analyzovat_znovu = False
+        self.analyza = AnalyzaHlasitosti(self.index.db_path)
+        self.analyza.vysledky.connect(self.prevzit_hlasitost)
+        self.analyza.hotovo.connect(self.analyza_dokoncena)
+        self.analyza.start()
+
+    def zrusit_analyzu(self):
+        self.analyzovat_znovu = False
+        if self.analyza is not None and self.analyza.bezi():
+            self.analyza.zrusit()
+            self.analyza.pockat()
+        self.analyza = None
+
+    def prevzit_hlasitost(self, vysledky):
+        if self.sender() is not self.analyza:
+            return
+        for path_str, hlasitost, spicka in vysledky:
+            skladba = self.tabulka.id(path_str)
+            if skladba is not None:
+                self.tabulka.nastavit_hlasitost(skladba, hlasitost, spicka)
+        self._hlasitost_alb = None
+        if any(path_str == self.current_track for path_str, _, _ in vysledky):
+            self.aplikovat_hlasitost()
+
+    def analyza_dokoncena(self, zmereno):
+        if self.sender() is not self.analyza:
+            return
+        if zmereno:
+            print(f"Analýza hlasitosti hotova: {zmereno} skladeb")
+        self.analyza.pockat()
+        self.analyza = None
+        if self.analyzovat_znovu:
+            self.spustit_analyzu()
+
+    def spustit_kontrolu(self):
+        # Dohledání přesunutých skladeb z playlistů; běžící kontrola se po doběhnutí zopakuje
+        if self.kontrola is not None:
+            self.kontrolovat_znovu = True
+            return
+        self.kontrolovat_znovu = False
+        self.kontrola = KontrolaKnihovny(self.index.db_path)
+        self.kontrola.premapovano.connect(self.prevzit_premapovani)
+        self.kontrola.hotovo.connect(self.kontrola_dokoncena)
+        self.kontrola.start()
+
+    def zrusit_kontrolu(self):
+        self.kontrolovat_znovu = False
+        if self.kontrola is not None and self.kontrola.bezi():
+            self.kontrola.zrusit()
+            self.kontrola.pockat()
+        self.kontrola = None
+
+    def prevzit_premapovani(self, mapa):
+        if self.sender() is not self.kontrola:
+            return
+        # Index už je přesměrovaný; uložení přepíše i změny, které mezitím čekaly
+        for nazev in self.jadro.premapovat(mapa):
+            self.naplanovat_ulozeni(nazev)
+        self.aktualizovat_chytre(list(mapa.values()))
+        self._pozice_hledani = None
+        self.song_model.obnovit()
+        if self.content_title_label.text():
+            self.filtrovat_skladby(self.content_title_label.text())
+
+    def kontrola_dokoncena(self, premapovano, chybi):
+        if self.sender() is not self.kontrola:
+            return
+        if premapovano:
+            print(f"Znovu nalezeno {premapovano} přesunutých skladeb")
+            self.statusBar().showMessage(f"Znovu nalezeno {premapovano} přesunutých skladeb", 5000)
+        if chybi:
+            print(f"Skladby z playlistů, které se nepodařilo najít: {chybi}")
+        self.kontrola.pockat()
+        self.kontrola = None
+        if self.kontrolovat_znovu:
+            self.spustit_kontrolu()
+
+    def najit_duplicity(self):
+        # Otisky se počítají jen pro skladby, které ho ještě nemají; druhé kliknutí hledání zruší
+        if self.duplicity is not None:
+            self.zrusit_duplicity()
+            return
+        self.duplicity = HledacDuplicit(self.index.db_path)
+        self.duplicity.prubeh.connect(self.zobrazit_prubeh_duplicit)
+        self.duplicity.hotovo.connect(self.duplicity_nalezeny)
+        self.duplicity_button.setText("Zrušit hledání")
+        self.statusBar().showMessage("Hledám duplicity...")
+        self.duplicity.start()
+
+    def zrusit_duplicity(self):
+        if self.duplicity is not None and self.duplicity.bezi():
+            self.duplicity.zrusit()
+            self.duplicity.pockat()
+            self.statusBar().showMessage("Hledání duplicit zrušeno", 3000)
+        self.duplicity = None
+        self.duplicity_button.setText("Duplicity")
+
+    def zobrazit_prubeh_duplicit(self, hotovo, celkem):
+        if self.sender() is not self.duplicity:
+            return
+        self.statusBar().showMessage(f"Zvukové otisky: {hotovo}/{celkem}")
+
+    def duplicity_nalezeny(self, skupiny):
+        if self.sender() is not self.duplicity:
+            return
+        self.duplicity.pockat()
+        self.duplicity = None
+        self.duplicity_button.setText("Duplicity")
+        if skupiny is None:
+            return
+        self.statusBar().showMessage(f"Skupin duplicit: {len(skupiny)}", 5000)
+        if not skupiny:
+            QMessageBox.information(self, "Duplicity", "Žádné duplicitní skladby nebyly nalezeny.")
+            return
+        # Kolikrát je která kopie v obyčejných playlistech; podle toho se i rozhoduje
+        hledane = {skladba for skladby, _ in skupiny for skladba in skladby}
+        v_playlistech = {}
+        for nazev, skladby in self.playlists.items():
+            if nazev == "⭐ All Tracks" or nazev in self.chytre:
+                continue
+            for skladba in skladby:
+                if skladba in hledane:
+                    v_playlistech[skladba] = v_playlistech.get(skladba, 0) + 1
+        DialogDuplicit(
+            skupiny, self.tabulka, v_playlistech, self.sloucit_duplicity,
+            self.jadro.index.ignorovat_duplicity, self,
+        ).exec()
+
+    def sloucit_duplicity(self, ponechana, ostatni, smazat):
+        zmenene, odebrane = self.jadro.sloucit_duplicity(ponechana, ostatni, smazat)
+        for nazev in zmenene:
+            self.naplanovat_ulozeni(nazev)
+        self.aktualizovat_chytre([ponechana, *ostatni])
+        if odebrane:
+            self.aktualizovat_indexy(odebrane=odebrane)
+        self._pozice_hledani = None
+        self.song_model.obnovit()
+        if self.content_title_label.text():
+            self.filtrovat_skladby(self.content_title_label.text())
 
     def vybrat_slozku_pro_skenovani(self):
+        if self.skener is not None:
+            self.zrusit_sken()
+            return
+        
         cesta = QFileDialog.getExistingDirectory(self, "Vyberte složku s hudbou")
         if cesta:
             self.skenovat_lokalni_hudbu(Path(cesta))
             self.aktualizovat_playlist_list()
             # Po skenování zůstaneme v režimu playlistů
             self.prepnout_sidebar_mode("PLAYLISTS")
-            self.zobrazit_playlist(self.playlist_list_widget.item(0))
+            self.zobrazit_playlist()
 
-    def load_playlists_from_file(self):
-        if self.playlists_file.exists():
-            try:
-                with open(self.playlists_file, 'r', encoding='utf-8') as f:
-                    self.playlists = json.load(f)
-            except json.JSONDecodeError:
-                print("Chyba při čtení playlists.json, vytvářím nový.")
-                self.playlists = {}
-        
-        if "⭐ All Tracks" not in self.playlists:
-            self.playlists["⭐ All Tracks"] = []
+    def load_playlists_from_file(self, nactene=None):
+        self.jadro.nacist_playlisty(nactene)
             
-    def save_playlists_to_file(self):
-        with open(self.playlists_file, 'w', encoding='utf-8') as f:
-            json.dump(self.playlists, f, indent=4)
+    def naplanovat_ulozeni(self, nazev):
+        self.zmenene_playlisty.add(nazev)
+        self.save_timer.start()
+
+    @mereno("uložení playlistů")
+    def ulozit_zmenene_playlisty(self):
+        if not self.zmenene_playlisty:
+            return
+        self.save_timer.stop()
+        self.jadro.ulozit(self.zmenene_playlisty)
+        self.zmenene_playlisty = set()
             
     def aktualizovat_playlist_list(self):
-        self.playlist_list_widget.clear()
-        self.playlist_list_widget.addItem("⭐ All Tracks")
-        for name in self.playlists.keys():
-            if name != "⭐ All Tracks":
-                self.playlist_list_widget.addItem(name)
+        nazvy = ["⭐ All Tracks"]
+        nazvy.extend(name for name in self.playlists.keys() if name != "⭐ All Tracks")
+        self.playlist_model.nastavit(nazvy, self.chytre)
         
-        self.playlist_list_widget.setCurrentRow(0)
+        self.playlist_list_widget.setCurrentIndex(self.playlist_model.index(0))
 
     def vytvorit_novy_playlist(self):
         text, ok = QInputDialog.getText(self, "Nový Playlist", "Zadejte název playlistu:")
@@ -548,18 +1172,136 @@ class ModerniPrehravac(QMainWindow):
             if text in self.playlists:
                 QMessageBox.warning(self, "Chyba", "Playlist s tímto názvem již existuje.")
             else:
-                self.playlists[text] = [] 
+                self.playlists[text] = array("i")
                 self.aktualizovat_playlist_list()
-                self.save_playlists_to_file()
+                self.naplanovat_ulozeni(text)
                 print(f"Vytvořen playlist: {text}")
 
+    def importovat_playlist(self):
+        cesta, _ = QFileDialog.getOpenFileName(
+            self, "Importovat playlist", "", "Playlisty (*.m3u *.m3u8 *.pls);;Všechny soubory (*)"
+        )
+        if not cesta:
+            return
+        zaklad = nazev = Path(cesta).stem or "Import"
+        cislo = 2
+        while nazev in self.playlists or nazev in self.importovane:
+            nazev = f"{zaklad} ({cislo})"
+            cislo += 1
+        self.importovane.add(nazev)
+        self.statusBar().showMessage(f"Importuji playlist '{nazev}'...")
+        db_path = self.index.db_path
+
+        def importovat():
+            # Vlastní spojení do indexu; playlist se uloží tady, GUI ho jen převezme
+            index = IndexKnihovny(db_path)
+            try:
+                skladby, prirazeni, preskoceno = prenos.importovat(
+                    index, cesta, lambda pocet: self.prubeh_importu.emit(nazev, pocet), self.zrusit_prenos
+                )
+                if skladby is None:
+                    return
+                UlozistePlaylistu(index).ulozit_novy(nazev, skladby)
+                self.playlist_importovan.emit({
+                    "nazev": nazev, "skladby": skladby, "mimo": prirazeni.mimo,
+                    "presne": prirazeni.presne, "podle_konce": prirazeni.podle_konce,
+                    "chybi": prirazeni.chybi, "preskoceno": preskoceno,
+                })
+            except (OSError, sqlite3.Error) as e:
+                self.playlist_importovan.emit({"nazev": nazev, "chyba": e})
+            finally:
+                index.zavrit()
+
+        threading.Thread(target=importovat, name="import playlistu", daemon=True).start()
+
+    def prevzit_import(self, vysledek):
+        nazev = vysledek["nazev"]
+        self.importovane.discard(nazev)
+        if "chyba" in vysledek:
+            self.statusBar().clearMessage()
+            QMessageBox.warning(self, "Chyba", f"Playlist se nepodařilo importovat:\n{vysledek['chyba']}")
+            return
+        # Skladby mimo knihovnu potřebuje tabulka aspoň kvůli jménu
+        for skladba, cesta in vysledek["mimo"]:
+            if skladba >= len(self.tabulka.slozka) or self.tabulka.slozka[skladba] == -1:
+                self.tabulka.nastavit(skladba, cesta, pritomna=False)
+        self.playlists[nazev] = vysledek["skladby"]
+        self.aktualizovat_playlist_list()
+        zprava = (f"Importován playlist '{nazev}': {len(vysledek['skladby'])} skladeb, "
+                  f"{vysledek['podle_konce']} dohledáno podle jména, {vysledek['chybi']} chybí")
+        if vysledek["preskoceno"]:
+            zprava += f", {vysledek['preskoceno']} přeskočeno (nejsou soubory)"
+        print(zprava)
+        self.statusBar().showMessage(zprava, 8000)
+        if vysledek["chybi"]:
+            self.spustit_kontrolu()
+
+    def exportovat_playlist(self):
+        nazev = self.playlist_model.nazev(self.playlist_list_widget.currentIndex().row())
+        if not nazev or nazev not in self.playlists:
+            QMessageBox.warning(self, "Chyba", "Musíte vybrat playlist k exportu.")
+            return
+        jmeno = nazev.replace("⭐", "").strip() or "playlist"
+        cesta, _ = QFileDialog.getSaveFileName(
+            self, "Exportovat playlist", str(Path.home() / f"{jmeno}.m3u8"),
+            "M3U8 (*.m3u8);;M3U (*.m3u);;PLS (*.pls)"
+        )
+        if not cesta:
+            return
+        if not cesta.lower().endswith(prenos.PRIPONY):
+            cesta += ".m3u8"
+        skladby = self.playlists[nazev][:]
+        tabulka = self.tabulka
+
+        def exportovat():
+            # Tabulku mezitím může měnit GUI, ale řádky exportovaných skladeb zůstávají
+            try:
+                pocet = prenos.exportovat(cesta, prenos.polozky_tabulky(tabulka, skladby))
+                self.playlist_exportovan.emit({"cesta": cesta, "pocet": pocet})
+            except OSError as e:
+                self.playlist_exportovan.emit({"cesta": cesta, "chyba": e})
+
+        self.statusBar().showMessage(f"Exportuji '{nazev}'...")
+        threading.Thread(target=exportovat, name="export playlistu", daemon=True).start()
+
+    def export_dokoncen(self, vysledek):
+        if "chyba" in vysledek:
+            self.statusBar().clearMessage()
+            QMessageBox.warning(self, "Chyba", f"Playlist se nepodařilo uložit:\n{vysledek['chyba']}")
+            return
+        self.statusBar().showMessage(f"Uloženo {vysledek['pocet']} skladeb do {vysledek['cesta']}", 5000)
+
+    def upravit_chytry_playlist(self, nazev=None):
+        # Nový chytrý playlist, nebo úprava pravidel existujícího
+        puvodni = self.chytre.get(nazev)
+        dialog = DialogChytrehoPlaylistu(nazev or "", puvodni.pravidla if puvodni else None, self)
+        if dialog.exec() != QDialog.Accepted:
+            return
+        novy_nazev = dialog.nazev.text().strip()
+        if novy_nazev != nazev and novy_nazev in self.playlists:
+            QMessageBox.warning(self, "Chyba", "Playlist s tímto názvem již existuje.")
+            return
+        playlist = self.jadro.ulozit_chytry(novy_nazev, dialog.pravidla(), nazev)
+        self.aktualizovat_playlist_list()
+        self.naplanovat_chytre()
+        self.zobrazit_playlist(self.playlist_model.index(self.playlist_model.nazvy.index(novy_nazev)))
+        print(f"Chytrý playlist '{novy_nazev}': {len(playlist.skladby)} skladeb")
+
+    def zobrazit_menu_playlistu(self, pos):
+        nazev = self.playlist_model.nazev(self.playlist_list_widget.indexAt(pos).row())
+        if nazev not in self.chytre:
+            return
+        menu = QMenu()
+        menu.addAction("Upravit pravidla...").triggered.connect(
+            lambda checked=False: self.upravit_chytry_playlist(nazev))
+        menu.exec(self.playlist_list_widget.mapToGlobal(pos))
+
     def smazat_playlist(self):
-        current_item = self.playlist_list_widget.currentItem()
-        if not current_item:
+        nazev = self.playlist_model.nazev(self.playlist_list_widget.currentIndex().row())
+        if not nazev:
             QMessageBox.warning(self, "Chyba", "Musíte vybrat playlist ke smazání.")
             return
 
-        nazev = current_item.text()
         if nazev == "⭐ All Tracks":
             QMessageBox.warning(self, "Chyba", "Nelze smazat 'All Tracks'.")
             return
@@ -568,25 +1310,32 @@ class ModerniPrehravac(QMainWindow):
                                      QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
         
         if reply == QMessageBox.Yes:
-            del self.playlists[nazev]
+            if self.jadro.smazat_playlist(nazev):
+                self.naplanovat_chytre()
+            else:
+                self.naplanovat_ulozeni(nazev)
             self.aktualizovat_playlist_list()
-            self.save_playlists_to_file()
-            self.zobrazit_playlist(self.playlist_list_widget.item(0))
+            self.zobrazit_playlist()
             print(f"Smazán playlist: {nazev}")
 
-    def zobrazit_playlist(self, item):
-        if not item: 
-            if self.playlist_list_widget.count() > 0:
-                self.playlist_list_widget.setCurrentRow(0)
-                item = self.playlist_list_widget.item(0)
+    def nazev_skladby(self, skladba):
+        return self.tabulka.nazev(skladba)
+
+    @mereno("přepnutí playlistu")
+    def zobrazit_playlist(self, index=None):
+        if index is None or not index.isValid(): 
+            if self.playlist_model.rowCount() > 0:
+                index = self.playlist_model.index(0)
+                self.playlist_list_widget.setCurrentIndex(index)
             else:
                 self.content_title_label.setPlaceholderText("Vyhledat v knihovně")
                 self.content_title_label.setText("") 
-                self.song_list_widget.clear()
-                self.currently_viewing_paths = []
+                self.currently_viewing_ids = []
+                self.nastavit_upravovany(None)
+                self.song_model.nastavit(self.currently_viewing_ids)
                 return
 
-        nazev = item.text()
+        nazev = self.playlist_model.nazev(index.row())
         
         self.content_title_label.setText("")
         
@@ -595,55 +1344,274 @@ class ModerniPrehravac(QMainWindow):
         else:
             self.content_title_label.setPlaceholderText(f"Vyhledat v playlistu: {nazev}")
             
-        self.song_list_widget.clear()
-        
         if nazev in self.playlists:
-            self.currently_viewing_paths = self.playlists[nazev]
-            
-            for path_str in self.currently_viewing_paths:
-                filename = self.track_library.get(path_str, Path(path_str).name)
-                self.song_list_widget.addItem(filename)
+            self.currently_viewing_ids = self.playlists[nazev]
         else:
-            self.currently_viewing_paths = []
+            self.currently_viewing_ids = array("i")
+        upravovat = nazev in self.playlists and nazev != "⭐ All Tracks" and nazev not in self.chytre
+        self.nastavit_upravovany(nazev if upravovat else None)
+        
+        # Model si jen podrží odkaz na seznam, nic se nekopíruje ani nevytváří
+        self.song_model.nastavit(self.currently_viewing_ids)
+
+    def nastavit_upravovany(self, nazev):
+        self.upravovany_playlist = nazev
+        self.song_model.presun = self.presunout_vybrane if nazev is not None else None
             
+    @mereno("otevření procházení")
+    def otevrit_prochazeni(self, cesta):
+        self.prochazeni = cesta
+        self.content_title_label.blockSignals(True)
+        self.content_title_label.setText("")
+        self.content_title_label.blockSignals(False)
+        self.prochazeni_bar.setVisible(True)
+        self.prochazeni_label.setText(" › ".join(self.popisek_cesty(cesta)))
+
+        skladby = self.skladby_prochazeni(cesta)
+        if skladby is None:
+            self.skupiny_model.nastavit(*self.polozky_prochazeni(cesta))
+            self.skupiny_list.setVisible(True)
+            self.song_list_widget.setVisible(False)
+            self.content_title_label.setPlaceholderText(f"Vyhledat: {self.popisek_cesty(cesta)[-1]}")
+            return
+
+        self.skupiny_list.setVisible(False)
+        self.song_list_widget.setVisible(True)
+        self.content_title_label.setPlaceholderText(f"Vyhledat v: {self.popisek_cesty(cesta)[-1]}")
+        self.currently_viewing_ids = skladby
+        self.nastavit_upravovany(None)
+        self.song_model.nastavit(self.currently_viewing_ids)
+
+    def zavrit_prochazeni(self):
+        if self.prochazeni is None:
+            return
+        self.prochazeni = None
+        self.prochazeni_bar.setVisible(False)
+        self.skupiny_list.setVisible(False)
+        self.song_list_widget.setVisible(True)
+        self.zobrazit_playlist(self.playlist_list_widget.currentIndex())
+
+    def prochazeni_zpet(self):
+        if self.prochazeni is None:
+            return
+        if len(self.prochazeni) > 1:
+            self.otevrit_prochazeni(self.prochazeni[:-1])
+        else:
+            self.prepnout_sidebar_mode("HOME")
+
+    def otevrit_skupinu(self, index):
+        klic = self.skupiny_model.klic(index.row())
+        if klic is not None and self.prochazeni is not None:
+            self.otevrit_prochazeni(self.prochazeni + [klic])
+
+    def popisek_cesty(self, cesta):
+        popisky = ["Interpreti" if cesta[0] == "ARTISTS" else "Žánry"]
+        for klic in cesta[1:]:
+            if isinstance(klic, tuple):
+                popisky.append(klic[1] or NEZNAME_ALBUM)
+            elif cesta[0] == "ARTISTS":
+                popisky.append(klic or NEZNAMY_INTERPRET)
+            else:
+                popisky.append(klic or BEZ_ZANRU)
+        return popisky
+
+    def polozky_prochazeni(self, cesta):
+        """(klíče, popisek) pro úroveň procházení, která ukazuje skupiny."""
+        skupiny = self.skupiny
+        if cesta == ["ARTISTS"]:
+            return skupiny.interpreti.serazene(), lambda klic: (
+                f"{klic or NEZNAMY_INTERPRET}  ({skupiny.interpreti.pocet(klic)})")
+        if cesta == ["CATEGORIES"]:
+            return skupiny.zanry.serazene(), lambda klic: f"{klic or BEZ_ZANRU}  ({skupiny.zanry.pocet(klic)})"
+        # Alba interpreta; první řádek (klíč je samotný interpret) jsou všechny jeho skladby
+        interpret = cesta[1]
+
+        def popisek(klic):
+            if isinstance(klic, tuple):
+                return f"{klic[1] or NEZNAME_ALBUM}  ({skupiny.alba.pocet(klic)})"
+            return f"Všechny skladby  ({skupiny.interpreti.pocet(klic)})"
+        return [interpret] + skupiny.alba_interpreta(interpret), popisek
+
+    def skladby_prochazeni(self, cesta):
+        """Pole skladeb pro koncovou úroveň procházení, None u úrovně se skupinami."""
+        if cesta[0] == "CATEGORIES" and len(cesta) == 2:
+            return self.skupiny.skladby_serazene(self.tabulka, self.skupiny.zanry.skladby(cesta[1]))
+        if cesta[0] == "ARTISTS" and len(cesta) == 3:
+            klic = cesta[2]
+            if isinstance(klic, tuple):
+                return self.skupiny.skladby_serazene(self.tabulka, self.skupiny.alba.skladby(klic))
+            return self.skupiny.skladby_serazene(self.tabulka, self.skupiny.interpreti.skladby(klic))
+        return None
+
+    def obnovit_prochazeni(self):
+        # Seznam skladeb se během skenu nepřestavuje, jen počty a skupiny nad ním
+        if self.prochazeni is None or self.skupiny_list.isHidden():
+            return
+        klice, popisek = self.polozky_prochazeni(self.prochazeni)
+        if klice is self.skupiny_model.klice:
+            self.skupiny_list.viewport().update()
+            return
+        posun = self.skupiny_list.verticalScrollBar().value()
+        self.skupiny_model.nastavit(klice, popisek)
+        if self.content_title_label.text():
+            self.skupiny_model.filtrovat(self.content_title_label.text())
+        self.skupiny_list.verticalScrollBar().setValue(posun)
+
+    def pripravit_hledani(self):
+        # Jednou na zobrazený playlist, ne na znak; mapu pozic postaví až úzký dotaz
+        skladby = self.currently_viewing_ids
+        klic = (id(skladby), len(skladby))
+        if self._pozice_hledani is None or self._pozice_hledani[0] != klic:
+            # Skladby mimo knihovnu jdou najít aspoň podle jména souboru
+            for skladba in self.hledani.chybejici(skladby):
+                self.hledani.pridat(skladba, self.tabulka.nazev(skladba))
+            self._pozice_hledani = (klic, None)
+        return klic
+
+    def pozice_v_zobrazenem(self):
+        klic = self.pripravit_hledani()
+        if self._pozice_hledani[1] is None:
+            self._pozice_hledani = (klic, mapa_pozic(self.currently_viewing_ids))
+        return self._pozice_hledani[1]
+
+    @mereno("filtr")
     def filtrovat_skladby(self, text):
-        text = text.lower()
-        for i in range(self.song_list_widget.count()):
-            item = self.song_list_widget.item(i)
-            item.setHidden(text not in item.text().lower())
+        if not self.skupiny_list.isHidden():
+            self.skupiny_model.filtrovat(text)
+            return
+        if not text.strip():
+            self.song_model.filtrovat(None)
+            return
+        
+        if self.cekajici_hledani is not None:
+            # Index se ještě staví, do té doby stačí prosté hledání v názvech
+            text = text.lower()
+            self.song_model.filtrovat(
+                i for i, skladba in enumerate(self.currently_viewing_ids)
+                if text in self.nazev_skladby(skladba).lower()
+            )
+            return
+        
+        self.pripravit_hledani()
+        urovne = self.hledani.hledat(text)
+        if urovne is None:
+            self.song_model.filtrovat(None)
+            return
+        
+        # Nejdřív přesné shody, pak začátky slov, nakonec překlepy; uvnitř v pořadí playlistu.
+        # Řádky se čtou až podle rolování, znak hledání tak nestojí O(počet výsledků)
+        self.song_model.filtrovat(
+            pozice_vysledku(urovne, self.currently_viewing_ids, self.pozice_v_zobrazenem)
+        )
+
+    def vybrana_pozice(self):
+        return self.song_model.pozice(self.song_list_widget.currentIndex().row())
+
+    def vybrane_pozice(self):
+        """Pozice označených řádků v zobrazeném playlistu, vzestupně."""
+        radky = self.song_list_widget.selectionModel().selectedRows()
+        return sorted({self.song_model.pozice(index.row()) for index in radky} - {-1})
 
     def zobrazit_menu_pro_pridani(self, pos):
-        item = self.song_list_widget.itemAt(pos)
-        if not item:
+        if not self.song_list_widget.indexAt(pos).isValid():
             return 
 
         menu = QMenu()
-        add_to_playlist_menu = menu.addMenu("Přidat do playlistu...")
+        pozice = self.vybrane_pozice() or [self.vybrana_pozice()]
+        skladby = [self.currently_viewing_ids[p] for p in pozice if p != -1]
+        if not skladby:
+            return
+        # Do fronty jdou v pořadí playlistu, "jako další" se proto vkládají odzadu
+        menu.addAction("Přehrát jako další").triggered.connect(
+            lambda checked=False: self.upravit_frontu(self.fronta.prehrat_jako_dalsi, reversed(skladby)))
+        menu.addAction("Přidat do fronty").triggered.connect(
+            lambda checked=False: self.upravit_frontu(self.fronta.pridat_do_fronty, skladby))
+        pocet = f" ({len(skladby)})" if len(skladby) > 1 else ""
+        add_to_playlist_menu = menu.addMenu(f"Přidat do playlistu{pocet}...")
 
         for playlist_name in self.playlists.keys():
-            if playlist_name == "⭐ All Tracks":
+            # Do chytrých playlistů se skladby dostávají jen podle pravidel
+            if playlist_name == "⭐ All Tracks" or playlist_name in self.chytre:
                 continue
             
             action = add_to_playlist_menu.addAction(playlist_name)
-            action.triggered.connect(lambda checked=False, p=playlist_name: self.pridat_skladbu_do_playlistu(p))
+            action.triggered.connect(
+                lambda checked=False, p=playlist_name: self.pridat_do_playlistu(p, skladby))
+
+        if self.upravovany_playlist is not None:
+            menu.addSeparator()
+            menu.addAction(f"Odebrat z playlistu{pocet}").triggered.connect(self.odebrat_vybrane)
+            menu.addAction("Odstranit duplicity").triggered.connect(self.odstranit_duplicity)
             
         menu.exec(self.song_list_widget.mapToGlobal(pos))
 
-    def pridat_skladbu_do_playlistu(self, playlist_name):
-        selected_row = self.song_list_widget.currentRow()
-        if selected_row == -1:
+    @mereno("úprava playlistu")
+    def pridat_do_playlistu(self, nazev, skladby):
+        # Duplicity hlídá index členství, celá dávka se uloží jednou
+        pridano = self.upravy.pridat(nazev, skladby)
+        if pridano:
+            self.po_uprave_playlistu(nazev)
+        self.statusBar().showMessage(f"Do '{nazev}' přidáno {pridano} skladeb", 3000)
+
+    @mereno("úprava playlistu")
+    def odebrat_vybrane(self):
+        nazev = self.upravovany_playlist
+        pozice = self.vybrane_pozice()
+        if nazev is None or not pozice:
             return
-
-        if selected_row >= len(self.currently_viewing_paths):
-            print("Chyba: Index mimo rozsah při přidávání do playlistu.")
+        prvni = self.song_list_widget.currentIndex().row()
+        odebrano = self.upravy.odebrat(nazev, pozice)
+        if odebrano:
+            self.po_uprave_playlistu(nazev)
+            self.song_list_widget.setCurrentIndex(self.song_model.index(min(prvni, self.song_model.rowCount() - 1)))
+            self.statusBar().showMessage(f"Z '{nazev}' odebráno {odebrano} skladeb (Ctrl+Z vrátí)", 3000)
+
+    @mereno("úprava playlistu")
+    def odstranit_duplicity(self):
+        nazev = self.upravovany_playlist
+        if nazev is None:
             return
-
-        path_to_add = self.currently_viewing_paths[selected_row]
-        
-        if path_to_add not in self.playlists[playlist_name]:
-            self.playlists[playlist_name].append(path_to_add)
-            self.save_playlists_to_file()
-            print(f"Skladba přidána do '{playlist_name}'.")
+        odebrano = self.upravy.odstranit_duplicity(nazev)
+        if odebrano:
+            self.po_uprave_playlistu(nazev)
+        self.statusBar().showMessage(f"Odstraněno duplicit: {odebrano}", 3000)
+
+    @mereno("přesun v playlistu")
+    def presunout_vybrane(self, pozice, cil):
+        # Volá model po přetažení; pozice jsou v nefiltrovaném playlistu, takže i cíl
+        nazev = self.upravovany_playlist
+        if nazev is None:
+            return
+        zacatek = self.upravy.presunout(nazev, pozice, cil)
+        if zacatek is None:
+            return
+        self.po_uprave_playlistu(nazev)
+        # Přesunuté skladby zůstanou označené, jsou teď v jednom souvislém bloku
+        vyber = QItemSelection(self.song_model.index(zacatek), self.song_model.index(zacatek + len(pozice) - 1))
+        self.song_list_widget.selectionModel().select(vyber, QItemSelectionModel.ClearAndSelect)
+        self.song_list_widget.setCurrentIndex(self.song_model.index(zacatek))
+
+    def vratit_upravu(self):
+        nazev = self.upravy.vratit()
+        if nazev is not None:
+            self.po_uprave_playlistu(nazev)
+            self.statusBar().showMessage(f"Vrácena úprava playlistu '{nazev}'", 3000)
+
+    def zopakovat_upravu(self):
+        nazev = self.upravy.znovu()
+        if nazev is not None:
+            self.po_uprave_playlistu(nazev)
+            self.statusBar().showMessage(f"Znovu provedena úprava playlistu '{nazev}'", 3000)
+
+    def po_uprave_playlistu(self, nazev):
+        self.naplanovat_ulozeni(nazev)
+        if self.playlists.get(nazev) is not self.currently_viewing_ids:
+            return
+        # Pořadí se mohlo změnit i při stejné délce, mapa pozic pro hledání už neplatí
+        self._pozice_hledani = None
+        self.song_model.obnovit()
+        if self.content_title_label.text():
+            self.filtrovat_skladby(self.content_title_label.text())
             
     def aktualizovat_repeat_ikonu(self):
         if self.repeat_mode == 0:
@@ -659,160 +1627,526 @@ class ModerniPrehravac(QMainWindow):
     def prepnout_repeat_mode(self):
         self.repeat_mode = (self.repeat_mode + 1) % 3
         self.aktualizovat_repeat_ikonu()
+        self.pripravit_dalsi_skladbu()
         print(f"Režim opakování přepnut na: {self.repeat_mode}")
 
-    def pustit_dalsi_skladbu(self):
-        if self.current_track is None or not self.currently_viewing_paths:
+    def prepnout_nahodne(self, zapnuto):
+        self.fronta.nastavit_nahodne(zapnuto)
+        self.pripravit_dalsi_skladbu()
+
+    def upravit_frontu(self, akce, skladby):
+        for skladba in skladby:
+            akce(skladba)
+        self.pripravit_dalsi_skladbu()
+
+    def pustit_dalsi_skladbu(self, rucne=False):
+        if self.fronta.skladba is None:
             return
 
-        try:
-            current_index = self.currently_viewing_paths.index(self.current_track)
-        except ValueError:
-            current_index = -1
-        
-        if self.repeat_mode == 2: 
-            next_index = current_index
-        elif self.repeat_mode == 1: 
-            next_index = (current_index + 1) % len(self.currently_viewing_paths)
-        else: 
-            next_index = current_index + 1
-            if next_index >= len(self.currently_viewing_paths):
-                pygame.mixer.music.stop()
-                self.timer.stop()
-                if not self.icons["play"].isNull():
-                    self.play_button.setIcon(self.icons["play"])
-                self.song_info_label.setText(" Přehrávání dokončeno")
-                self.position_slider.setValue(0)
-                self.time_label.setText(self.format_time(0))
-                self.current_track = None
+        skladba = self.fronta.dalsi(self.repeat_mode, rucne)
+        if skladba is None:
+            if rucne:
                 return
+            self.zvuk.zastavit()
+            self.zastavit_hodiny()
+            if not self.icons["play"].isNull():
+                self.play_button.setIcon(self.icons["play"])
+            self.song_info_label.setText(" Přehrávání dokončeno")
+            self.position_slider.setValue(0)
+            self.time_label.setText(self.format_time(0))
+            self.fronta.zastavit()
+            self.current_track = None
+            return
         
-        self.song_list_widget.setCurrentRow(next_index)
-        self.pustit_vybranou_skladbu()
+        self.prehrat_skladbu(self.tabulka.cesta(skladba))
+
+    def pustit_predchozi_skladbu(self):
+        if self.fronta.skladba is None:
+            return
+        # Jako jinde: po pár sekundách vrací "předchozí" na začátek aktuální skladby
+        if self.zvuk.pozice() > 3:
+            self.prehrat_skladbu(self.tabulka.cesta(self.fronta.skladba))
+            return
+        skladba = self.fronta.predchozi()
+        self.prehrat_skladbu(self.tabulka.cesta(skladba if skladba is not None else self.fronta.skladba))
             
     def pustit_vybranou_skladbu(self, item=None):
-        try:
-            index = self.song_list_widget.currentRow()
-            if index == -1 or index >= len(self.currently_viewing_paths):
-                return
+        # Klik s Ctrl nebo Shift jen mění výběr
+        if QApplication.keyboardModifiers() & (Qt.ControlModifier | Qt.ShiftModifier):
+            return
+        index = self.vybrana_pozice()
+        if index == -1 or index >= len(self.currently_viewing_ids):
+            return
+        
+        # Kliknutím se fronta naplní zobrazeným playlistem, dál už na zobrazení nezávisí
+        skladba = self.fronta.nastavit(self.currently_viewing_ids, index)
+        self.prehrat_skladbu(self.tabulka.cesta(skladba))
 
-            cela_cesta = self.currently_viewing_paths[index]
-            
+    def oznacit_hrajici_skladbu(self):
+        if self.currently_viewing_ids is not self.fronta.zdroj:
+            return
+        radek = self.song_model.radek(self.fronta.pozice_v_playlistu())
+        if radek != -1:
+            self.song_list_widget.setCurrentIndex(self.song_model.index(radek))
+
+    def delka_skladby(self, cela_cesta):
+        # Délku bereme z indexu, hlavičky souboru čteme jen u skladeb mimo knihovnu
+        skladba = self.tabulka.id(cela_cesta)
+        if skladba in self.tabulka:
+            return self.tabulka.duration[skladba]
+        skladba = self.index.najit(cela_cesta)
+        if skladba is not None:
+            return skladba.duration
+        return precist_metadata(cela_cesta).get("duration", 0)
+
+    def zobrazit_hrajici_skladbu(self, cela_cesta, delka):
+        if cela_cesta != self.current_track:
+            self.nacist_vlnu(cela_cesta)
+        self.current_track = cela_cesta
+        self.zobrazit_obal(cela_cesta)
+        self.current_song_duration_sec = int(delka)
+        
+        # Posuvník je v milisekundách, aby se mohl posouvat plynule
+        self.position_slider.setRange(0, int(delka * 1000))
+        self.duration_label.setText(self.format_time(self.current_song_duration_sec))
+        
+        if not self.icons["pause"].isNull():
+            self.play_button.setIcon(self.icons["pause"])
+        self.song_info_label.setText(f" Nyní hraje: {Path(cela_cesta).name}")
+        self.oznacit_hrajici_skladbu()
+        self.aplikovat_hlasitost()
+        self.spustit_hodiny()
+
+    @mereno("načtení skladby")
+    def prehrat_skladbu(self, cela_cesta):
+        try:
             if not Path(cela_cesta).exists():
-                QMessageBox.warning(self, "Chyba souboru", "Soubor nebyl nalezen. Možná byl přesunut nebo smazán.")
+                # Přesunutý soubor se zkusí dohledat podle otisku, playlist se pak opraví sám
+                self.spustit_kontrolu()
+                QMessageBox.warning(self, "Chyba souboru", "Soubor nebyl nalezen. Možná byl přesunut nebo smazán.\n"
+                                    "Pokud je v knihovně jinde, playlist se na něj za chvíli přesměruje.")
                 return
 
-            self.current_track = cela_cesta
+            delka = self.delka_skladby(cela_cesta)
+            self.zvuk.hrat(cela_cesta, delka)
+            self.zobrazit_hrajici_skladbu(cela_cesta, delka)
+            self.zapocitat_prehrani(cela_cesta)
+            self.nacist_geometrii(cela_cesta)
+            self.pripravit_dalsi_skladbu()
             
-            try:
-                audio = MP3(cela_cesta)
-                self.current_song_duration_sec = int(audio.info.length)
-            except Exception as e:
-                print(f"Chyba Mutagen při čtení délky: {e}")
-                self.current_song_duration_sec = 0
-            
-            self.position_slider.setRange(0, self.current_song_duration_sec)
-            self.duration_label.setText(self.format_time(self.current_song_duration_sec))
-
-            pygame.mixer.music.load(cela_cesta)
-            pygame.mixer.music.play()
-            self.timer.start() 
-            
-            if not self.icons["pause"].isNull():
-                self.play_button.setIcon(self.icons["pause"])
-            self.song_info_label.setText(f" Nyní hraje: {Path(cela_cesta).name}")
-            
-        except pygame.error as e:
+        except ChybaZvuku as e:
+            instrumentace.pocitat("chyby přehrávání")
             self.song_info_label.setText("CHYBA: Nelze přehrát soubor.")
             print(f"Chyba Pygame: {e}")
+
+    def pripravit_dalsi_skladbu(self):
+        # Další skladba z fronty jde dopředu do mixeru, přechod pak nečeká na otevření souboru
+        if self.zvuk.cesta is None:
+            return
+        dalsi = self.fronta.nahled_dalsi(self.repeat_mode)
+        if dalsi is not None:
+            dalsi = self.tabulka.cesta(dalsi)
+        try:
+            if dalsi is None or not os.path.exists(dalsi):
+                # Dřív připravená skladba už neplatí, mixer na ni nesmí přejít
+                self.zvuk.zrusit_dalsi()
+            else:
+                self.zvuk.pripravit_dalsi(dalsi, self.delka_skladby(dalsi), self.hlasitost_skladby(dalsi))
+        except ChybaZvuku as e:
+            print(f"Chyba Pygame při přípravě další skladby: {e}")
+
+    def dokoncit_prechod(self):
+        # Mixer už hraje skladbu z fronty, posuneme frontu a jen překreslíme přehrávač
+        ocekavana = self.fronta.dalsi(self.repeat_mode)
+        if ocekavana is not None:
+            ocekavana = self.tabulka.cesta(ocekavana)
+        if ocekavana != self.zvuk.cesta:
+            # Fronta se mezitím změnila tak, že připravená skladba už neplatí
+            if ocekavana is None:
+                self.pustit_dalsi_skladbu()
+            else:
+                self.prehrat_skladbu(ocekavana)
+            return
+        self.zobrazit_hrajici_skladbu(self.zvuk.cesta, self.zvuk.delka)
+        self.zapocitat_prehrani(self.zvuk.cesta)
+        self.nacist_geometrii(self.zvuk.cesta)
+        self.pripravit_dalsi_skladbu()
+
+    def nacist_vlnu(self, cela_cesta):
+        vlna = Vlna.z_indexu(self.index.vlna(cela_cesta))
+        self.position_slider.nastavit_vlnu(vlna)
+        if vlna is not None or vlnovka.np is None:
+            return
+        # Skladba, která se mezitím přeskočila, se už počítat nezačne
+        if self._vlna_future is not None:
+            self._vlna_future.cancel()
+        try:
+            self._vlna_future = self._pool_vln().submit(vlnovka.vlna_souboru, cela_cesta)
+        except BrokenProcessPool:
+            self.vlny_pool = None
+            self._vlna_future = self._pool_vln().submit(vlnovka.vlna_souboru, cela_cesta)
+        self._vlna_future.add_done_callback(lambda future: self._vlna_spocitana(cela_cesta, future))
+
+    def _pool_vln(self):
+        if self.vlny_pool is None:
+            # "spawn": fork by do procesu zkopíroval i otevřený mixer a vlákna Qt
+            self.vlny_pool = ProcessPoolExecutor(
+                max_workers=1,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=vlnovka.inicializovat_proces,
+            )
+        return self.vlny_pool
+
+    def _vlna_spocitana(self, cela_cesta, future):
+        # Běží ve vlákně poolu, do okna jde signálem
+        if future.cancelled():
+            return
+        try:
+            data = future.result()
+        except BrokenProcessPool as e:
+            print(f"Výpočet vlny přerušen: {e}")
+            return
+        if data is not None:
+            self.vlna_nactena.emit(cela_cesta, data)
+
+    def prevzit_vlnu(self, cela_cesta, data):
+        self.index.ulozit_vlnu(cela_cesta, data)
+        if cela_cesta == self.current_track:
+            self.position_slider.nastavit_vlnu(Vlna.z_indexu(data))
+
+    def obal_radku(self, skladba):
+        strana = self.song_list_widget.fontMetrics().height() + 2 * DelegatSkladby.PADDING
+        return self.obaly.pixmap(self.tabulka.cesta(skladba), strana * self.devicePixelRatioF())
+
+    def zobrazit_obal(self, cela_cesta):
+        obal = None
+        if cela_cesta is not None:
+            obal = self.obaly.pixmap(cela_cesta, VELIKOST_OBALU * self.devicePixelRatioF())
+        if obal is not None:
+            pixely = int(VELIKOST_OBALU * self.devicePixelRatioF())
+            obal = obal.scaled(pixely, pixely, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+            obal.setDevicePixelRatio(self.devicePixelRatioF())
+            self.obal_label.setPixmap(obal)
+        elif not self.icons["note"].isNull():
+            self.obal_label.setPixmap(self.icons["note"].pixmap(QSize(20, 20)))
+
+    def prevzit_obal(self, cela_cesta):
+        if cela_cesta == self.current_track:
+            self.zobrazit_obal(cela_cesta)
+        # Řádky se překreslí najednou, i když obaly dorazí po jednom
+        if not self.obaly_timer.isActive():
+            self.obaly_timer.start()
+
+    def nacist_geometrii(self, cela_cesta):
+        # Rámce MP3 jsou v indexu; poprvé se spočítají na pozadí, seek zatím jen nezarovná
+        if not cela_cesta.lower().endswith(".mp3"):
+            return
+        geometrie = self.index.geometrie(cela_cesta)
+        if geometrie is not None:
+            self.prevzit_geometrii(cela_cesta, geometrie, ulozit=False)
+            return
+        threading.Thread(
+            target=lambda: self.geometrie_nactena.emit(cela_cesta, precist_geometrii(cela_cesta)),
+            daemon=True,
+        ).start()
+
+    def prevzit_geometrii(self, cela_cesta, geometrie, ulozit=True):
+        if geometrie is None:
+            return
+        if ulozit:
+            self.index.ulozit_geometrii(cela_cesta, geometrie)
+            skladba = self.tabulka.id(cela_cesta)
+            if skladba is not None:
+                self.tabulka.duration[skladba] = geometrie.delka
+        if cela_cesta != self.zvuk.cesta:
+            return
+        self.zvuk.nastavit_geometrii(geometrie)
+        self.current_song_duration_sec = int(geometrie.delka)
+        self.position_slider.setRange(0, int(geometrie.delka * 1000))
+        self.duration_label.setText(self.format_time(self.current_song_duration_sec))
+        self.naplanovat_konec()
             
     def prepnout_prehravani(self):
         if self.current_track is None:
             self.pustit_vybranou_skladbu()
             return
             
-        if pygame.mixer.music.get_busy():
-            pygame.mixer.music.pause()
-            self.timer.stop() 
+        if not self.zvuk.je_pauza():
+            self.zvuk.pauza()
+            self.zastavit_hodiny()
             if not self.icons["play"].isNull():
                 self.play_button.setIcon(self.icons["play"])
         else:
-            pygame.mixer.music.unpause()
-            self.timer.start() 
+            self.zvuk.pokracovat()
+            self.spustit_hodiny()
             if not self.icons["pause"].isNull():
                 self.play_button.setIcon(self.icons["pause"])
             
+    def klic_alba(self, skladba):
+        # Album poznáme podle názvu a složky, ať se nepletou stejně pojmenovaná alba
+        return (self.tabulka.slozka[skladba], self.tabulka.album[skladba])
+
+    def hlasitost_alba(self, skladba):
+        if self._hlasitost_alb is None:
+            skupiny = {}
+            tabulka = self.tabulka
+            for s in tabulka.pritomne():
+                if tabulka.album[s]:
+                    skupiny.setdefault(self.klic_alba(s), []).append(
+                        (*tabulka.hlasitost(s), tabulka.duration[s]))
+            self._hlasitost_alb = {klic: hlasitost_celku(skladby) for klic, skladby in skupiny.items()}
+        return self._hlasitost_alb.get(self.klic_alba(skladba), (None, None))
+
+    def zesileni_skladby(self, cela_cesta):
+        skladba = self.tabulka.id(cela_cesta) if cela_cesta else None
+        if skladba not in self.tabulka or self.normalizace == "vypnuto":
+            return 1.0
+        if self.normalizace == "album" and self.tabulka.album[skladba]:
+            hlasitost, spicka = self.hlasitost_alba(skladba)
+            if hlasitost is not None:
+                return zesileni(hlasitost, spicka)
+        return zesileni(*self.tabulka.hlasitost(skladba))
+
+    def hlasitost_skladby(self, cela_cesta):
+        return self.volume_slider.value() / 100.0 * self.zesileni_skladby(cela_cesta)
+
+    def aplikovat_hlasitost(self):
+        self.zvuk.nastavit_hlasitost(self.hlasitost_skladby(self.current_track))
+        if self.zvuk.dalsi is not None:
+            # Připravená skladba ve frontě mixeru dostane novou hlasitost až při přechodu
+            cesta, delka = self.zvuk.dalsi
+            self.zvuk.pripravit_dalsi(cesta, delka, self.hlasitost_skladby(cesta))
+
+    def aktualizovat_normalizaci_tlacitko(self):
+        self.normalize_button.setToolTip(f"Vyrovnání hlasitosti: {self.normalizace}")
+
+    def prepnout_normalizaci(self):
+        self.normalizace = NORMALIZACE[(NORMALIZACE.index(self.normalizace) + 1) % len(NORMALIZACE)]
+        self.aktualizovat_normalizaci_tlacitko()
+        self.aplikovat_hlasitost()
+
     def zmenit_hlasitost(self, hodnota):
-        uroven = hodnota / 100.0
-        pygame.mixer.music.set_volume(uroven)
+        self.aplikovat_hlasitost()
         
         if hodnota == 0 and not self.icons["volume_mute"].isNull():
             self.volume_label.setPixmap(self.icons["volume_mute"].pixmap(QSize(20,20)))
         elif not self.icons["volume"].isNull():
             self.volume_label.setPixmap(self.icons["volume"].pixmap(QSize(20,20)))
     
+    def spustit_hodiny(self):
+        self.aktualizovat_progress()
+        self.naplanovat_konec()
+
+    def zastavit_hodiny(self):
+        self.timer.stop()
+        self.konec_timer.stop()
+
+    def naplanovat_konec(self):
+        self.rezerva_konce = REZERVA_KONCE_MS
+        if self.zvuk.je_pauza():
+            self.konec_timer.stop()
+            return
+        zbyva = self.zvuk.zbyva()
+        if zbyva is None:
+            # Bez známé délky zbývá jen se jednou za sekundu ptát mixeru
+            self.konec_timer.start(1000)
+            return
+        # Před přechodem na skladbu z fronty se ověřuje hned na konci podle hodin, ať se
+        # zesílení další skladby nastaví co nejdřív po jejím začátku. Zmeškaný přechod
+        # stojí jen jedno opakované ověření o REZERVA_KONCE_MS později
+        if self.zvuk.dalsi is not None:
+            self.rezerva_konce = 0
+        self.konec_timer.start(int(zbyva * 1000) + self.rezerva_konce)
+
+    @mereno("tik konce skladby")
+    def konec_skladby(self):
+        if self.current_track is None or self.zvuk.je_pauza():
+            return
+        if self.zvuk.zkontrolovat_prechod():
+            self.dokoncit_prechod()
+        elif self.zvuk.dohrala():
+            self.pustit_dalsi_skladbu()
+        elif self.zvuk.zbyva():
+            # Mezitím se posouvalo
+            self.naplanovat_konec()
+        else:
+            # Hodiny jsou napřed před mixerem; každé další ověření čeká dvakrát déle než
+            # předchozí, aspoň REZERVA_KONCE_MS, ne každých 30 ms až do skutečného konce
+            self.rezerva_konce = min(max(self.rezerva_konce * 2, REZERVA_KONCE_MS), MAX_REZERVA_KONCE_MS)
+            self.konec_timer.start(self.rezerva_konce)
+
+    def naplanovat_progress(self):
+        if self.current_track is None or self.zvuk.je_pauza() or not self.isVisible() or self.isMinimized():
+            self.timer.stop()
+            return
+        # Další překreslení, až se změní sekunda v čase nebo se jezdec posune o pixel
+        do_sekundy = 1000 - int(self.zvuk.pozice() * 1000) % 1000
+        na_pixel = self.position_slider.maximum() / max(self.position_slider.width(), 1)
+        if na_pixel <= 0:
+            na_pixel = do_sekundy
+        self.timer.start(int(max(min(do_sekundy, na_pixel), MIN_INTERVAL_PRUBEHU_MS)))
+
+    @mereno("tik průběhu")
     def aktualizovat_progress(self):
         if self.current_track is not None:
-            if not pygame.mixer.music.get_busy() and self.current_track is not None:
-                if self.position_slider.value() >= self.current_song_duration_sec - 1:
-                    self.pustit_dalsi_skladbu()
-                    return 
+            pozice = min(self.zvuk.pozice(), self.position_slider.maximum() / 1000)
             
-            current_time_ms = pygame.mixer.music.get_pos()
-            current_time_sec = current_time_ms // 1000
-                
-            if current_time_sec > self.current_song_duration_sec:
-                 current_time_sec = self.current_song_duration_sec
-
-            self.position_slider.blockSignals(True)
-            self.position_slider.setValue(current_time_sec)
-            self.position_slider.blockSignals(False)
+            if not self.position_slider.isSliderDown():
+                self.position_slider.blockSignals(True)
+                self.position_slider.setValue(int(pozice * 1000))
+                self.position_slider.blockSignals(False)
             
-            self.time_label.setText(self.format_time(current_time_sec))
+            self.time_label.setText(self.format_time(pozice))
+        self.naplanovat_progress()
 
+    @mereno("seek")
     def posunout_pozici(self):
         if self.current_track:
-            pozice_sec = self.position_slider.value()
+            pozice_sec = self.position_slider.value() / 1000
             
             try:
-                pygame.mixer.music.stop()
-                pygame.mixer.music.load(self.current_track)
-                pygame.mixer.music.play(start=pozice_sec)
+                posunuto = False
+                # Seek v pauze jen přesune pozici, hrát se začne až po stisku play
+                pauza = self.zvuk.je_pauza()
+                if self.zvuk.hraje() or pauza:
+                    # Skladba zůstane otevřená a připravená další skladba ve frontě mixeru taky
+                    try:
+                        pozice_sec = self.zvuk.posunout(pozice_sec)
+                        posunuto = True
+                    except ChybaZvuku as e:
+                        print(f"Seek bez znovuotevření selhal, otevírám znovu: {e}")
+                if not posunuto:
+                    self.zvuk.hrat(self.current_track, self.zvuk.delka, start=pozice_sec)
+                    if pauza:
+                        self.zvuk.pauza()
+                    self.pripravit_dalsi_skladbu()
                 
-                self.timer.start()
-                if not self.icons["pause"].isNull():
+                self.spustit_hodiny()
+                if not pauza and not self.icons["pause"].isNull():
                     self.play_button.setIcon(self.icons["pause"])
-                
-                self.time_label.setText(self.format_time(pozice_sec))
-            except pygame.error as e:
+            except ChybaZvuku as e:
                 print(f"Chyba při přeskakování (seek): {e}")
 
+    def prepnout_mereni(self):
+        if self.prekryv.isVisible():
+            self.prekryv.prepnout()
+            self.tep_timer.stop()
+            instrumentace.vypnout()
+            return
+        instrumentace.zapnout()
+        self.tep_timer.start()
+        self.prekryv.prepnout()
+
+    def exportovat_mereni(self):
+        try:
+            souhrn, stopa = instrumentace.exportovat(datova_slozka() / "diagnostika")
+        except OSError as e:
+            QMessageBox.warning(self, "Export měření", f"Export se nepodařil: {e}")
+            return
+        print(f"Měření uloženo: {souhrn}, {stopa}")
+        self.statusBar().showMessage(f"Měření uloženo do {Path(souhrn).parent}", 5000)
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        if self.prekryv.isVisible():
+            self.prekryv.umistit()
+
+    def hideEvent(self, event):
+        self.timer.stop()
+        super().hideEvent(event)
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.aktualizovat_progress()
+
+    def changeEvent(self, event):
+        super().changeEvent(event)
+        if event.type() == QEvent.Type.WindowStateChange:
+            # Minimalizace zastaví překreslování, obnovení ho hned dorovná
+            self.aktualizovat_progress()
+
+    def closeEvent(self, event):
+        self.zrusit_prenos.set()
+        self.zrusit_sken()
+        self.zrusit_kontrolu()
+        self.zrusit_analyzu()
+        self.zrusit_duplicity()
+        if self.vlny_pool is not None:
+            self.vlny_pool.shutdown(wait=False, cancel_futures=True)
+        self.obaly.ukoncit()
+        self.ulozit_zmenene_playlisty()
+        super().closeEvent(event)
+
 
 if __name__ == "__main__":
-    app = QApplication(sys.argv)
-    app.setStyle("Fusion") 
+    if importlib.util.find_spec("mutagen") is None:
+        print("Knihovna Mutagen není nalezena. Nainstalujte ji: pip install mutagen")
+        sys.exit()
+    
+    # --no-splash spustí aplikaci bez úvodního videa, --startup-report vypíše, kam šel čas startu
+    bez_uvodu = "--no-splash" in sys.argv or os.environ.get("CRAFTORA_NO_SPLASH") == "1"
+    vypsat_start = "--startup-report" in sys.argv or os.environ.get("CRAFTORA_STARTUP_REPORT") == "1"
+    # --profile zapne měření hlavních operací hned od startu (jinak Ctrl+Shift+P v okně)
+    if "--profile" in sys.argv or os.environ.get("CRAFTORA_PROFIL") == "1":
+        instrumentace.zapnout()
+    
+    with mereni.usek("QApplication"):
+        app = QApplication(sys.argv)
+        app.setStyle("Fusion") 
 
     script_dir = Path(__file__).parent.resolve()
     assets_path = script_dir / "assets"
 
-    loader = LoadingScreen(assets_path)
-    
-    try:
-        screen_geometry = app.primaryScreen().geometry()
-        loader.move(
-            (screen_geometry.width() - loader.width()) // 2,
-            (screen_geometry.height() - loader.height()) // 2
-        )
-    except AttributeError:
-        loader.resize(800, 450)
+    loader = None
+    okna = []
+
+    def zobrazit_okno(okno):
+        okno.show()
+        mereni.znacka("okno zobrazeno")
+        if vypsat_start:
+            QTimer.singleShot(0, lambda: print(mereni.zprava()))
+        else:
+            QTimer.singleShot(0, lambda: print(f"Start aplikace: {mereni.celkem_ms():.0f} ms"))
+
+    def vytvorit_okno(pripraveno):
+        try:
+            with mereni.usek("sestavení okna"):
+                okno = ModerniPrehravac(pripraveno)
+        except Exception as e:
+            # Bez okna by aplikace jen visela na úvodní obrazovce
+            if loader is not None:
+                loader.close()
+            QMessageBox.critical(None, "Chyba při spuštění", f"Přehrávač se nepodařilo spustit:\n{e}")
+            app.exit(1)
+            raise
+        okna.append(okno)
+        if loader is None:
+            zobrazit_okno(okno)
+        else:
+            loader.aplikace_pripravena(lambda: zobrazit_okno(okno))
 
-    loader.show()
-    loader.exec() 
+    # Knihovna, playlisty a zvuk se připravují souběžně s úvodním videem; slot se připojí
+    # před startem vlákna, jinak by se signál z rychlé přípravy ztratil
+    priprava = PripravaStartu(datova_slozka())
+    priprava.hotovo.connect(vytvorit_okno)
+    priprava.start()
 
-    okno = ModerniPrehravac()
-    okno.show()
+    if not bez_uvodu:
+        with mereni.usek("úvodní video"):
+            loader = LoadingScreen(assets_path)
+            
+            try:
+                screen_geometry = app.primaryScreen().geometry()
+                loader.move(
+                    (screen_geometry.width() - loader.width()) // 2,
+                    (screen_geometry.height() - loader.height()) // 2
+                )
+            except AttributeError:
+                loader.resize(800, 450)
+
+            loader.show()
     
     try:
         sys.exit(app.exec())
     finally:
-        pygame.quit()
\ No newline at end of file
+        ukoncit()
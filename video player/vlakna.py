@@ -0,0 +1,101 @@
+from PySide6.QtCore import QObject, QThread, Signal
+
+from analyza import Analyza
+from duplicity import HledaniDuplicit
+from kontrola import Kontrola
+from skener import Sken
+
+
+class PraceNaPozadi(QObject):
+    """Úloha jádra (sken, analýza, kontrola) ve vlastním QThread; hlášení posílá do GUI signály.
+
+    Výsledek `uloha.spustit()` jde do signálu `hotovo` podtřídy (n-tice jako jednotlivé
+    argumenty). Když úloha spadne, pošle se `PO_CHYBE`, ať okno úlohu vždy uvolní.
+    """
+
+    PO_CHYBE = None
+
+    def __init__(self):
+        super().__init__()
+        self.uloha = None
+        self.vlakno = QThread()
+        self.moveToThread(self.vlakno)
+        self.vlakno.started.connect(self.spustit)
+
+    def start(self):
+        self.vlakno.start()
+
+    def zrusit(self):
+        self.uloha.zrusit()
+
+    def pockat(self):
+        self.vlakno.quit()
+        self.vlakno.wait()
+
+    def bezi(self):
+        return self.vlakno.isRunning()
+
+    def spustit(self):
+        try:
+            try:
+                vysledek = self.uloha.spustit()
+            except Exception as e:
+                print(f"Úloha {type(self.uloha).__name__} selhala: {type(e).__name__}: {e}")
+                vysledek = self.PO_CHYBE
+            self.dokonceno(vysledek)
+        finally:
+            self.vlakno.quit()
+
+    def dokonceno(self, vysledek):
+        if isinstance(vysledek, tuple):
+            self.hotovo.emit(*vysledek)
+        else:
+            self.hotovo.emit(vysledek)
+
+
+class SkenerKnihovny(PraceNaPozadi):
+    davka_skladeb = Signal(list)      # nové nebo změněné Skladba záznamy
+    odebrane_skladby = Signal(list)   # cesty, které už na disku nejsou
+    prosle_slozky = Signal(list)      # složky k hlídání změn
+    prubeh = Signal(int, int)         # hotovo, celkem
+    hotovo = Signal(int, int, int)    # přidáno, změněno, odebráno
+    PO_CHYBE = (0, 0, 0)
+
+    def __init__(self, db_path, cile, sledovane=(), procesu=None):
+        super().__init__()
+        self.uloha = Sken(
+            db_path, cile, sledovane, procesu,
+            pri_davce=self.davka_skladeb.emit,
+            pri_odebrani=self.odebrane_skladby.emit,
+            pri_slozkach=self.prosle_slozky.emit,
+            pri_prubehu=self.prubeh.emit,
+        )
+
+
+class AnalyzaHlasitosti(PraceNaPozadi):
+    vysledky = Signal(list)   # [(cesta, hlasitost, špička)]
+    hotovo = Signal(int)      # počet změřených skladeb
+    PO_CHYBE = 0
+
+    def __init__(self, db_path, procesu=None):
+        super().__init__()
+        self.uloha = Analyza(db_path, procesu, pri_vysledcich=self.vysledky.emit)
+
+
+class KontrolaKnihovny(PraceNaPozadi):
+    premapovano = Signal(dict)    # {staré id: nové id}
+    hotovo = Signal(int, int)     # přesměrováno, stále chybí
+    PO_CHYBE = (0, 0)
+
+    def __init__(self, db_path):
+        super().__init__()
+        self.uloha = Kontrola(db_path, pri_premapovani=self.premapovano.emit)
+
+
+class HledacDuplicit(PraceNaPozadi):
+    prubeh = Signal(int, int)     # otisknuto, celkem
+    hotovo = Signal(object)       # [(id skladeb, podobnost)], po zrušení nebo chybě None
+
+    def __init__(self, db_path, procesu=None):
+        super().__init__()
+        self.uloha = HledaniDuplicit(db_path, procesu, pri_prubehu=self.prubeh.emit)
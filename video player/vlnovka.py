@@ -0,0 +1,222 @@
+import os
+import struct
+
+from PySide6.QtCore import Qt, QRectF
+from PySide6.QtGui import QColor, QPainter, QPixmap
+from PySide6.QtWidgets import QSlider
+
+import zvuk
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Vlna se počítá z dekódování na poloviční frekvenci: posuvníku to stačí a skladba
+# zabere v pracovním procesu poloviční paměť
+VZORKOVANI = 22050
+# Nejjemnější úroveň: jeden sloupec na 1024 vzorků (~21 za sekundu), každá další je 4x hrubší
+VZORKU_NA_SLOUPEC = 1024
+NASOBEK_UROVNE = 4
+MIN_SLOUPCU = 64
+# Kolik sloupců se počítá najednou, ať dekódovaná skladba nezabere v paměti ještě jednou tolik
+SLOUPCU_NAJEDNOU = 4096
+
+HLAVICKA = struct.Struct("<4sHI")
+ZNACKA = b"VLN1"
+
+
+class Vlna:
+    """Špičky a RMS skladby v několika rozlišeních, hodnoty 0..255 po sloupcích."""
+
+    def __init__(self, urovne):
+        self.urovne = urovne    # [(špičky, rms)] od nejjemnější úrovně
+
+    @classmethod
+    def spocitat(cls, vzorky):
+        """Z pole (vzorky, kanály) int16 spočítá všechny úrovně jen operacemi nad poli."""
+        if vzorky.ndim == 1:
+            vzorky = vzorky[:, None]
+        kanaly = vzorky.shape[1]
+        sloupcu = len(vzorky) // VZORKU_NA_SLOUPEC
+        spicky = np.empty(sloupcu, dtype=np.float32)
+        rms = np.empty(sloupcu, dtype=np.float32)
+        for od in range(0, sloupcu, SLOUPCU_NAJEDNOU):
+            do = min(od + SLOUPCU_NAJEDNOU, sloupcu)
+            x = vzorky[od * VZORKU_NA_SLOUPEC:do * VZORKU_NA_SLOUPEC]
+            x = x.reshape(do - od, VZORKU_NA_SLOUPEC * kanaly).astype(np.float32)
+            x *= 1 / 32768.0
+            spicky[od:do] = np.abs(x).max(axis=1)
+            rms[od:do] = np.sqrt((x * x).mean(axis=1))
+
+        urovne = []
+        while True:
+            urovne.append((
+                np.round(spicky * 255).astype(np.uint8),
+                np.round(np.minimum(rms, 1.0) * 255).astype(np.uint8),
+            ))
+            if len(spicky) < MIN_SLOUPCU * NASOBEK_UROVNE:
+                break
+            delka = len(spicky) // NASOBEK_UROVNE * NASOBEK_UROVNE
+            spicky = spicky[:delka].reshape(-1, NASOBEK_UROVNE).max(axis=1)
+            rms = np.sqrt((rms[:delka] ** 2).reshape(-1, NASOBEK_UROVNE).mean(axis=1))
+        return cls(urovne)
+
+    def na_sirku(self, sirka):
+        """Špičky a RMS (0..1) pro `sirka` pixelů z nejhrubší úrovně, která ještě stačí."""
+        spicky, rms = self.urovne[0]
+        for kandidat in self.urovne:
+            if len(kandidat[0]) < sirka:
+                break
+            spicky, rms = kandidat
+        if not len(spicky):
+            return None
+        hranice = (np.arange(sirka) * len(spicky) // sirka).astype(np.intp)
+        hranice = np.unique(hranice)
+        pixel_spicky = np.maximum.reduceat(spicky, hranice) / 255.0
+        rms2 = (rms.astype(np.float32) / 255.0) ** 2
+        pixel_rms = np.sqrt(np.add.reduceat(rms2, hranice) / np.diff(np.append(hranice, len(rms))))
+        return pixel_spicky, pixel_rms
+
+    def do_bajtu(self):
+        casti = [HLAVICKA.pack(ZNACKA, len(self.urovne), VZORKU_NA_SLOUPEC)]
+        for spicky, rms in self.urovne:
+            casti.append(struct.pack("<I", len(spicky)))
+            casti.append(spicky.tobytes())
+            casti.append(rms.tobytes())
+        return b"".join(casti)
+
+    @classmethod
+    def z_bajtu(cls, data):
+        znacka, pocet, vzorku = HLAVICKA.unpack_from(data)
+        if znacka != ZNACKA or vzorku != VZORKU_NA_SLOUPEC:
+            return None
+        pos = HLAVICKA.size
+        urovne = []
+        for _ in range(pocet):
+            (delka,) = struct.unpack_from("<I", data, pos)
+            pos += 4
+            spicky = np.frombuffer(data, dtype=np.uint8, count=delka, offset=pos)
+            rms = np.frombuffer(data, dtype=np.uint8, count=delka, offset=pos + delka)
+            pos += 2 * delka
+            urovne.append((spicky, rms))
+        return cls(urovne)
+
+    @classmethod
+    def z_indexu(cls, data):
+        """Vlna z bajtů uložených v indexu; None u chybějících nebo poškozených dat."""
+        if data is None or np is None:
+            return None
+        try:
+            return cls.z_bajtu(data)
+        except (struct.error, ValueError):
+            return None
+
+
+def inicializovat_proces():
+    """Start procesu pro vlny: mixer bez zvukového zařízení a nižší priorita než přehrávač."""
+    if hasattr(os, "nice"):
+        os.nice(10)
+    zvuk.nacist_backend(frekvence=VZORKOVANI, bez_zarizeni=True)
+
+
+def vlna_souboru(cesta):
+    """Běží v pracovním procesu; vrátí vlnu skladby jako bajty, při chybě None."""
+    try:
+        vzorky, _ = zvuk.dekodovat(cesta)
+    except zvuk.ChybaZvuku as e:
+        print(f"Nelze spočítat vlnu skladby '{cesta}': {e}")
+        return None
+    return Vlna.spocitat(vzorky).do_bajtu()
+
+
+class PosuvnikVlny(QSlider):
+    """Posuvník pozice, který místo drážky kreslí vlnu skladby.
+
+    Vlna se při změně velikosti jednou vykreslí do dvou pixmap (přehraná a zbývající
+    část), každé další překreslení je jen oříznuté vykreslení těch dvou obrázků.
+    """
+
+    BARVA = QColor(120, 130, 160)
+    BARVA_RMS = QColor(90, 100, 130)
+    BARVA_PREHRANO = QColor(0, 191, 255)
+    BARVA_PREHRANO_RMS = QColor(0, 140, 200)
+
+    def __init__(self, parent=None):
+        super().__init__(Qt.Orientation.Horizontal, parent)
+        self.vlna = None
+        self._obrazky = None
+        self.setMinimumHeight(36)
+
+    def nastavit_vlnu(self, vlna):
+        self.vlna = vlna
+        self._obrazky = None
+        self.update()
+
+    def resizeEvent(self, event):
+        self._obrazky = None
+        super().resizeEvent(event)
+
+    def _vykreslit(self, barva, barva_rms):
+        sirka, vyska = self.width(), self.height()
+        obrazek = QPixmap(sirka, vyska)
+        obrazek.fill(Qt.GlobalColor.transparent)
+        hodnoty = self.vlna.na_sirku(sirka)
+        if hodnoty is None:
+            return obrazek
+        stred = vyska / 2
+        krok = sirka / len(hodnoty[0])
+        painter = QPainter(obrazek)
+        for barva_sloupce, rada in ((barva, hodnoty[0]), (barva_rms, hodnoty[1])):
+            for x, hodnota in enumerate(rada.tolist()):
+                vyska_sloupce = max(hodnota * stred, 0.5)
+                painter.fillRect(
+                    QRectF(x * krok, stred - vyska_sloupce, max(krok - 0.5, 1.0), 2 * vyska_sloupce),
+                    barva_sloupce,
+                )
+        painter.end()
+        return obrazek
+
+    def paintEvent(self, event):
+        if self.vlna is None:
+            super().paintEvent(event)
+            return
+        if self._obrazky is None:
+            self._obrazky = (
+                self._vykreslit(self.BARVA, self.BARVA_RMS),
+                self._vykreslit(self.BARVA_PREHRANO, self.BARVA_PREHRANO_RMS),
+            )
+        rozsah = self.maximum() - self.minimum()
+        podil = (self.value() - self.minimum()) / rozsah if rozsah > 0 else 0.0
+        hranice = int(podil * self.width())
+
+        painter = QPainter(self)
+        zbyva, prehrano = self._obrazky
+        painter.drawPixmap(0, 0, prehrano, 0, 0, hranice, self.height())
+        painter.drawPixmap(hranice, 0, zbyva, hranice, 0, self.width() - hranice, self.height())
+        painter.end()
+
+    def _hodnota_z_x(self, x):
+        podil = min(max(x / max(self.width(), 1), 0.0), 1.0)
+        return self.minimum() + int(podil * (self.maximum() - self.minimum()))
+
+    # Klik kamkoli do vlny skočí rovnou na dané místo, ne o stránku jako u běžného posuvníku
+    def mousePressEvent(self, event):
+        if self.vlna is None or event.button() != Qt.MouseButton.LeftButton:
+            super().mousePressEvent(event)
+            return
+        self.setSliderDown(True)
+        self.setValue(self._hodnota_z_x(event.position().x()))
+
+    def mouseMoveEvent(self, event):
+        if self.vlna is None or not self.isSliderDown():
+            super().mouseMoveEvent(event)
+            return
+        self.setValue(self._hodnota_z_x(event.position().x()))
+
+    def mouseReleaseEvent(self, event):
+        if self.vlna is None or not self.isSliderDown():
+            super().mouseReleaseEvent(event)
+            return
+        self.setValue(self._hodnota_z_x(event.position().x()))
+        self.setSliderDown(False)
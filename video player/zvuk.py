@@ -0,0 +1,337 @@
+import io
+import os
+import shutil
+import subprocess
+import threading
+import time
+import wave
+
+import formaty
+
+VELIKOST_BLOKU = 1 << 20
+
+# pygame se načítá až při prvním použití (při startu na pozadí), import trvá stovky ms
+pygame = None
+_zamek_backendu = threading.Lock()
+
+
+class ChybaZvuku(Exception):
+    """Soubor nejde otevřít nebo přehrát; obaluje pygame.error, aby GUI nemuselo znát pygame."""
+
+
+def nacist_backend(frekvence=None, bez_zarizeni=False):
+    """Naimportuje pygame a otevře mixer; další volání už nic nedělají."""
+    global pygame
+    with _zamek_backendu:
+        if pygame is not None:
+            return
+        os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+        if bez_zarizeni:
+            os.environ["SDL_AUDIODRIVER"] = "dummy"
+        import pygame as modul
+        if frekvence:
+            modul.mixer.init(frequency=frekvence, size=-16, channels=2)
+        else:
+            modul.mixer.init()
+        pygame = modul
+
+
+def ukoncit():
+    if pygame is not None:
+        pygame.quit()
+
+
+def dekodovat(cesta):
+    """Celá skladba jako pole (vzorky, kanály) int16 ve formátu mixeru a jeho vzorkovací frekvence."""
+    nacist_backend()
+    if not formaty.umi_mixer(cesta):
+        return _dekodovat_ffmpeg(cesta)
+    try:
+        zvuk = pygame.mixer.Sound(cesta)
+    except pygame.error as e:
+        raise ChybaZvuku(str(e)) from e
+    # samples() vrací pohled do dekódovaného zvuku, nic se nekopíruje
+    return pygame.sndarray.samples(zvuk), pygame.mixer.get_init()[0]
+
+
+def _dekodovat_ffmpeg(cesta):
+    # Formáty, které SDL_mixer neumí, dekóduje ffmpeg, pokud je v systému
+    ffmpeg = shutil.which("ffmpeg")
+    if ffmpeg is None:
+        raise ChybaZvuku("formát vyžaduje ffmpeg, který není nainstalovaný")
+    import numpy as np
+    frekvence, _, kanaly = pygame.mixer.get_init()
+    try:
+        vystup = subprocess.run(
+            [ffmpeg, "-v", "error", "-nostdin", "-i", cesta, "-f", "s16le", "-acodec", "pcm_s16le",
+             "-ac", str(kanaly), "-ar", str(frekvence), "-"],
+            capture_output=True, check=True,
+        )
+    except (OSError, subprocess.CalledProcessError) as e:
+        raise ChybaZvuku(str(e)) from e
+    return np.frombuffer(vystup.stdout, dtype=np.int16).reshape(-1, kanaly), frekvence
+
+
+def _kratke_ticho():
+    # Jeden vzorek ticha jako WAV ve formátu mixeru
+    frekvence, _, kanaly = pygame.mixer.get_init()
+    soubor = io.BytesIO()
+    with wave.open(soubor, "wb") as wav:
+        wav.setnchannels(kanaly)
+        wav.setsampwidth(2)
+        wav.setframerate(frekvence)
+        wav.writeframes(bytes(2 * kanaly))
+    return soubor.getvalue()
+
+
+def predcist_soubor(cesta):
+    # Přečtením dostaneme soubor do cache systému, aby přechod nečekal na disk nebo síť
+    try:
+        with open(cesta, "rb") as f:
+            while f.read(VELIKOST_BLOKU):
+                pass
+    except OSError:
+        pass
+
+
+class ZvukovyVystup:
+    """Přehrávání, které si k formátu každé skladby vybere dekodér.
+
+    Co umí SDL_mixer, hraje VystupMixeru (včetně přechodů bez mezery); ostatní formáty
+    hraje VystupQt přes QtMultimedia. Navenek je to jeden výstup se stejným rozhraním,
+    volání, která tu nejsou, jdou na právě aktivní výstup.
+    """
+
+    def __init__(self):
+        self.mixer = VystupMixeru()
+        self._qt = None             # vzniká až u první skladby, kterou mixer neumí
+        self.aktivni = self.mixer
+        self._hlasitost = 1.0
+
+    def __getattr__(self, nazev):
+        return getattr(self.aktivni, nazev)
+
+    def _vystup_pro(self, cesta):
+        if formaty.umi_mixer(cesta):
+            return self.mixer
+        if self._qt is None:
+            from zvuk_qt import VystupQt
+            self._qt = VystupQt()
+        return self._qt
+
+    def hrat(self, cesta, delka, start=0.0):
+        vystup = self._vystup_pro(cesta)
+        if vystup is not self.aktivni:
+            self.aktivni.zastavit()
+            self.aktivni = vystup
+            vystup.nastavit_hlasitost(self._hlasitost)
+        vystup.hrat(cesta, delka, start)
+
+    def pripravit_dalsi(self, cesta, delka, hlasitost=None):
+        # Bez mezery se dá přejít jen uvnitř mixeru; jinak se další skladba pustí až po konci
+        # a ve frontě mixeru nesmí zůstat dřív připravená skladba
+        if self.aktivni is self.mixer and formaty.umi_mixer(cesta):
+            self.mixer.pripravit_dalsi(cesta, delka, hlasitost)
+        else:
+            self.aktivni.zrusit_dalsi()
+
+    def nastavit_hlasitost(self, uroven):
+        self._hlasitost = uroven
+        self.aktivni.nastavit_hlasitost(uroven)
+
+
+class VystupMixeru:
+    """Obal nad pygame.mixer.music s vlastními hodinami přehrávání.
+
+    Další skladba se předá do `pygame.mixer.music.queue`: SDL_mixer ji otevře a připraví
+    dekodér dopředu, dekódovat ji ale začne až při přechodu v audio vlákně. Ten přijde se
+    začátkem dalšího bufferu mixeru, mezi skladbami tak zůstane ticho kratší než jeden
+    buffer (výchozích 512 vzorků). Dekódovat celou skladbu předem do Sound by stálo desítky
+    až stovky MB paměti na skladbu. Přechod pak pozná `zkontrolovat_prechod` podle události
+    konce skladby od mixeru, a kde fronta událostí není k dispozici, podle hodin.
+    """
+
+    def __init__(self):
+        nacist_backend()
+        # Událost, kterou SDL_mixer pošle na konci každé skladby (i při přepnutí na skladbu z fronty)
+        self.KONEC_SKLADBY = pygame.USEREVENT + 1
+        self._ticho = _kratke_ticho()
+        self.cesta = None
+        self.delka = 0.0
+        self.dalsi = None           # (cesta, délka) skladby ve frontě mixeru
+        self.hlasitost_dalsi = None # hlasitost, která se nastaví v okamžiku přechodu na ni
+        self.geometrie = None       # rámce MP3 aktuální skladby, pokud už jsou známé
+        self._offset = 0.0          # pozice ve skladbě při posledním spuštění
+        self._spusteno = None       # time.monotonic() posledního spuštění
+        self._pauza_od = None
+        self._konce = 0             # nezpracované události konce skladby
+        self.udalosti = False
+        try:
+            # Fronta událostí SDL potřebuje video subsystém, žádné okno se ale nevytváří
+            pygame.display.init()
+            pygame.event.set_blocked(None)
+            pygame.event.set_allowed(self.KONEC_SKLADBY)
+            pygame.mixer.music.set_endevent(self.KONEC_SKLADBY)
+            self.udalosti = True
+        except pygame.error as e:
+            print(f"Události konce skladby nejsou k dispozici, stačí hodiny: {e}")
+
+    def _vybrat_udalosti(self):
+        if self.udalosti:
+            self._konce += len(pygame.event.get(self.KONEC_SKLADBY))
+
+    def _zahodit_udalosti(self):
+        # load() a stop() zastaví starou skladbu a mixer to ohlásí jako její konec
+        if self.udalosti:
+            pygame.event.clear(self.KONEC_SKLADBY)
+        self._konce = 0
+
+    def hrat(self, cesta, delka, start=0.0):
+        try:
+            pygame.mixer.music.load(cesta)
+            pygame.mixer.music.play(start=start)
+        except pygame.error as e:
+            raise ChybaZvuku(str(e)) from e
+        self._zahodit_udalosti()
+        if cesta != self.cesta:
+            self.geometrie = None
+        self.cesta = cesta
+        self.delka = float(delka)
+        self.dalsi = None
+        self._offset = start
+        self._spusteno = time.monotonic()
+        self._pauza_od = None
+
+    def nastavit_geometrii(self, geometrie):
+        # Délka z rámců je přesná, podle ní se pozná i okamžik přechodu na další skladbu
+        self.geometrie = geometrie
+        self.delka = geometrie.delka
+
+    def posunout(self, pozice):
+        """Skok v otevřené skladbě bez jejího znovuotevření, vrátí skutečnou pozici.
+
+        Se známými rámci se cíl zarovná na začátek rámce, takže hodiny a dekodér se
+        shodnou i u VBR souborů.
+        """
+        if self.geometrie is not None:
+            pozice = self.geometrie.zarovnat(pozice)
+        try:
+            pygame.mixer.music.set_pos(pozice)
+        except pygame.error as e:
+            raise ChybaZvuku(str(e)) from e
+        self._offset = pozice
+        self._spusteno = time.monotonic()
+        if self._pauza_od is not None:
+            self._pauza_od = self._spusteno
+        return pozice
+
+    def pripravit_dalsi(self, cesta, delka, hlasitost=None):
+        """Dá skladbu do fronty mixeru; `hlasitost` (se zesílením normalizace) se jí nastaví
+        hned při přechodu, ne až po překreslení okna."""
+        if self.cesta is None:
+            return
+        self.hlasitost_dalsi = hlasitost
+        if self.dalsi is not None and self.dalsi[0] == cesta:
+            self.dalsi = (cesta, float(delka))
+            return
+        try:
+            # Skladbu, která ve frontě mixeru už je, queue() nahradí
+            pygame.mixer.music.queue(cesta)
+        except pygame.error as e:
+            self.zrusit_dalsi()
+            raise ChybaZvuku(str(e)) from e
+        self.dalsi = (cesta, float(delka))
+        threading.Thread(target=predcist_soubor, args=(cesta,), daemon=True).start()
+
+    def zrusit_dalsi(self):
+        """Zahodí skladbu připravenou ve frontě mixeru, ať po konci aktuální nezačne hrát."""
+        if self.dalsi is None or self.cesta is None:
+            self.dalsi = None
+            return
+        self._vybrat_udalosti()
+        if self._konce:
+            # Mixer už na ni přešel; přechod dořeší zkontrolovat_prechod a okno
+            return
+        # Frontu mixeru pygame vyprázdní jen load() nebo stop(), které by přerušily aktuální
+        # skladbu; skladbu ve frontě proto nahradí jeden vzorek ticha a po něm mixer ohlásí konec
+        try:
+            pygame.mixer.music.queue(io.BytesIO(self._ticho), "wav")
+        except pygame.error as e:
+            raise ChybaZvuku(str(e)) from e
+        self.dalsi = None
+        self.hlasitost_dalsi = None
+
+    def pauza(self):
+        if self._pauza_od is None and self.cesta is not None:
+            pygame.mixer.music.pause()
+            self._pauza_od = time.monotonic()
+
+    def pokracovat(self):
+        if self._pauza_od is not None:
+            pygame.mixer.music.unpause()
+            self._spusteno += time.monotonic() - self._pauza_od
+            self._pauza_od = None
+
+    def hraje(self):
+        return pygame.mixer.music.get_busy()
+
+    def nastavit_hlasitost(self, uroven):
+        pygame.mixer.music.set_volume(uroven)
+
+    def je_pauza(self):
+        return self._pauza_od is not None
+
+    def zastavit(self):
+        pygame.mixer.music.stop()
+        self._zahodit_udalosti()
+        self.cesta = None
+        self.dalsi = None
+        self._pauza_od = None
+
+    def dohrala(self):
+        """True, když skladba skončila a ve frontě mixeru nic dalšího nebylo."""
+        if self.cesta is None or self._pauza_od is not None:
+            return False
+        self._vybrat_udalosti()
+        if self.udalosti:
+            return self._konce > 0
+        return not pygame.mixer.music.get_busy()
+
+    def pozice(self):
+        """Pozice v aktuální skladbě v sekundách podle vlastních hodin."""
+        if self._spusteno is None or self.cesta is None:
+            return 0.0
+        ted = self._pauza_od if self._pauza_od is not None else time.monotonic()
+        return self._offset + (ted - self._spusteno)
+
+    def zbyva(self):
+        """Sekundy do konce aktuální skladby podle hodin, nebo None u neznámé délky."""
+        if self.cesta is None or self.delka <= 0:
+            return None
+        return max(self.delka - self.pozice(), 0.0)
+
+    def zkontrolovat_prechod(self):
+        """Vrátí True, když mixer už přešel na skladbu z fronty."""
+        self._vybrat_udalosti()
+        if self.dalsi is None:
+            return False
+        ted = time.monotonic()
+        if self.udalosti:
+            if not self._konce:
+                return False
+            self._konce -= 1
+        elif self.delka <= 0 or self.pozice() < self.delka:
+            return False
+        # Nová skladba začala přesně v okamžiku, kdy stará skončila; hodiny ale nesmí
+        # ukazovat budoucnost, když mixer dohrál dřív, než čekaly
+        self._spusteno = min(self._spusteno + self.delka - self._offset, ted)
+        self._offset = 0.0
+        # Hlasitost nové skladby hned, jak mixer přechod ohlásí; čekat na okno by znamenalo
+        # hrát začátek skladby se zesílením té předchozí
+        if self.hlasitost_dalsi is not None:
+            pygame.mixer.music.set_volume(self.hlasitost_dalsi)
+        self.cesta, self.delka = self.dalsi
+        self.dalsi = None
+        self.hlasitost_dalsi = None
+        self.geometrie = None
+        return True
@@ -0,0 +1,99 @@
+from PySide6.QtCore import QUrl
+from PySide6.QtMultimedia import QAudioOutput, QMediaPlayer
+
+from zvuk import ChybaZvuku
+
+
+class VystupQt:
+    """Přehrávání přes QtMultimedia pro formáty, které SDL_mixer nedekóduje (M4A/AAC).
+
+    Rozhraní je stejné jako u VystupMixeru, jen bez přechodu bez mezery: další skladba
+    se pustí až po konci aktuální. Pozici i konec hlásí sám přehrávač.
+    """
+
+    def __init__(self):
+        self.prehravac = QMediaPlayer()
+        self.vystup = QAudioOutput()
+        self.prehravac.setAudioOutput(self.vystup)
+        self.prehravac.mediaStatusChanged.connect(self._zmena_stavu)
+        self.prehravac.errorOccurred.connect(self._chyba)
+        self.cesta = None
+        self.delka = 0.0
+        self.dalsi = None
+        self.geometrie = None
+        self._dohrano = False
+
+    def _zmena_stavu(self, stav):
+        if stav == QMediaPlayer.MediaStatus.EndOfMedia:
+            self._dohrano = True
+
+    def _chyba(self, chyba, popis):
+        # Chyba dekódování přijde až asynchronně; skladbu bereme jako dohranou
+        print(f"Chyba QtMultimedia: {popis}")
+        self._dohrano = True
+
+    def hrat(self, cesta, delka, start=0.0):
+        self.prehravac.setSource(QUrl.fromLocalFile(cesta))
+        if self.prehravac.error() != QMediaPlayer.Error.NoError:
+            raise ChybaZvuku(self.prehravac.errorString())
+        if start:
+            self.prehravac.setPosition(int(start * 1000))
+        self.prehravac.play()
+        self.cesta = cesta
+        self.delka = float(delka)
+        self.geometrie = None
+        self._dohrano = False
+
+    def nastavit_geometrii(self, geometrie):
+        self.geometrie = geometrie
+        self.delka = geometrie.delka
+
+    def posunout(self, pozice):
+        self.prehravac.setPosition(int(pozice * 1000))
+        return pozice
+
+    def pripravit_dalsi(self, cesta, delka, hlasitost=None):
+        pass
+
+    def zrusit_dalsi(self):
+        pass
+
+    def pauza(self):
+        if self.cesta is not None:
+            self.prehravac.pause()
+
+    def pokracovat(self):
+        if self.je_pauza():
+            self.prehravac.play()
+
+    def hraje(self):
+        return self.prehravac.playbackState() == QMediaPlayer.PlaybackState.PlayingState
+
+    def nastavit_hlasitost(self, uroven):
+        self.vystup.setVolume(uroven)
+
+    def je_pauza(self):
+        return self.prehravac.playbackState() == QMediaPlayer.PlaybackState.PausedState
+
+    def zastavit(self):
+        self.prehravac.stop()
+        self.cesta = None
+        self._dohrano = False
+
+    def dohrala(self):
+        return self.cesta is not None and self._dohrano
+
+    def pozice(self):
+        if self.cesta is None:
+            return 0.0
+        return self.prehravac.position() / 1000
+
+    def zbyva(self):
+        if self.cesta is None or self.delka <= 0:
+            return None
+        if self._dohrano:
+            return 0.0
+        return max(self.delka - self.pozice(), 0.0)
+
+    def zkontrolovat_prechod(self):
+        return False